@@ -1,12 +1,26 @@
 from django.conf.urls import include, url
 
+from .v3.feedback import feedback
 from .v3.languages import languages
+from .v3.nearby import nearby_pois, nearby_sites
+from .v3.pages import pages, single_page
+from .v3.search import search
 from .v3.sites import sites, pushnew
+from .v3.sync import sync
 
 urlpatterns = [
     url(r'sites/$', sites, name='sites'),
     url(r'sites/pushnew/$', pushnew, name='pushnew'),
+    url(r'sites/nearby$', nearby_sites, name='nearby_sites'),
     url(r'(?P<site_slug>[-\w]+)/', include([
         url(r'languages$', languages),
+        url(r'^feedback$', feedback),
+        url(r'^(?P<language_code>[-\w]+)/', include([
+            url(r'^pages$', pages),
+            url(r'^pages/(?P<page_id>[0-9]+)$', single_page),
+            url(r'^sync$', sync),
+            url(r'^search$', search),
+            url(r'^pois/nearby$', nearby_pois),
+        ])),
     ])),
 ]
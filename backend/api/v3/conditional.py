@@ -0,0 +1,40 @@
+"""
+Helpers to answer conditional requests to the content api without serializing any content
+"""
+import calendar
+import hashlib
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*values):
+    """
+    Build a strong ETag from the given values
+    :param values: values that change whenever the content of the response changes
+    :return: quoted ETag
+    """
+    digest = hashlib.sha1('|'.join(str(value) for value in values).encode('utf-8'))
+    return quote_etag(digest.hexdigest())
+
+
+def conditional_json_response(request, etag, last_modified, get_result):
+    """
+    Answer the request with 304 if the client's copy is still up to date.
+    The content is only serialized if a full response has to be sent.
+    :param request: the current request
+    :param etag: quoted ETag of the current content
+    :param last_modified: datetime of the last change or None
+    :param get_result: callable returning the JSON-serializable content
+    :return: JsonResponse or HttpResponseNotModified
+    """
+    timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        # Turn off Safe-Mode to allow serializing arrays
+        response = JsonResponse(get_result(), safe=False)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
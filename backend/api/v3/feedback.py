@@ -0,0 +1,279 @@
+"""
+Submission of feedback by the users of the app.
+After a push notification, thousands of users may rate content within minutes. The submissions are
+therefore only validated in the request and collected in a buffer of the process, which is
+written to the database in batches by a background thread.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from cms.models import DailyFeedbackCount, Feedback
+
+from .nearby import bad_request
+from .pages import site_not_found
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_TYPES = dict(Feedback.TYPE)
+# the foreign key to the object the feedback is about, feedback of other types has none
+REFERENCED_FIELDS = {
+    Feedback.PAGE: 'page',
+    Feedback.TECHNICAL: 'page',
+    Feedback.EXTRA: 'extra',
+    Feedback.EVENT: 'event',
+}
+EMOTIONS = dict(Feedback.EMOTION)
+MAX_COMMENT_LENGTH = Feedback._meta.get_field('comment').max_length
+MAX_QUERY_LENGTH = Feedback._meta.get_field('searchQuery').max_length
+# seconds after which clients should retry if the buffer is full
+RETRY_AFTER = 10
+# number of flushes in which a submission is tried to be written before it is dropped
+MAX_ATTEMPTS = 10
+# the database doesn't accept NUL, the other control characters except whitespace are not text
+CONTROL_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+class FeedbackBuffer:
+    """
+    Thread-safe buffer of the validated submissions of this process. It is flushed when it
+    contains a full batch or when the flush interval passed, whichever comes first.
+    Submissions which were not written yet are lost if the process is killed.
+    """
+
+    def __init__(self, max_size, batch_size, flush_interval):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.submissions = []
+        self.lock = threading.Lock()
+        # only one thread writes at a time, so the batches are written in order
+        self.flush_lock = threading.Lock()
+        self.batch_ready = threading.Event()
+        # the process id of the flushing thread, which doesn't survive a fork of the process
+        self.flusher_pid = None
+
+    def add(self, submission):
+        """
+        Store a validated submission until the next flush
+        :param submission: dict with the site id, the type and the fields of the feedback
+        :return: False if the buffer is full
+        """
+        self.start_flusher()
+        with self.lock:
+            if len(self.submissions) >= self.max_size:
+                return False
+            self.submissions.append(submission)
+            if len(self.submissions) >= self.batch_size:
+                self.batch_ready.set()
+        return True
+
+    def start_flusher(self):
+        pid = os.getpid()
+        if self.flusher_pid == pid:
+            return
+        with self.lock:
+            if self.flusher_pid == pid:
+                return
+            self.flusher_pid = pid
+        threading.Thread(target=self.run, name='feedback-flusher', daemon=True).start()
+
+    def run(self):
+        while True:
+            self.batch_ready.wait(self.flush_interval)
+            self.batch_ready.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                # the failed batch was put back into the buffer, the thread has to keep running
+                logger.exception('Writing the buffered feedback failed')
+
+    def flush(self):
+        """
+        Write all buffered submissions in batches
+        :return: number of written feedback objects
+        """
+        count = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = self.submissions[:self.batch_size]
+                    del self.submissions[:self.batch_size]
+                if not batch:
+                    return count
+                try:
+                    count += self.write_batch(batch)
+                except Exception:
+                    self.requeue(batch)
+                    raise
+
+    def write_batch(self, batch):
+        """
+        Write a batch and isolate the submissions which the database rejects by splitting it
+        :param batch: list of submissions
+        :return: number of written feedback objects
+        """
+        try:
+            return write_feedback(batch)
+        except (DataError, IntegrityError, ValueError):
+            if len(batch) == 1:
+                logger.error('Dropped feedback which the database rejected: %r', batch[0])
+                return 0
+            middle = len(batch) // 2
+            return self.write_batch(batch[:middle]) + self.write_batch(batch[middle:])
+
+    def requeue(self, batch):
+        """
+        Keep the submissions of a batch which failed e.g. because the database is unavailable for
+        the next flush, unless they failed too often or newer submissions filled the buffer
+        :param batch: list of submissions
+        """
+        retried = []
+        for submission in batch:
+            submission['attempts'] = submission.get('attempts', 0) + 1
+            if submission['attempts'] < MAX_ATTEMPTS:
+                retried.append(submission)
+        with self.lock:
+            retried = retried[:self.max_size - len(self.submissions)]
+            self.submissions.extend(retried)
+        if len(retried) < len(batch):
+            logger.error('Dropped %d feedback which could not be written',
+                         len(batch) - len(retried))
+
+
+def write_feedback(submissions):
+    """
+    Insert the submissions with one statement. Submissions which refer to an object
+    which doesn't exist (anymore) in their site are dropped.
+    :param submissions: list of dicts as created by parse_submission()
+    :return: number of written feedback objects
+    """
+    submissions_by_type = defaultdict(list)
+    for submission in submissions:
+        submissions_by_type[submission['type']].append(submission)
+    for feedback_type, typed_submissions in submissions_by_type.items():
+        if feedback_type in REFERENCED_FIELDS:
+            referenced_model = Feedback._meta.get_field(
+                REFERENCED_FIELDS[feedback_type]
+            ).related_model
+            existing = set(referenced_model.objects.filter(
+                id__in={submission['object_id'] for submission in typed_submissions},
+            ).values_list('site_id', 'id'))
+            typed_submissions[:] = [
+                submission for submission in typed_submissions
+                if (submission['site_id'], submission['object_id']) in existing
+            ]
+
+    feedbacks = [
+        Feedback(
+            feedback_type=submission['type'],
+            site_id=submission['site_id'],
+            searchQuery=submission.get('query', ''),
+            emotion=submission['emotion'],
+            comment=submission['comment'],
+            **({REFERENCED_FIELDS[submission['type']] + '_id': submission['object_id']}
+               if submission['type'] in REFERENCED_FIELDS else {})
+        )
+        for typed_submissions in submissions_by_type.values()
+        for submission in typed_submissions
+    ]
+    with transaction.atomic():
+        # bulk_create() doesn't send the signal which updates the counts
+        Feedback.objects.bulk_create(feedbacks)
+        DailyFeedbackCount.add(feedbacks)
+    return len(feedbacks)
+
+
+def parse_submission(site, data):
+    """
+    Validate a submission of the app
+    :param site: the site the feedback belongs to
+    :param data: the decoded JSON body of the request
+    :return: dict with the validated fields
+    :raises ValueError: if a field is missing or invalid, with a message for the client
+    """
+    if not isinstance(data, dict):
+        raise ValueError('The body has to be a JSON object.')
+    feedback_type = data.get('type')
+    if feedback_type not in FEEDBACK_TYPES:
+        raise ValueError('Parameter "type" has to be one of {}.'.format(
+            ', '.join(sorted(FEEDBACK_TYPES))
+        ))
+    emotion = data.get('emotion')
+    if emotion not in EMOTIONS:
+        raise ValueError('Parameter "emotion" has to be one of {}.'.format(
+            ', '.join(sorted(EMOTIONS))
+        ))
+    comment = data.get('comment', '')
+    if (not isinstance(comment, str) or len(comment) > MAX_COMMENT_LENGTH
+            or CONTROL_CHARACTERS.search(comment)):
+        raise ValueError(f'Parameter "comment" has to be a text of at most {MAX_COMMENT_LENGTH} '
+                         'characters without control characters.')
+    submission = {
+        'site_id': site.id,
+        'type': feedback_type,
+        'emotion': emotion,
+        'comment': comment,
+    }
+    if feedback_type in REFERENCED_FIELDS:
+        object_id = data.get('id')
+        # bool is a subclass of int
+        if not isinstance(object_id, int) or isinstance(object_id, bool) or object_id < 1:
+            raise ValueError(f'Parameter "id" is required for feedback of type "{feedback_type}".')
+        submission['object_id'] = object_id
+    elif feedback_type == Feedback.SEARCH_RESULT:
+        query = data.get('query')
+        if (not isinstance(query, str) or not query or len(query) > MAX_QUERY_LENGTH
+                or CONTROL_CHARACTERS.search(query)):
+            raise ValueError(f'Parameter "query" is required for feedback of type "search" and '
+                             f'has to be a text of at most {MAX_QUERY_LENGTH} characters without '
+                             'control characters.')
+        submission['query'] = query
+    return submission
+
+
+@csrf_exempt
+@require_POST
+def feedback(request, site_slug):
+    """
+    Accept a feedback of the app, e.g. {"type": "page", "id": 42, "emotion": "Pos"}.
+    The feedback is written asynchronously, so the response doesn't tell whether the referenced
+    object exists.
+    :param request: the current request
+    :param site_slug: slug of the site
+    :return: 202 if the feedback was accepted, 503 if the buffer is full
+    """
+    if request.site is None:
+        return site_not_found(site_slug)
+    try:
+        submission = parse_submission(request.site, json.loads(request.body.decode('utf-8')))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return bad_request('The body has to be JSON encoded in UTF-8.')
+    except ValueError as error:
+        return bad_request(str(error))
+    if not feedback_buffer.add(submission):
+        response = HttpResponse('Too many submissions, please try again later.',
+                                content_type='text/plain', status=503)
+        response['Retry-After'] = str(RETRY_AFTER)
+        return response
+    return HttpResponse(status=202)
+
+
+# the submissions of this process which were not written yet
+feedback_buffer = FeedbackBuffer(
+    max_size=settings.FEEDBACK_BUFFER_SIZE,
+    batch_size=settings.FEEDBACK_BATCH_SIZE,
+    flush_interval=settings.FEEDBACK_FLUSH_INTERVAL,
+)
+atexit.register(feedback_buffer.flush)
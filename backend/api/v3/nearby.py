@@ -0,0 +1,137 @@
+"""
+Queries for the sites and pois near the location of the user, e.g. during the onboarding of the app
+"""
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import HttpResponse, JsonResponse
+
+from cms.models import POI, POITranslation, Site
+
+from .pages import site_not_found
+from .sites import transform_site, with_extras_enabled
+
+# radius in kilometers which is used if the parameter "radius" is missing
+DEFAULT_RADIUS = 50
+MAX_RADIUS = 500
+# number of results per page which are returned if the parameter "per_page" is missing
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+def bad_request(message):
+    return HttpResponse(message, content_type='text/plain', status=400)
+
+
+def parse_location(request):
+    """
+    Read the location and the radius from the query parameters
+    :param request: the current request
+    :return: tuple of latitude, longitude and radius in kilometers
+    :raises ValueError: if a parameter is missing or invalid, with a message for the client
+    """
+    try:
+        latitude = float(request.GET['latitude'])
+        longitude = float(request.GET['longitude'])
+    except (KeyError, ValueError):
+        raise ValueError('Parameters "latitude" and "longitude" are required and have to be '
+                         'numbers.')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Parameters "latitude" and "longitude" are out of range.')
+    try:
+        radius = float(request.GET.get('radius', DEFAULT_RADIUS))
+    except ValueError:
+        raise ValueError('Parameter "radius" has to be a number.')
+    if not 0 < radius <= MAX_RADIUS:
+        raise ValueError(f'Parameter "radius" has to be between 0 and {MAX_RADIUS} km.')
+    return latitude, longitude, radius
+
+
+def paginated_json_response(request, queryset, transform):
+    """
+    Answer with one page of the results, selected by the parameters "page" and "per_page"
+    :param request: the current request
+    :param queryset: ordered queryset of all results
+    :param transform: function which converts one result to its JSON representation
+    :return: JsonResponse with the total count, the number of pages and the results of the page
+    """
+    try:
+        per_page = max(1, min(int(request.GET.get('per_page', DEFAULT_PER_PAGE)), MAX_PER_PAGE))
+    except ValueError:
+        return bad_request('Parameter "per_page" has to be a number.')
+    paginator = Paginator(queryset, per_page)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except InvalidPage as error:
+        return HttpResponse(f'Invalid page: {error}', content_type='text/plain', status=404)
+    return JsonResponse({
+        'count': paginator.count,
+        'page': page.number,
+        'pages': paginator.num_pages,
+        'results': [transform(result) for result in page.object_list],
+    })
+
+
+def nearby_sites(request):
+    """
+    List the sites within the radius around the location, the nearest first.
+    The parameters "latitude", "longitude" and "radius" (in km) define the area.
+    """
+    try:
+        latitude, longitude, radius = parse_location(request)
+    except ValueError as error:
+        return bad_request(str(error))
+
+    def transform_nearby_site(site):
+        return {
+            **transform_site(site),
+            'distance': site.distance,
+        }
+
+    return paginated_json_response(
+        request,
+        with_extras_enabled(Site.get_nearby(latitude, longitude, radius)),
+        transform_nearby_site,
+    )
+
+
+def nearby_pois(request, site_slug, language_code):
+    """
+    List the pois of a site with a public translation within the radius around the location,
+    the nearest first.
+    The parameters "latitude", "longitude" and "radius" (in km) define the area.
+    """
+    try:
+        latitude, longitude, radius = parse_location(request)
+    except ValueError as error:
+        return bad_request(str(error))
+    site = Site.get_by_slug(site_slug)
+    if not site:
+        return site_not_found(site_slug)
+
+    translations = POITranslation.objects.filter(
+        language__code=language_code,
+        public=True,
+    )
+    pois = POI.get_nearby(site, latitude, longitude, radius).annotate(
+        translated=Exists(translations.filter(poi=OuterRef('pk')))
+    ).filter(translated=True).prefetch_related(
+        # only the translations of the pois on the requested page are loaded
+        Prefetch('poi_translations', queryset=translations.order_by('-version'),
+                 to_attr='public_translations')
+    )
+
+    def transform_poi(poi):
+        translation = poi.public_translations[0]
+        return {
+            'id': poi.id,
+            'title': translation.title,
+            'permalink': translation.permalink,
+            'address': poi.address,
+            'postcode': poi.postcode,
+            'city': poi.city,
+            'latitude': poi.latitude,
+            'longitude': poi.longitude,
+            'distance': poi.distance,
+        }
+
+    return paginated_json_response(request, pois, transform_poi)
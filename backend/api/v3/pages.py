@@ -0,0 +1,113 @@
+from django.db.models import Count, Max, Q
+from django.http import HttpResponse
+
+from cms.models import Page, PageTranslation, Site
+
+from .conditional import conditional_json_response, make_etag
+
+
+def get_public_translations(site_slug, language_code):
+    return PageTranslation.objects.filter(
+        page__site__slug=site_slug,
+        page__archived=False,
+        language__code=language_code,
+        public=True,
+    )
+
+
+def get_orders(site_slug):
+    """
+    Determine the position of each page of the site among its siblings
+    :return: dict of positions keyed by page id
+    """
+    orders = {}
+    children_count = {}
+    # pages are ordered by their position in the tree
+    for page_id, parent_id in Page.objects.filter(
+            site__slug=site_slug
+    ).values_list('id', 'parent_id'):
+        orders[page_id] = children_count.get(parent_id, 0)
+        children_count[parent_id] = orders[page_id] + 1
+    return orders
+
+
+def get_order(page):
+    """
+    Determine the position of the page among its siblings
+    """
+    return Page.objects.filter(site_id=page.site_id, parent_id=page.parent_id).filter(
+        Q(tree_id__lt=page.tree_id) | Q(tree_id=page.tree_id, lft__lt=page.lft)
+    ).count()
+
+
+def transform_page(page_translation, order):
+    return {
+        'id': page_translation.page_id,
+        'title': page_translation.title,
+        'text': page_translation.text,
+        'permalink': page_translation.permalink,
+        'parent': page_translation.page.parent_id,
+        'order': order,
+        'last_updated': page_translation.last_updated,
+    }
+
+
+def site_not_found(site_slug):
+    return HttpResponse(f'No Site found with name "{site_slug}".', content_type='text/plain',
+                        status=404)
+
+
+def pages(request, site_slug, language_code):
+    translations = get_public_translations(site_slug, language_code)
+    # the state of all pages is determined in one aggregate query, so unchanged
+    # content can be answered with 304 without loading any page
+    state = translations.aggregate(
+        count=Count('id'),
+        last_updated=Max('last_updated'),
+        page_last_updated=Max('page__last_updated'),
+    )
+    if not state['count'] and not Site.objects.filter(slug=site_slug).exists():
+        return site_not_found(site_slug)
+    last_modified = max(filter(None, [state['last_updated'], state['page_last_updated']]),
+                        default=None)
+
+    def get_result():
+        orders = get_orders(site_slug)
+        return [
+            transform_page(page_translation, orders[page_translation.page_id])
+            for page_translation in translations.select_related('page').order_by(
+                'page__tree_id', 'page__lft'
+            )
+        ]
+
+    return conditional_json_response(
+        request,
+        make_etag(site_slug, language_code, state['count'], state['last_updated'],
+                  state['page_last_updated']),
+        last_modified,
+        get_result,
+    )
+
+
+def single_page(request, site_slug, language_code, page_id):
+    state = get_public_translations(site_slug, language_code).filter(
+        page_id=page_id
+    ).values('last_updated', 'page__last_updated').first()
+    if not state:
+        return HttpResponse(f'No Page found with id "{page_id}".', content_type='text/plain',
+                            status=404)
+    last_modified = max(state['last_updated'], state['page__last_updated'])
+
+    def get_result():
+        page_translation = get_public_translations(site_slug, language_code).select_related(
+            'page'
+        ).get(page_id=page_id)
+        return transform_page(page_translation, get_order(page_translation.page))
+
+    return conditional_json_response(
+        request,
+        make_etag(site_slug, language_code, page_id, state['last_updated'],
+                  state['page__last_updated']),
+        last_modified,
+        get_result,
+    )
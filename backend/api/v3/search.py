@@ -0,0 +1,112 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Func, TextField, Value
+from django.http import HttpResponse, JsonResponse
+
+from cms.models import EventTranslation, PageTranslation, POITranslation, Site
+from cms.models.search import get_search_config
+
+from .pages import site_not_found
+
+# number of results which are returned if the parameter "limit" is missing
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+HEADLINE_OPTIONS = 'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5'
+
+
+def search_translations(translations, text_field, query, config, limit):
+    """
+    Find the best matching translations with their rank and a snippet of the text
+    :param translations: queryset of the translations which are searched
+    :param text_field: name of the field which contains the text of the translations
+    :param query: SearchQuery
+    :param config: text search configuration of the language
+    :param limit: maximum number of results
+    :return: queryset of the results ordered by their rank
+    """
+    return translations.filter(
+        search_vector=query,
+    ).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        # the snippets are only computed for the returned rows, because ts_headline is expensive
+        snippet=Func(
+            Value(config),
+            # the texts contain html, whose tags should not be part of the snippet
+            Func(F(text_field), Value('<[^>]*>'), Value(' '), Value('g'),
+                 function='regexp_replace'),
+            query,
+            Value(HEADLINE_OPTIONS),
+            function='ts_headline',
+            output_field=TextField(),
+        ),
+    ).order_by('-rank')[:limit]
+
+
+def search(request, site_slug, language_code):
+    """
+    Search the public pages, events and pois of a site in the given language.
+    The parameter "q" contains the search terms, "limit" the maximum number of results.
+    The results of all types are ordered by their rank.
+    """
+    terms = request.GET.get('q', '').strip()
+    if not terms:
+        return HttpResponse('Parameter "q" is required.', content_type='text/plain', status=400)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return HttpResponse('Parameter "limit" has to be a number.', content_type='text/plain',
+                            status=400)
+    site = Site.get_by_slug(site_slug)
+    if not site:
+        return site_not_found(site_slug)
+
+    config = get_search_config(language_code)
+    query = SearchQuery(terms, config=config)
+    results = []
+    for page_translation in search_translations(
+            PageTranslation.objects.filter(
+                page__site=site,
+                page__archived=False,
+                language__code=language_code,
+                public=True,
+            ), 'text', query, config, limit
+    ).only('page_id', 'title', 'permalink'):
+        results.append({
+            'type': 'page',
+            'id': page_translation.page_id,
+            'title': page_translation.title,
+            'permalink': page_translation.permalink,
+            'snippet': page_translation.snippet,
+            'rank': page_translation.rank,
+        })
+    for event_translation in search_translations(
+            EventTranslation.objects.filter(
+                event__site=site,
+                language__code=language_code,
+                public=True,
+            ), 'description', query, config, limit
+    ).only('event_id', 'title', 'permalink'):
+        results.append({
+            'type': 'event',
+            'id': event_translation.event_id,
+            'title': event_translation.title,
+            'permalink': event_translation.permalink,
+            'snippet': event_translation.snippet,
+            'rank': event_translation.rank,
+        })
+    for poi_translation in search_translations(
+            POITranslation.objects.filter(
+                poi__site=site,
+                language__code=language_code,
+                public=True,
+            ), 'description', query, config, limit
+    ).only('poi_id', 'title', 'permalink'):
+        results.append({
+            'type': 'poi',
+            'id': poi_translation.poi_id,
+            'title': poi_translation.title,
+            'permalink': poi_translation.permalink,
+            'snippet': poi_translation.snippet,
+            'rank': poi_translation.rank,
+        })
+    results.sort(key=lambda result: result['rank'], reverse=True)
+    return JsonResponse(results[:limit], safe=False)
@@ -1,7 +1,16 @@
+import hashlib
+import json
+import zlib
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Exists, OuterRef
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
 
 from cms.models import Site, Extra, Language
+from cms.models.site import SITE_CACHE_TIMEOUT, SITES_RESPONSE_CACHE_KEY
 
 PREFIXES = [
     'EAE',
@@ -11,36 +20,96 @@ PREFIXES = [
 ]
 
 
-def sites(_):
-    def strip_prefix(name):
-        for p in PREFIXES:
-            if name.startswith(p):
-                return p, name[len(p) + 1:]  # +1 for one whitespace
-        return None, name
-
-    def transform_site(s):
-        prefix, name_without_prefix = strip_prefix(s.name)
-        return {
-            'id': s.slug,
-            'name': s.name,
-            'path': s.slug,
-            'live': s.status == Site.ACTIVE,
-            'prefix': prefix,
-            'name_without_prefix': name_without_prefix,
-            'plz': s.postal_code,
-            'extras': s.extras_enabled,
-            'events': s.events_enabled,
-            'push-notifications': s.push_notifications_enabled,
-            'longitude': s.longitude,
-            'langitude': s.latitude,
-            'aliases': None  # todo
-        }
-
-    result = list(map(transform_site,
-                      Site.objects.exclude(status=Site.ARCHIVED)
-                      .annotate(extras_enabled=Exists(Extra.objects.filter(site=OuterRef('pk'))))
-                      ))
-    return JsonResponse(result, safe=False)  # Turn off Safe-Mode to allow serializing arrays
+def strip_prefix(name):
+    for p in PREFIXES:
+        if name.startswith(p):
+            return p, name[len(p) + 1:]  # +1 for one whitespace
+    return None, name
+
+
+def transform_site(s):
+    prefix, name_without_prefix = strip_prefix(s.name)
+    return {
+        'id': s.slug,
+        'name': s.name,
+        'path': s.slug,
+        'live': s.status == Site.ACTIVE,
+        'prefix': prefix,
+        'name_without_prefix': name_without_prefix,
+        'plz': s.postal_code,
+        'extras': s.extras_enabled,
+        'events': s.events_enabled,
+        'push-notifications': s.push_notifications_enabled,
+        'longitude': s.longitude,
+        'langitude': s.latitude,
+        'aliases': None  # todo
+    }
+
+
+def with_extras_enabled(sites_queryset):
+    return sites_queryset.annotate(extras_enabled=Exists(Extra.objects.filter(site=OuterRef('pk'))))
+
+
+def get_sites_content():
+    """
+    Serialize the sites once and cache the JSON with its gzip-compressed variant and their ETags
+    until a site or an extra changes, but at most SITE_CACHE_TIMEOUT seconds
+    :return: tuple of the quoted ETags of the JSON and of the gzip-compressed JSON, the JSON and
+             the gzip-compressed JSON as bytes
+    """
+    content = cache.get(SITES_RESPONSE_CACHE_KEY)
+    if content is None:
+        result = list(map(transform_site,
+                          with_extras_enabled(Site.objects.exclude(status=Site.ARCHIVED))
+                          ))
+        body = json.dumps(result, cls=DjangoJSONEncoder).encode('utf-8')
+        digest = hashlib.sha1(body).hexdigest()
+        # wbits with 16 adds the gzip header
+        compressor = zlib.compressobj(level=9, wbits=zlib.MAX_WBITS | 16)
+        # the variants have different bytes, so they need different strong ETags
+        content = (quote_etag(digest), quote_etag(digest + '-gzip'), body,
+                   compressor.compress(body) + compressor.flush())
+        cache.set(SITES_RESPONSE_CACHE_KEY, content, SITE_CACHE_TIMEOUT)
+    return content
+
+
+def accepts_gzip(request):
+    """
+    Check whether the client accepts gzip, considering the q-values of Accept-Encoding,
+    e.g. "gzip;q=0" means that gzip is not acceptable
+    :param request: the current request
+    :return: True if gzip has a q-value above 0
+    """
+    qvalues = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        qvalue = 1
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0
+        qvalues[name.lower()] = qvalue
+    return qvalues.get('gzip', qvalues.get('x-gzip', qvalues.get('*', 0))) > 0
+
+
+def sites(request):
+    etag, gzip_etag, body, compressed_body = get_sites_content()
+    use_gzip = accepts_gzip(request)
+    if use_gzip:
+        etag = gzip_etag
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if use_gzip:
+            response = HttpResponse(compressed_body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
 
 
 def pushnew(_):
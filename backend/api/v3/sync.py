@@ -0,0 +1,151 @@
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from cms.models import EventTranslation, PageTranslation, POITranslation, Site, Tombstone
+
+from .pages import get_orders, transform_page
+
+
+def transform_event(event_translation):
+    event = event_translation.event
+    return {
+        'id': event.id,
+        'title': event_translation.title,
+        'description': event_translation.description,
+        'permalink': event_translation.permalink,
+        'start_date': event.start_date,
+        'start_time': event.start_time,
+        'end_date': event.end_date,
+        'end_time': event.end_time,
+        'location': event.location_id,
+        'last_updated': event_translation.last_updated,
+    }
+
+
+def transform_poi(poi_translation):
+    poi = poi_translation.poi
+    return {
+        'id': poi.id,
+        'title': poi_translation.title,
+        'description': poi_translation.description,
+        'permalink': poi_translation.permalink,
+        'address': poi.address,
+        'postcode': poi.postcode,
+        'city': poi.city,
+        'latitude': poi.latitude,
+        'longitude': poi.longitude,
+        'last_updated': poi_translation.last_updated,
+    }
+
+
+def sync(request, site_slug, language_code):
+    """
+    Return all pages, events and pois of a site in the given language.
+    If the parameter "since" is given, only content which changed after this timestamp is
+    returned, together with the ids of content which was deleted, archived or unpublished since
+    then. The returned "timestamp" should be passed as "since" on the next sync.
+    """
+    # taken before any content is loaded, so changes made during this request are not missed
+    timestamp = timezone.now()
+    since = request.GET.get('since')
+    if since:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if not since:
+            return HttpResponse('Parameter "since" has to be an ISO 8601 timestamp.',
+                                content_type='text/plain', status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+
+    try:
+        site = Site.objects.get(slug=site_slug)
+    except Site.DoesNotExist:
+        return HttpResponse(f'No Site found with name "{site_slug}".', content_type='text/plain',
+                            status=404)
+
+    page_translations = PageTranslation.objects.filter(
+        page__site=site,
+        language__code=language_code,
+    ).select_related('page')
+    event_translations = EventTranslation.objects.filter(
+        event__site=site,
+        language__code=language_code,
+    ).select_related('event')
+    poi_translations = POITranslation.objects.filter(
+        poi__site=site,
+        language__code=language_code,
+    ).select_related('poi')
+    deleted = {
+        Tombstone.PAGE: set(),
+        Tombstone.EVENT: set(),
+        Tombstone.POI: set(),
+    }
+    if since:
+        # restoring, moving or reordering a page only changes the page itself, not its
+        # translations, the same applies to the dates of events and the addresses of pois
+        page_translations = page_translations.filter(
+            Q(last_updated__gt=since) | Q(page__last_updated__gt=since)
+        )
+        event_translations = event_translations.filter(
+            Q(last_updated__gt=since) | Q(event__last_updated__gt=since)
+        )
+        poi_translations = poi_translations.filter(
+            Q(last_updated__gt=since) | Q(poi__last_updated__gt=since)
+        )
+        # archiving a page only changes the page itself, not its translations
+        deleted[Tombstone.PAGE].update(PageTranslation.objects.filter(
+            page__site=site,
+            language__code=language_code,
+            page__archived=True,
+            page__last_updated__gt=since,
+        ).values_list('page_id', flat=True))
+        for content_type, object_id in Tombstone.objects.filter(
+                site=site,
+                language__code=language_code,
+                deleted_date__gt=since,
+        ).values_list('content_type', 'object_id'):
+            deleted[content_type].add(object_id)
+
+    pages = []
+    page_translations = list(page_translations.order_by('page__tree_id', 'page__lft'))
+    if page_translations:
+        orders = get_orders(site_slug)
+    for page_translation in page_translations:
+        if page_translation.page.archived or not page_translation.public:
+            if since:
+                deleted[Tombstone.PAGE].add(page_translation.page_id)
+        else:
+            pages.append(transform_page(page_translation, orders[page_translation.page_id]))
+    events = []
+    for event_translation in event_translations:
+        if event_translation.public:
+            events.append(transform_event(event_translation))
+        elif since:
+            deleted[Tombstone.EVENT].add(event_translation.event_id)
+    pois = []
+    for poi_translation in poi_translations:
+        if poi_translation.public:
+            pois.append(transform_poi(poi_translation))
+        elif since:
+            deleted[Tombstone.POI].add(poi_translation.poi_id)
+
+    # content which was deleted and created again in the meantime is not deleted
+    deleted[Tombstone.PAGE].difference_update(page['id'] for page in pages)
+    deleted[Tombstone.EVENT].difference_update(event['id'] for event in events)
+    deleted[Tombstone.POI].difference_update(poi['id'] for poi in pois)
+
+    return JsonResponse({
+        'timestamp': timestamp,
+        'pages': pages,
+        'events': events,
+        'pois': pois,
+        'deleted': {
+            'pages': sorted(deleted[Tombstone.PAGE]),
+            'events': sorted(deleted[Tombstone.EVENT]),
+            'pois': sorted(deleted[Tombstone.POI]),
+        },
+    })
@@ -1,9 +1,9 @@
 from cms.models.site import Site
 
 def site_slug_processor(request):
-    site = Site.get_current_site(request)
+    site = getattr(request, 'site', None)
     if site:
-        sites = Site.objects.exclude(slug=site.slug)
+        sites = [other_site for other_site in Site.get_sites() if other_site.slug != site.slug]
     else:
-        sites = Site.objects.all()
+        sites = Site.get_sites()
     return {'sites': sites, 'site': site}
@@ -0,0 +1,286 @@
+"""
+Measurements of the requests, which are collected by backend.middleware.InstrumentationMiddleware.
+They are kept in the memory of each process: the latest requests in a ring buffer and the totals
+per view, which are exported for Prometheus.
+"""
+import threading
+import time
+from collections import Counter, deque
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.template.backends.django import Template
+
+# number of duplicated SQL statements which are kept per request
+TOP_STATEMENTS = 5
+# longer statements are truncated
+MAX_STATEMENT_LENGTH = 500
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+class RequestMeasurement:
+    """
+    The database queries and template renderings of one request
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        # nesting depth of template renderings, only the outermost one is measured
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def get_duplicated_statements(self):
+        """
+        The statements which were executed more than once, which is typical for N+1 queries
+        :return: list of tuples of the statement and its count, the most frequent first
+        """
+        return [(statement[:MAX_STATEMENT_LENGTH], count)
+                for statement, count in self.statements.most_common(TOP_STATEMENTS) if count > 1]
+
+
+class InstrumentedCursor:
+    """
+    Wrapper of a database cursor which adds the time of each query to the current measurement
+    """
+
+    def __init__(self, cursor_wrapper, measurement):
+        # the attribute "cursor" of the wrapper is the cursor of the database driver
+        self.cursor_wrapper = cursor_wrapper
+        self.measurement = measurement
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor_wrapper, attr)
+
+    def __iter__(self):
+        return iter(self.cursor_wrapper)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cursor_wrapper.__exit__(exc_type, exc_value, traceback)
+
+    def measure(self, method, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self.measurement.query_time += time.perf_counter() - start
+            self.measurement.query_count += 1
+            # the statements are counted without their parameters
+            self.measurement.statements[sql] += 1
+
+    def execute(self, sql, params=None):
+        return self.measure(self.cursor_wrapper.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self.measure(self.cursor_wrapper.executemany, sql, param_list)
+
+    def callproc(self, procname, params=None):
+        return self.measure(self.cursor_wrapper.callproc, procname, params)
+
+
+def install():
+    """
+    Wrap the creation of database cursors and the rendering of templates once per process.
+    The wrappers only measure while a measurement of the current thread is active.
+    """
+    global _installed  # pylint: disable=global-statement
+    with _install_lock:
+        if _installed:
+            return
+        make_cursor = BaseDatabaseWrapper.make_cursor
+        make_debug_cursor = BaseDatabaseWrapper.make_debug_cursor
+        render = Template.render
+
+        def instrument_cursor(original):
+            def wrapper(self, cursor):
+                wrapped_cursor = original(self, cursor)
+                measurement = getattr(_local, 'measurement', None)
+                if measurement is None:
+                    return wrapped_cursor
+                return InstrumentedCursor(wrapped_cursor, measurement)
+            return wrapper
+
+        def instrumented_render(self, context=None, request=None):
+            measurement = getattr(_local, 'measurement', None)
+            if measurement is None:
+                return render(self, context, request)
+            measurement.template_depth += 1
+            start = time.perf_counter()
+            try:
+                return render(self, context, request)
+            finally:
+                measurement.template_depth -= 1
+                if not measurement.template_depth:
+                    measurement.template_time += time.perf_counter() - start
+
+        BaseDatabaseWrapper.make_cursor = instrument_cursor(make_cursor)
+        BaseDatabaseWrapper.make_debug_cursor = instrument_cursor(make_debug_cursor)
+        Template.render = instrumented_render
+        _installed = True
+
+
+def start_measurement():
+    _local.measurement = RequestMeasurement()
+    return _local.measurement
+
+
+def stop_measurement():
+    _local.measurement = None
+
+
+class Metrics:
+    """
+    Thread-safe store of the measured requests
+    """
+
+    def __init__(self, size=1000):
+        self.lock = threading.Lock()
+        self.requests = deque(maxlen=size)
+        # cumulative totals per view since the start of the process
+        self.totals = {}
+
+    def resize(self, size):
+        with self.lock:
+            if size != self.requests.maxlen:
+                self.requests = deque(self.requests, maxlen=size)
+
+    def record(self, view_name, method, status, duration, measurement):
+        """
+        Store the measurement of a finished request
+        :param view_name: name of the resolved url or the path of the view function
+        :param method: HTTP method
+        :param status: status code of the response
+        :param duration: latency in seconds
+        :param measurement: RequestMeasurement of the request
+        """
+        request = {
+            'view': view_name,
+            'method': method,
+            'status': status,
+            'duration': duration,
+            'query_count': measurement.query_count,
+            'query_time': measurement.query_time,
+            'template_time': measurement.template_time,
+            'duplicated_statements': measurement.get_duplicated_statements(),
+            'time': time.time(),
+        }
+        with self.lock:
+            self.requests.append(request)
+            totals = self.totals.setdefault(view_name, {
+                'count': 0,
+                'duration': 0.0,
+                'query_count': 0,
+                'query_time': 0.0,
+                'template_time': 0.0,
+                'statuses': Counter(),
+            })
+            totals['count'] += 1
+            totals['duration'] += duration
+            totals['query_count'] += measurement.query_count
+            totals['query_time'] += measurement.query_time
+            totals['template_time'] += measurement.template_time
+            totals['statuses'][status] += 1
+
+    def get_requests(self):
+        with self.lock:
+            return list(self.requests)
+
+    def get_views(self):
+        """
+        Summarize the requests in the ring buffer per view
+        :return: list of dicts, the view with the highest total latency first
+        """
+        views = {}
+        for request in self.get_requests():
+            view = views.setdefault(request['view'], {
+                'view': request['view'],
+                'count': 0,
+                'durations': [],
+                'query_count': 0,
+                'query_time': 0.0,
+                'template_time': 0.0,
+                'duplicated_statements': Counter(),
+            })
+            view['count'] += 1
+            view['durations'].append(request['duration'])
+            view['query_count'] += request['query_count']
+            view['query_time'] += request['query_time']
+            view['template_time'] += request['template_time']
+            for statement, count in request['duplicated_statements']:
+                view['duplicated_statements'][statement] += count
+        result = []
+        for view in views.values():
+            durations = sorted(view.pop('durations'))
+            count = view['count']
+            result.append({
+                **view,
+                'total_duration': sum(durations),
+                'average_duration': sum(durations) / count,
+                'p95_duration': durations[min(int(count * 0.95), count - 1)],
+                'max_duration': durations[-1],
+                'average_query_count': view['query_count'] / count,
+                'average_query_time': view['query_time'] / count,
+                'average_template_time': view['template_time'] / count,
+                'duplicated_statements': view['duplicated_statements'].most_common(TOP_STATEMENTS),
+            })
+        result.sort(key=lambda view: view['total_duration'], reverse=True)
+        return result
+
+    def render_prometheus(self):
+        """
+        Export the totals per view in the text format of Prometheus
+        :return: String
+        """
+        with self.lock:
+            totals = {view: {**view_totals, 'statuses': dict(view_totals['statuses'])}
+                      for view, view_totals in self.totals.items()}
+        lines = []
+
+        def add_metric(name, metric_type, help_text, samples):
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            for suffix, labels, value in samples:
+                label_text = ','.join('{}="{}"'.format(key, escape_label(value))
+                                      for key, value in labels)
+                lines.append('{}{}{{{}}} {}'.format(name, suffix, label_text, value))
+
+        add_metric('cms_request_duration_seconds', 'summary', 'Latency of the requests.', [
+            sample
+            for view, view_totals in sorted(totals.items())
+            for sample in (('_count', [('view', view)], view_totals['count']),
+                           ('_sum', [('view', view)], view_totals['duration']))
+        ])
+        add_metric('cms_responses_total', 'counter', 'Responses by status code.', [
+            ('', [('view', view), ('status', status)], count)
+            for view, view_totals in sorted(totals.items())
+            for status, count in sorted(view_totals['statuses'].items())
+        ])
+        add_metric('cms_db_queries_total', 'counter', 'Database queries of the requests.', [
+            ('', [('view', view)], view_totals['query_count'])
+            for view, view_totals in sorted(totals.items())
+        ])
+        add_metric('cms_db_query_duration_seconds_total', 'counter',
+                   'Time spent in database queries.', [
+                       ('', [('view', view)], view_totals['query_time'])
+                       for view, view_totals in sorted(totals.items())
+                   ])
+        add_metric('cms_template_render_duration_seconds_total', 'counter',
+                   'Time spent rendering templates.', [
+                       ('', [('view', view)], view_totals['template_time'])
+                       for view, view_totals in sorted(totals.items())
+                   ])
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# the measurements of this process
+metrics = Metrics()
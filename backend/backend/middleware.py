@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from cms.models.site import Site
+
+from . import instrumentation
+
+
+class SiteMiddleware:
+    """
+    Resolves the site of the current request once and attaches it as request.site
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.site = None
+        return self.get_response(request)
+
+    # pylint: disable=unused-argument
+    @staticmethod
+    def process_view(request, view_func, view_args, view_kwargs):
+        site_slug = view_kwargs.get('site_slug')
+        if site_slug:
+            request.site = Site.get_by_slug(site_slug)
+
+
+class InstrumentationMiddleware:
+    """
+    Measures the latency, the database queries and the template rendering of each request.
+    It is only active if the setting INSTRUMENTATION_ENABLED is True, the measurements can be
+    viewed at the url "instrumentation" and scraped by Prometheus at "instrumentation/metrics".
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrumentation.install()
+        instrumentation.metrics.resize(settings.INSTRUMENTATION_BUFFER_SIZE)
+
+    def __call__(self, request):
+        measurement = instrumentation.start_measurement()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.stop_measurement()
+        resolver_match = getattr(request, 'resolver_match', None)
+        instrumentation.metrics.record(
+            resolver_match.view_name if resolver_match else '<unresolved>',
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+            measurement,
+        )
+        return response
@@ -47,12 +47,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'backend.middleware.SiteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -93,6 +95,18 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+# The memory cache is separate in every process. The signals only invalidate the cache of the
+# process which saved a change, the other processes rely on the timeouts of the cached values.
+# Deployments with several processes should share a cache, e.g. with
+# 'django.core.cache.backends.memcached.MemcachedCache'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
@@ -153,3 +167,33 @@ CSRF_FAILURE_VIEW = 'cms.views.general.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Events
+# Number of days into the future for which event occurrences are stored
+EVENT_OCCURRENCE_HORIZON = 365
+# Number of days into the past for which event occurrences are kept
+EVENT_OCCURRENCE_RETENTION = 30
+
+# Push notifications
+# Backend which delivers the push notifications
+PUSH_NOTIFICATION_GATEWAY = 'cms.views.push_notifications.push_notification_sender.FirebaseGateway'
+# Path of the JSON key file of a service account of the Firebase project, required by the
+# FirebaseGateway
+FCM_CREDENTIALS = ''
+
+# Instrumentation
+# Measure the latency, database queries and template rendering of every request
+INSTRUMENTATION_ENABLED = False
+# Number of the latest requests which are kept in memory
+INSTRUMENTATION_BUFFER_SIZE = 1000
+# Bearer token which Prometheus can use to scrape the metrics without a login
+INSTRUMENTATION_METRICS_TOKEN = ''
+
+# Feedback
+# Maximum number of submitted feedback per process which are not written yet, further submissions
+# are rejected until the buffer was written
+FEEDBACK_BUFFER_SIZE = 10000
+# Number of feedback which are written at once
+FEEDBACK_BATCH_SIZE = 500
+# Seconds after which the buffered feedback is written even if the batch is not full
+FEEDBACK_FLUSH_INTERVAL = 2
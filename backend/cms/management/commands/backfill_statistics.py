@@ -0,0 +1,77 @@
+"""
+Command to load the daily unique visitors of a timerange from Matomo into the database
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from ...models import DailyVisitorCount, Site
+from ...views.statistics.visitor_cache import get_matomo_api_manager
+
+
+class Command(BaseCommand):
+    help = 'Load the daily unique visitors of all sites with enabled statistics from Matomo'
+    # number of days which are requested from Matomo at once
+    chunk_size = 365
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_date', help='first day, formatted as yyyy-mm-dd')
+        parser.add_argument('--end-date', help='last day, defaults to yesterday')
+        parser.add_argument('--site', help='slug of the site, defaults to all sites')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = parse_date(options['start_date'])
+            end_date = parse_date(options['end_date']) if options['end_date'] else (
+                date.today() - timedelta(days=1)
+            )
+        except ValueError:
+            # well formatted, but not a valid date like 2019-02-30
+            start_date = end_date = None
+        if not start_date or not end_date:
+            raise CommandError('Dates have to be valid and formatted as yyyy-mm-dd')
+        # the current day is not over yet, so its numbers still change
+        end_date = min(end_date, date.today() - timedelta(days=1))
+        if options['site']:
+            sites = list(Site.objects.filter(slug=options['site']))
+            if not sites:
+                raise CommandError('Site "{}" does not exist'.format(options['site']))
+            if not sites[0].statistics_configured:
+                raise CommandError('Statistics are not configured for site "{}"'.format(
+                    options['site']
+                ))
+        else:
+            sites = Site.objects.filter(statistics_enabled=True)
+
+        for site in sites:
+            if not site.statistics_configured:
+                # the numbers of another Matomo site would be stored for this site
+                self.stderr.write('{}: Matomo url or id is missing, skipped'.format(site.slug))
+                continue
+            with get_matomo_api_manager(site) as api_man:
+                languages = site.languages
+                chunk_start = start_date
+                while chunk_start <= end_date:
+                    chunk_end = min(chunk_start + timedelta(days=self.chunk_size - 1), end_date)
+                    responses = api_man.get_daily_visitors_per_language(
+                        chunk_start, chunk_end, site.matomo_id,
+                        [language.code for language in languages]
+                    )
+                    with transaction.atomic():
+                        DailyVisitorCount.objects.filter(
+                            site=site,
+                            language__in=languages,
+                            date__range=(chunk_start, chunk_end),
+                        ).delete()
+                        DailyVisitorCount.objects.bulk_create([
+                            DailyVisitorCount(site=site, language=language, date=day,
+                                              visitors=visitors)
+                            for language, response in zip(languages, responses)
+                            for day, visitors in response.items()
+                            if chunk_start <= day <= chunk_end
+                        ], batch_size=1000)
+                    self.stdout.write('{}: {} - {}'.format(site.slug, chunk_start, chunk_end))
+                    chunk_start = chunk_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS('Statistics loaded successfully'))
@@ -0,0 +1,32 @@
+"""
+Command to delete the old revisions of the page translations according to the retention policy
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...models import PageRevision, PageTranslation
+
+
+class Command(BaseCommand):
+    help = 'Delete the page revisions which are older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='revisions of the last days are kept')
+        parser.add_argument('--keep', type=int, default=50,
+                            help='number of the latest revisions per translation which are kept')
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('At least the latest revision has to be kept')
+        before = timezone.now() - timedelta(days=options['days'])
+        # only translations with revisions which might be deleted
+        page_translations = PageTranslation.objects.filter(
+            revisions__created_date__lt=before,
+        ).distinct().only('id')
+        count = 0
+        for page_translation in page_translations.iterator():
+            count += PageRevision.compact(page_translation, options['keep'], before)
+        self.stdout.write(self.style.SUCCESS('Deleted {} page revisions'.format(count)))
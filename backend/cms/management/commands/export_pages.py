@@ -0,0 +1,26 @@
+"""
+Command to export the page tree of a site as JSON lines
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Site
+from ...views.pages.page_transfer import export_pages
+
+
+class Command(BaseCommand):
+    help = 'Export all pages of a site with their translations as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('site', help='slug of the site')
+        parser.add_argument('--output', help='path of the file, defaults to stdout')
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(slug=options['site']).first()
+        if not site:
+            raise CommandError('No Site found with name "{}"'.format(options['site']))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(export_pages(site))
+        else:
+            for line in export_pages(site):
+                self.stdout.write(line, ending='')
@@ -0,0 +1,31 @@
+"""
+Command to import a page tree from JSON lines into a site
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Site
+from ...views.pages.page_transfer import import_pages
+
+
+class Command(BaseCommand):
+    help = 'Import pages with their translations from JSON lines as new page trees of a site'
+
+    def add_arguments(self, parser):
+        parser.add_argument('site', help='slug of the site')
+        parser.add_argument('file', help='path of the file or "-" for stdin')
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(slug=options['site']).first()
+        if not site:
+            raise CommandError('No Site found with name "{}"'.format(options['site']))
+        try:
+            if options['file'] == '-':
+                count = import_pages(site, sys.stdin)
+            else:
+                with open(options['file'], encoding='utf-8') as lines:
+                    count = import_pages(site, lines)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS('Imported {} pages'.format(count)))
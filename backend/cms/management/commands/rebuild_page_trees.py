@@ -0,0 +1,16 @@
+"""
+Command to renumber the page trees from the parent links of the pages
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import Page
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the page trees, so the trees of each site use their own range of tree ids'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Page.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS('Page trees rebuilt successfully'))
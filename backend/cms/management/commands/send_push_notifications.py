@@ -0,0 +1,48 @@
+"""
+Worker which queues the scheduled push notifications when they are due and delivers the queued
+push notifications.
+It should run permanently, e.g. as a systemd service. Several workers can run at the same time.
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import PushNotification
+from ...views.push_notifications.push_notification_sender import (
+    get_gateway,
+    send_pending_deliveries,
+)
+
+
+class Command(BaseCommand):
+    help = 'Send the queued and due scheduled push notifications and retry the failed deliveries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='number of deliveries which are sent at once')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='seconds to wait when no delivery is due')
+        parser.add_argument('--once', action='store_true',
+                            help='exit when no delivery is due instead of waiting')
+
+    def handle(self, *args, **options):
+        try:
+            gateway = get_gateway()
+        except ImproperlyConfigured as exception:
+            raise CommandError('The push notification gateway {} is not configured: {}'.format(
+                settings.PUSH_NOTIFICATION_GATEWAY, exception
+            ))
+        while True:
+            scheduled_count = PushNotification.queue_scheduled()
+            if scheduled_count:
+                self.stdout.write('Queued {} scheduled push notifications'.format(scheduled_count))
+            count = send_pending_deliveries(gateway, batch_size=options['batch_size'])
+            if count:
+                self.stdout.write('Attempted {} deliveries'.format(count))
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('No deliveries are due'))
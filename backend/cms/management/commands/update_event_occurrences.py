@@ -0,0 +1,32 @@
+"""
+Command to move the window of the stored event occurrences, see Event.get_occurrence_window().
+It should be run daily, e.g. by a cron job.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from ...models import Event, EventOccurrence
+
+
+class Command(BaseCommand):
+    help = ('Delete the expired event occurrences and store the new ones of all events which '
+            'are not over yet')
+
+    def handle(self, *args, **options):
+        expired_count = EventOccurrence.delete_expired()
+        today = date.today()
+        # the occurrences of past events are complete already
+        events = Event.objects.filter(
+            Q(end_date__gte=today)
+            | Q(recurrence_rule__isnull=False, recurrence_rule__end_date__isnull=True)
+            | Q(recurrence_rule__end_date__gte=today)
+        ).select_related('recurrence_rule')
+        for event in events.iterator():
+            event.extend_occurrences()
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted {} expired occurrences and extended the occurrences of {} events'.format(
+                expired_count, events.count()
+            )
+        ))
@@ -0,0 +1,41 @@
+"""
+Command to recompute the outdated flags of the page translations, e.g. after bulk changes which
+skipped the signals. It has to run once after the migration which adds content_updated.
+"""
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from ...models import PageTranslation, Site
+from ...models.site import TRANSLATION_COVERAGE_CACHE_KEY
+
+
+class Command(BaseCommand):
+    help = 'Recompute which page translations are older than their source translation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', help='slug of the site, all sites by default')
+
+    def handle(self, *args, **options):
+        sites = Site.objects.all()
+        if options['site']:
+            sites = sites.filter(slug=options['site'])
+            if not sites.exists():
+                raise CommandError('Site "{}" does not exist'.format(options['site']))
+        # the migration sets content_updated of the existing translations to the time of the
+        # migration, which is after their last change. Saves set it before last_updated.
+        backfilled_count = PageTranslation.objects.filter(
+            page__site__in=sites,
+            content_updated__gt=F('last_updated'),
+        ).update(content_updated=F('last_updated'))
+        if backfilled_count:
+            self.stdout.write('Set the content change of {} page translations to their last '
+                              'change'.format(backfilled_count))
+        for site in sites:
+            PageTranslation.update_outdated(site)
+            cache.delete(TRANSLATION_COVERAGE_CACHE_KEY.format(site.id))
+            self.stdout.write('{}: {} outdated page translations'.format(
+                site.slug,
+                PageTranslation.objects.filter(page__site=site, outdated=True).count()
+            ))
+        self.stdout.write(self.style.SUCCESS('Outdated translations updated successfully'))
@@ -0,0 +1,25 @@
+"""
+Command to recompute the materialized permalinks of all page translations
+"""
+from django.core.management.base import BaseCommand
+
+from ...models import PageTranslation
+
+
+class Command(BaseCommand):
+    help = 'Recompute the permalinks of all page translations'
+
+    def handle(self, *args, **options):
+        page_translations = PageTranslation.objects.select_related(
+            'page__site',
+            'language',
+        ).order_by('page__tree_id', 'page__lft')
+        count = 0
+        # ancestors are handled before their descendants
+        for page_translation in page_translations.iterator():
+            if page_translation.build_permalink() != page_translation.permalink:
+                page_translation.save(update_fields=['permalink', 'last_updated'])
+                count += 1
+        self.stdout.write(self.style.SUCCESS(
+            'Updated permalinks of {} page translations'.format(count)
+        ))
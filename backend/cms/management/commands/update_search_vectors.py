@@ -0,0 +1,17 @@
+"""
+Command to recompute the full-text search vectors of all translations
+"""
+from django.core.management.base import BaseCommand
+
+from ...models import EventTranslation, PageTranslation, POITranslation
+from ...models.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the search vectors of all page, event and poi translations'
+
+    def handle(self, *args, **options):
+        update_search_vectors(PageTranslation.objects.all(), 'text')
+        update_search_vectors(EventTranslation.objects.all(), 'description')
+        update_search_vectors(POITranslation.objects.all(), 'description')
+        self.stdout.write(self.style.SUCCESS('Search vectors updated successfully'))
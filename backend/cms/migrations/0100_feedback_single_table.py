@@ -0,0 +1,205 @@
+"""
+Migration of the feedback from multi-table inheritance to one table, see cms.models.feedback.
+The rows of the child tables are copied into the new columns of the feedback table, the site of
+feedback about pages, extras and events is the site of the object. Feedback on search results
+didn't store its site, so it is kept without a site. The daily counts are computed out of the
+existing feedback.
+
+The other migrations of this app are generated on each installation, so this migration follows the
+latest one which was generated before. On a new installation, there is no feedback to migrate and
+the generated initial migration already contains the new tables. An existing installation has to
+generate and apply the migrations of the previous version before it is updated, see the README.
+"""
+import os
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FEEDBACK_TYPES = [('site', 'Site'), ('page', 'Page'), ('technical', 'Technical'),
+                  ('extra', 'Extra'), ('event', 'Event'), ('search', 'Search result')]
+
+# the child tables with their column of the referenced object and the table of the object
+CHILD_TABLES = [
+    ('site', 'cms_sitefeedback', 'site_id', None),
+    ('page', 'cms_pagefeedback', 'page_id', 'cms_page'),
+    ('technical', 'cms_technicalfeedback', 'page_id', 'cms_page'),
+    ('extra', 'cms_extrafeedback', 'extra_id', 'cms_extra'),
+    ('event', 'cms_eventfeedback', 'event_id', 'cms_event'),
+    ('search', 'cms_searchresultfeedback', None, None),
+]
+OBJECT_COLUMNS = ['page_id', 'extra_id', 'event_id']
+
+
+def get_previous_migrations():
+    name = os.path.splitext(os.path.basename(__file__))[0]
+    previous_names = sorted(
+        os.path.splitext(file_name)[0] for file_name in os.listdir(os.path.dirname(__file__))
+        if re.fullmatch(r'[0-9]{4}_\w+\.py', file_name) and file_name < name
+    )
+    return previous_names[-1:]
+
+
+def get_keep_statement():
+    """
+    The rows of the child tables are kept in a temporary table until their columns are added to
+    the feedback table, because the child models can't exist next to the new fields
+    """
+    selects = []
+    for feedback_type, table, column, object_table in CHILD_TABLES:
+        columns = ["'{}'::varchar AS feedback_type".format(feedback_type)]
+        if column is None:
+            columns.append('NULL::integer AS site_id')
+            join = ''
+        elif object_table is None:
+            columns.append('child.{} AS site_id'.format(column))
+            join = ''
+        else:
+            columns.append('object.site_id AS site_id')
+            join = ' JOIN {} object ON object.id = child.{}'.format(object_table, column)
+        columns.extend(
+            '{}::integer AS {}'.format('child.' + column if object_column == column else 'NULL',
+                                       object_column)
+            for object_column in OBJECT_COLUMNS
+        )
+        columns.append('{}::varchar AS "searchQuery"'.format(
+            "''" if column else 'child."searchQuery"'
+        ))
+        selects.append('SELECT child.feedback_ptr_id, {} FROM {} child{}'.format(
+            ', '.join(columns), table, join
+        ))
+    return 'CREATE TEMPORARY TABLE feedback_migration ON COMMIT DROP AS {}'.format(
+        ' UNION ALL '.join(selects)
+    )
+
+
+COPY_STATEMENTS = [
+    'UPDATE cms_feedback SET feedback_type = kept.feedback_type, site_id = kept.site_id, '
+    'page_id = kept.page_id, extra_id = kept.extra_id, event_id = kept.event_id, '
+    '"searchQuery" = kept."searchQuery" '
+    'FROM feedback_migration kept WHERE kept.feedback_ptr_id = cms_feedback.id',
+    # feedback without child row has no type, it could only be created outside of the cms
+    'DELETE FROM cms_feedback WHERE feedback_type IS NULL',
+    # otherwise PostgreSQL can't alter the table because of the pending checks of the foreign keys
+    'SET CONSTRAINTS ALL IMMEDIATE',
+]
+
+
+PREVIOUS_MIGRATIONS = get_previous_migrations()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [('cms', name) for name in PREVIOUS_MIGRATIONS]
+
+    operations = [
+        migrations.RunSQL(get_keep_statement()),
+        migrations.DeleteModel(name='SiteFeedback'),
+        migrations.DeleteModel(name='PageFeedback'),
+        migrations.DeleteModel(name='TechnicalFeedback'),
+        migrations.DeleteModel(name='ExtraFeedback'),
+        migrations.DeleteModel(name='EventFeedback'),
+        migrations.DeleteModel(name='SearchResultFeedback'),
+        migrations.AddField(
+            model_name='feedback',
+            name='feedback_type',
+            field=models.CharField(choices=FEEDBACK_TYPES, max_length=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True,
+                                    on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='feedback', to='cms.Site'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='page',
+            field=models.ForeignKey(blank=True, null=True,
+                                    on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='feedback', to='cms.Page'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='extra',
+            field=models.ForeignKey(blank=True, null=True,
+                                    on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='feedback', to='cms.Extra'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='event',
+            field=models.ForeignKey(blank=True, null=True,
+                                    on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='feedback', to='cms.Event'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='searchQuery',
+            field=models.CharField(blank=True, default='', max_length=1000),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='comment',
+            field=models.CharField(blank=True, max_length=1000),
+        ),
+        migrations.RunSQL(COPY_STATEMENTS),
+        migrations.AlterField(
+            model_name='feedback',
+            name='feedback_type',
+            field=models.CharField(choices=FEEDBACK_TYPES, max_length=9),
+        ),
+        *(
+            migrations.CreateModel(
+                name=name,
+                fields=[],
+                options={'proxy': True, 'indexes': []},
+                bases=('cms.feedback',),
+            )
+            for name in ('SiteFeedback', 'PageFeedback', 'TechnicalFeedback', 'ExtraFeedback',
+                         'EventFeedback', 'SearchResultFeedback')
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['site', 'readStatus', 'created_date'],
+                               name='cms_feedbac_site_id_aebda7_idx'),
+        ),
+        migrations.CreateModel(
+            name='DailyFeedbackCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False,
+                                        verbose_name='ID')),
+                ('feedback_type', models.CharField(choices=FEEDBACK_TYPES, max_length=9)),
+                ('object_id', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('positive', models.PositiveIntegerField(default=0)),
+                ('negative', models.PositiveIntegerField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='daily_feedback_counts',
+                                           to='cms.Site')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyfeedbackcount',
+            unique_together={('feedback_type', 'object_id', 'date')},
+        ),
+        migrations.AddIndex(
+            model_name='dailyfeedbackcount',
+            index=models.Index(fields=['site', 'feedback_type', 'date'],
+                               name='cms_dailyfe_site_id_750859_idx'),
+        ),
+        migrations.RunSQL([(
+            # the counts of the existing feedback per local day, see DailyFeedbackCount.add()
+            "INSERT INTO cms_dailyfeedbackcount "
+            "(site_id, feedback_type, object_id, date, positive, negative) "
+            "SELECT site_id, feedback_type, "
+            "CASE feedback_type WHEN 'site' THEN site_id WHEN 'extra' THEN extra_id "
+            "WHEN 'event' THEN event_id ELSE page_id END, "
+            "(created_date AT TIME ZONE %s)::date, "
+            "count(*) FILTER (WHERE emotion = 'Pos'), count(*) FILTER (WHERE emotion <> 'Pos') "
+            "FROM cms_feedback WHERE feedback_type <> 'search' GROUP BY 1, 2, 3, 4",
+            [settings.TIME_ZONE]
+        )]),
+    ] if PREVIOUS_MIGRATIONS else []
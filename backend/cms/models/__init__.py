@@ -1,5 +1,6 @@
 from .event import Event
 from .event import RecurrenceRule
+from .event import EventOccurrence
 from .event import EventTranslation
 
 from .extra import Extra
@@ -12,12 +13,14 @@ from .feedback import TechnicalFeedback
 from .feedback import ExtraFeedback
 from .feedback import EventFeedback
 from .feedback import SearchResultFeedback
+from .feedback import DailyFeedbackCount
 
 from .language import LanguageTreeNode
 from .language import Language
 
 from .page import Page
 from .page import PageTranslation
+from .page_revision import PageRevision
 
 from .poi import POI
 from .poi import POITranslation
@@ -27,5 +30,10 @@ from .postal_code_in_post_parameter_extra import PostalCodeInPostParameterExtra
 
 from .push_notification import PushNotification
 from .push_notification import PushNotificationTranslation
+from .push_notification import PushNotificationDelivery
 
 from .site import Site
+
+from .statistics import DailyVisitorCount
+
+from .tombstone import Tombstone
@@ -3,18 +3,25 @@
 Raises:
     ValidationError: Raised when an value does not match the requirements
 """
-from datetime import datetime, time, date
+from datetime import datetime, time, date, timedelta
 
+from dateutil import rrule as rrule_frequencies
 from dateutil.rrule import weekday, rrule
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 from .site import Site
 from .language import Language
+from .search import build_search_vector
 from .poi import POI
 
 
@@ -53,7 +60,7 @@ class RecurrenceRule(models.Model):
 
     def clean(self):
         if self.frequency == RecurrenceRule.WEEKLY \
-                and (self.weekdays_for_weekly is None or self.weekdays_for_weekly.size() == 0):
+                and not self.weekdays_for_weekly:
             raise ValidationError('No weekdays selected for weekly recurrence')
         if self.frequency == 'monthly' and (
                 self.weekday_for_monthly is None or self.week_for_monthly is None):
@@ -80,6 +87,8 @@ class Event(models.Model):
     end_time = models.TimeField(null=True)
     recurrence_rule = models.OneToOneField(RecurrenceRule, null=True, on_delete=models.SET_NULL)
     picture = models.ImageField(null=True, blank=True, upload_to='events/%Y/%m/%d')
+    # changes of the dates or the location, which are part of all translations in the api
+    last_updated = models.DateTimeField(auto_now=True)
 
     def clean(self):
         if self.recurrence_rule:
@@ -136,19 +145,22 @@ class Event(models.Model):
             until = min(end, datetime.combine(recurrence.end_date
                                               if recurrence.end_date
                                               else date.max, time.max))
+            # rrule expects the frequency constants of dateutil
+            frequency = getattr(rrule_frequencies, recurrence.frequency)
             if recurrence.frequency in (RecurrenceRule.DAILY, RecurrenceRule.YEARLY):
-                occurrences = rrule(recurrence.frequency,
+                occurrences = rrule(frequency,
                                     dtstart=event_start,
                                     interval=recurrence.interval,
                                     until=until)
             elif recurrence.frequency == RecurrenceRule.WEEKLY:
-                occurrences = rrule(recurrence.frequency,
+                occurrences = rrule(frequency,
                                     dtstart=event_start,
                                     interval=recurrence.interval,
-                                    byweekday=recurrence.weekdays_for_weekly,
+                                    # without weekdays, rrule uses the weekday of dtstart
+                                    byweekday=recurrence.weekdays_for_weekly or None,
                                     until=until)
             else:
-                occurrences = rrule(recurrence.frequency,
+                occurrences = rrule(frequency,
                                     dtstart=event_start,
                                     interval=recurrence.interval,
                                     byweekday=weekday(recurrence.weekday_for_monthly,
@@ -157,6 +169,227 @@ class Event(models.Model):
             return [x for x in occurrences if start <= x <= end or start <= x + event_span <= end]
         return [event_start] if start <= event_start <= end or start <= event_end <= end else []
 
+    @staticmethod
+    def get_occurrence_window():
+        """
+        Returns the range in which occurrences are stored, from settings.EVENT_OCCURRENCE_RETENTION
+        days ago until settings.EVENT_OCCURRENCE_HORIZON days from now
+        :return: tuple of naive datetimes in the current time zone
+        """
+        now = timezone.make_naive(timezone.now())
+        return (now - timedelta(days=settings.EVENT_OCCURRENCE_RETENTION),
+                now + timedelta(days=settings.EVENT_OCCURRENCE_HORIZON))
+
+    def get_occurrence_objects(self, occurrences):
+        """
+        Creates the unsaved database objects of the given occurrences
+        :param occurrences: list of start datetimes as returned by compute_occurrences()
+        :return: list of EventOccurrence objects
+        """
+        event_start = datetime.combine(self.start_date,
+                                       self.start_time if self.start_time else time.min)
+        event_end = datetime.combine(self.end_date, self.end_time if self.end_time else time.max)
+        event_span = event_end - event_start
+        return [
+            EventOccurrence(
+                event=self,
+                site_id=self.site_id,
+                start=timezone.make_aware(occurrence),
+                end=timezone.make_aware(occurrence + event_span),
+            ) for occurrence in occurrences
+        ]
+
+    def update_occurrences(self):
+        """
+        Regenerate the stored occurrences of the event within get_occurrence_window(), e.g. after
+        its dates or its recurrence rule changed
+        """
+        window_start, window_end = self.get_occurrence_window()
+        with transaction.atomic():
+            self.occurrences.all().delete()
+            EventOccurrence.objects.bulk_create(self.get_occurrence_objects(
+                self.compute_occurrences(window_start, window_end)
+            ))
+
+    def extend_occurrences(self):
+        """
+        Add the occurrences which moved into get_occurrence_window() since the last update, the
+        stored occurrences are kept. The occurrences before the window are deleted by
+        EventOccurrence.delete_expired().
+        """
+        window_start, window_end = self.get_occurrence_window()
+        with transaction.atomic():
+            stored_starts = set(self.occurrences.filter(
+                end__gte=timezone.make_aware(window_start)
+            ).values_list('start', flat=True))
+            EventOccurrence.objects.bulk_create([
+                occurrence for occurrence in self.get_occurrence_objects(
+                    self.compute_occurrences(window_start, window_end)
+                ) if occurrence.start not in stored_starts
+            ])
+
+    def compute_occurrences(self, start, end):
+        """
+        Returns start datetimes of occurrences of the event that overlap with [start, end] like
+        get_occurrences(), daily and weekly recurrences are computed only within the range
+        :type start: datetime
+        :type end: datetime
+        :return: list of datetimes
+        """
+        recurrence = self.recurrence_rule
+        if recurrence and recurrence.frequency == RecurrenceRule.DAILY:
+            return self.get_daily_occurrences(start, end)
+        if recurrence and recurrence.frequency == RecurrenceRule.WEEKLY:
+            return self.get_weekly_occurrences(start, end)
+        return self.get_occurrences(start, end)
+
+    @classmethod
+    def get_occurrences_of_events(cls, events, start, end):
+        """
+        Returns start datetimes of occurrences of many events that overlap with [start, end].
+        Events which are over before start or begin after end are filtered out in the database.
+        Daily and weekly recurrences are computed arithmetically instead of iterating an rrule
+        from the event's start, monthly and yearly ones fall back to get_occurrences().
+        Expects start < end
+        :type events: QuerySet of Event objects
+        :type start: datetime
+        :type end: datetime
+        :return: list of (event, occurrence) tuples ordered by the occurrence's start
+        """
+        events = events.select_related('recurrence_rule').filter(
+            start_date__lte=end.date()
+        ).exclude(
+            recurrence_rule__isnull=True,
+            end_date__lt=start.date()
+        ).exclude(
+            recurrence_rule__end_date__lt=start.date()
+        )
+        result = []
+        for event in events:
+            result.extend((event, occurrence)
+                          for occurrence in event.compute_occurrences(start, end))
+        result.sort(key=lambda item: item[1])
+        return result
+
+    def get_daily_occurrences(self, start, end):
+        """
+        Same as get_occurrences() for events with a daily recurrence rule, but only the
+        occurrences within the window are computed
+        :type start: datetime
+        :type end: datetime
+        :return: list of datetimes
+        """
+        event_start = datetime.combine(self.start_date,
+                                       self.start_time if self.start_time else time.min)
+        event_end = datetime.combine(self.end_date, self.end_time if self.end_time else time.max)
+        event_span = event_end - event_start
+        recurrence = self.recurrence_rule
+        until = min(end, datetime.combine(recurrence.end_date
+                                          if recurrence.end_date
+                                          else date.max, time.max))
+        step = timedelta(days=recurrence.interval)
+        # index of the first occurrence which ends after start (ceiling division)
+        index = max(0, -((event_start - (start - event_span)) // step))
+        occurrences = []
+        occurrence = event_start + index * step
+        while occurrence <= until:
+            if start <= occurrence <= end or start <= occurrence + event_span <= end:
+                occurrences.append(occurrence)
+            occurrence += step
+        return occurrences
+
+    def get_weekly_occurrences(self, start, end):
+        """
+        Same as get_occurrences() for events with a weekly recurrence rule, but only the
+        occurrences within the window are computed
+        :type start: datetime
+        :type end: datetime
+        :return: list of datetimes
+        """
+        event_start = datetime.combine(self.start_date,
+                                       self.start_time if self.start_time else time.min)
+        event_end = datetime.combine(self.end_date, self.end_time if self.end_time else time.max)
+        event_span = event_end - event_start
+        recurrence = self.recurrence_rule
+        until = min(end, datetime.combine(recurrence.end_date
+                                          if recurrence.end_date
+                                          else date.max, time.max))
+        # like rrule, the event recurs on the weekday of its start if no weekdays are given
+        weekdays = sorted(set(recurrence.weekdays_for_weekly or [event_start.weekday()]))
+        # weeks start on monday and are counted from the week of the event's start
+        first_monday = event_start - timedelta(days=event_start.weekday())
+        first_monday = datetime.combine(first_monday.date(), event_start.time())
+        week = max(0, (start - event_span - first_monday).days // 7)
+        week -= week % recurrence.interval
+        occurrences = []
+        while first_monday + timedelta(weeks=week) <= until:
+            for day in weekdays:
+                occurrence = first_monday + timedelta(weeks=week, days=day)
+                if occurrence < event_start or occurrence > until:
+                    continue
+                if start <= occurrence <= end or start <= occurrence + event_span <= end:
+                    occurrences.append(occurrence)
+            week += recurrence.interval
+        return occurrences
+
+    @classmethod
+    def get_occurrences_in_range(cls, site, start, end):
+        """
+        Returns the stored occurrences of all events of the site that overlap with [start, end].
+        Only occurrences within Event.get_occurrence_window() are stored.
+        :type site: Site
+        :type start: datetime
+        :type end: datetime
+        :return: queryset of EventOccurrence objects
+        """
+        return EventOccurrence.objects.filter(
+            site=site,
+            start__lte=end,
+            end__gte=start,
+        ).select_related('event').order_by('start')
+
+
+class EventOccurrence(models.Model):
+    """
+    Database object representing one stored occurrence of an event,
+    so events in a date range can be found without expanding their recurrence rules
+    """
+    event = models.ForeignKey(Event, related_name='occurrences', on_delete=models.CASCADE)
+    site = models.ForeignKey(Site, related_name='event_occurrences', on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'start', 'end']),
+        ]
+
+    @classmethod
+    def delete_expired(cls):
+        """
+        Delete the occurrences which ended before Event.get_occurrence_window()
+
+        Returns:
+            Integer : the number of deleted occurrences
+        """
+        window_start, _ = Event.get_occurrence_window()
+        count, _ = cls.objects.filter(end__lt=timezone.make_aware(window_start)).delete()
+        return count
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, **kwargs):
+    instance.update_occurrences()
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=RecurrenceRule)
+def recurrence_rule_saved(sender, instance, **kwargs):
+    event = Event.objects.filter(recurrence_rule=instance).first()
+    if event:
+        event.update_occurrences()
+
 
 class EventTranslation(models.Model):
     """
@@ -179,3 +412,23 @@ class EventTranslation(models.Model):
     created_date = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
     creator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+
+    # kept up to date on save, see build_search_vector()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['language', 'last_updated']),
+            GinIndex(fields=['search_vector']),
+        ]
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=EventTranslation)
+def event_translation_saved(sender, instance, update_fields=None, **kwargs):
+    # the search vector only depends on the title and the description
+    if update_fields and not {'title', 'description'} & set(update_fields):
+        return
+    EventTranslation.objects.filter(id=instance.id).update(
+        search_vector=build_search_vector('description', instance.language.code)
+    )
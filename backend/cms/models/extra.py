@@ -1,7 +1,10 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
-from .site import Site
+from .site import Site, SITES_RESPONSE_CACHE_KEY
 from .extra_template import ExtraTemplate
 
 
@@ -25,3 +28,11 @@ class Extra(models.Model):
 
     def post_data(self):
         return self.template.post_data
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Extra)
+@receiver(post_delete, sender=Extra)
+def extra_changed(sender, instance, **kwargs):
+    # the sites api shows whether a site has extras
+    cache.delete(SITES_RESPONSE_CACHE_KEY)
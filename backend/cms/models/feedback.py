@@ -1,4 +1,16 @@
-from django.db import models
+"""Models for the feedback of the app users and its daily counts
+
+All feedback is stored in one table with a type discriminator, so the feedback of a site can be
+listed with one indexed query. The subclasses are proxies which only see feedback of their type.
+"""
+from datetime import timedelta
+
+from django.db import connection, models
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
 from cms.models.page import Page
 from cms.models.site import Site
 from cms.models.extra import Extra
@@ -6,37 +18,280 @@ from cms.models.event import Event
 
 
 class Feedback(models.Model):
+    """Object representing a positive or negative rating of the app with an optional comment
+
+    Args:
+        models : Database model inherit from the standard django models
+    """
+
+    SITE = 'site'
+    PAGE = 'page'
+    TECHNICAL = 'technical'
+    EXTRA = 'extra'
+    EVENT = 'event'
+    SEARCH_RESULT = 'search'
+
+    TYPE = (
+        (SITE, 'Site'),
+        (PAGE, 'Page'),
+        (TECHNICAL, 'Technical'),
+        (EXTRA, 'Extra'),
+        (EVENT, 'Event'),
+        (SEARCH_RESULT, 'Search result'),
+    )
+
+    POSITIVE = 'Pos'
+    NEGATIVE = 'Neg'
+
     EMOTION = (
-        ("Pos", "Positive"),
-        ("Neg", "Negative")
+        (POSITIVE, "Positive"),
+        (NEGATIVE, "Negative")
     )
+
+    # the type of the feedback, set by the proxy models on save
+    FEEDBACK_TYPE = None
+
+    feedback_type = models.CharField(max_length=9, choices=TYPE)
+    # only empty for feedback on search results which was given before the site was stored
+    site = models.ForeignKey(Site, related_name='feedback', null=True, blank=True,
+                             on_delete=models.CASCADE)
+    # the object the feedback is about, depending on the type
+    page = models.ForeignKey(Page, related_name='feedback', null=True, blank=True,
+                             on_delete=models.CASCADE)
+    extra = models.ForeignKey(Extra, related_name='feedback', null=True, blank=True,
+                              on_delete=models.CASCADE)
+    event = models.ForeignKey(Event, related_name='feedback', null=True, blank=True,
+                              on_delete=models.CASCADE)
+    searchQuery = models.CharField(max_length=1000, blank=True)
     emotion = models.CharField(max_length=3, choices=EMOTION)
-    comment = models.CharField(max_length=1000)
+    comment = models.CharField(max_length=1000, blank=True)
     readStatus = models.BooleanField(default=False)
 
     created_date = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'readStatus', 'created_date']),
+        ]
+
+    @property
+    def object_id(self):
+        """The id of the object the feedback is about, see DailyFeedbackCount
+
+        Returns:
+            Integer : id of the page, extra, event or site, None for feedback on search results
+        """
+
+        return {
+            Feedback.SITE: self.site_id,
+            Feedback.PAGE: self.page_id,
+            Feedback.TECHNICAL: self.page_id,
+            Feedback.EXTRA: self.extra_id,
+            Feedback.EVENT: self.event_id,
+        }.get(self.feedback_type)
+
+    @classmethod
+    def get_unread(cls, site):
+        """Provide the unread feedback of all types of a site
+
+        Args:
+            site : the site
+
+        Returns:
+            QuerySet : the unread feedback, the latest first
+        """
+
+        return cls.objects.filter(site=site, readStatus=False).order_by('-created_date')
+
+
+class FeedbackTypeManager(models.Manager):
+    """Manager of the proxy models, which only returns the feedback of their type"""
+
+    def get_queryset(self):
+        return super(FeedbackTypeManager, self).get_queryset().filter(
+            feedback_type=self.model.FEEDBACK_TYPE
+        )
+
 
 class SiteFeedback(Feedback):
-    site = models.ForeignKey(Site)
+    FEEDBACK_TYPE = Feedback.SITE
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
 
 
 class PageFeedback(Feedback):
-    page = models.ForeignKey(Page)
+    FEEDBACK_TYPE = Feedback.PAGE
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
 
 
 class TechnicalFeedback(Feedback):
-    page = models.ForeignKey(Page)
+    FEEDBACK_TYPE = Feedback.TECHNICAL
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
 
 
 class ExtraFeedback(Feedback):
-    extra = models.ForeignKey(Extra)
+    FEEDBACK_TYPE = Feedback.EXTRA
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
 
 
 class EventFeedback(Feedback):
-    event = models.ForeignKey(Event)
+    FEEDBACK_TYPE = Feedback.EVENT
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
 
 
 class SearchResultFeedback(Feedback):
-    searchQuery = models.CharField(max_length=1000)
+    FEEDBACK_TYPE = Feedback.SEARCH_RESULT
+    objects = FeedbackTypeManager()
+
+    class Meta:
+        proxy = True
+
+
+class DailyFeedbackCount(models.Model):
+    """Object representing the number of positive and negative feedback of one type about one
+    object on one day. The counts are incremented when feedback is created, so they are not
+    decreased when feedback is deleted. Feedback on search results is not counted.
+
+    Args:
+        models : Database model inherit from the standard django models
+    """
+
+    site = models.ForeignKey(Site, related_name='daily_feedback_counts', on_delete=models.CASCADE)
+    feedback_type = models.CharField(max_length=9, choices=Feedback.TYPE)
+    # the id of the page, extra, event or site, see Feedback.object_id
+    object_id = models.PositiveIntegerField()
+    date = models.DateField()
+    positive = models.PositiveIntegerField(default=0)
+    negative = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('feedback_type', 'object_id', 'date', ), )
+        indexes = [
+            models.Index(fields=['site', 'feedback_type', 'date']),
+        ]
+
+    @classmethod
+    def add(cls, feedbacks):
+        """Add new feedback to the counts with one statement
+
+        Args:
+            feedbacks : list of the created feedback objects
+        """
+
+        counts = {}
+        for feedback in feedbacks:
+            if feedback.object_id is None:
+                continue
+            key = (feedback.site_id, feedback.feedback_type, feedback.object_id,
+                   timezone.localdate(feedback.created_date))
+            positive, negative = counts.get(key, (0, 0))
+            if feedback.emotion == Feedback.POSITIVE:
+                counts[key] = (positive + 1, negative)
+            else:
+                counts[key] = (positive, negative + 1)
+        if not counts:
+            return
+        # one array per column. The rows are sorted, so concurrent writers lock them in the same
+        # order and don't deadlock.
+        columns = [list(column)
+                   for column in zip(*(key + value for key, value in sorted(counts.items())))]
+        # the row of the day is created by the first feedback, concurrent writers don't conflict
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (site_id, feedback_type, object_id, date, positive, negative) '
+                'SELECT * FROM unnest(%s::integer[], %s::varchar[], %s::integer[], %s::date[], '
+                '%s::integer[], %s::integer[]) '
+                'ON CONFLICT (feedback_type, object_id, date) DO UPDATE SET '
+                'positive = {table}.positive + EXCLUDED.positive, '
+                'negative = {table}.negative + EXCLUDED.negative'.format(
+                    table=connection.ops.quote_name(cls._meta.db_table)
+                ),
+                columns
+            )
+
+    @classmethod
+    def get_most_criticized(cls, site, feedback_type=Feedback.PAGE, days=30, limit=10):
+        """Find the objects of a site with the most negative feedback of the last days
+
+        Args:
+            site : the site
+            feedback_type : the type of the feedback, pages by default
+            days : number of days including today
+            limit : maximum number of objects
+
+        Returns:
+            QuerySet : dicts with the object_id and the sums of positive and negative feedback
+        """
+
+        return cls.objects.filter(
+            site=site,
+            feedback_type=feedback_type,
+            date__gt=timezone.localdate() - timedelta(days=days),
+        ).values('object_id').annotate(
+            positive_count=Sum('positive'),
+            negative_count=Sum('negative'),
+        ).filter(negative_count__gt=0).order_by('-negative_count', 'object_id')[:limit]
+
+
+# pylint: disable=unused-argument
+@receiver(pre_save, sender=Feedback)
+@receiver(pre_save, sender=SiteFeedback)
+@receiver(pre_save, sender=PageFeedback)
+@receiver(pre_save, sender=TechnicalFeedback)
+@receiver(pre_save, sender=ExtraFeedback)
+@receiver(pre_save, sender=EventFeedback)
+@receiver(pre_save, sender=SearchResultFeedback)
+def feedback_saving(sender, instance, **kwargs):
+    # the type is given by the proxy model and the site by the object the feedback is about
+    if not instance.feedback_type:
+        instance.feedback_type = sender.FEEDBACK_TYPE
+    if instance.site_id is None:
+        instance.site_id = next((referenced_object.site_id
+                                 for referenced_object in (instance.page, instance.extra,
+                                                           instance.event)
+                                 if referenced_object is not None), None)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Feedback)
+@receiver(post_save, sender=SiteFeedback)
+@receiver(post_save, sender=PageFeedback)
+@receiver(post_save, sender=TechnicalFeedback)
+@receiver(post_save, sender=ExtraFeedback)
+@receiver(post_save, sender=EventFeedback)
+@receiver(post_save, sender=SearchResultFeedback)
+def feedback_saved(sender, instance, created, **kwargs):
+    # the bulk creation of feedback updates the counts itself
+    if created:
+        DailyFeedbackCount.add([instance])
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=Page)
+@receiver(post_delete, sender=Extra)
+@receiver(post_delete, sender=Event)
+def feedback_object_deleted(sender, instance, **kwargs):
+    feedback_types = {
+        Page: [Feedback.PAGE, Feedback.TECHNICAL],
+        Extra: [Feedback.EXTRA],
+        Event: [Feedback.EVENT],
+    }[sender]
+    DailyFeedbackCount.objects.filter(
+        feedback_type__in=feedback_types,
+        object_id=instance.id,
+    ).delete()
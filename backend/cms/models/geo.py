@@ -0,0 +1,103 @@
+"""Helpers for the queries of objects near a location, which are stored with plain latitude and
+longitude fields
+"""
+import math
+
+from django.db import models
+from django.db.models import F, Func, Q, Value
+
+# mean radius of the earth in kilometers
+EARTH_RADIUS = 6371.0088
+# distance between two circles of latitude which are one degree apart, in kilometers
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def get_bounding_box(latitude, longitude, radius):
+    """Compute the ranges of latitude and longitude which contain all points within the radius.
+    Range lookups on them can use the index on the coordinates, so only the points inside the box
+    have to be compared by their exact distance.
+
+    Args:
+        latitude: latitude of the center in degrees
+        longitude: longitude of the center in degrees
+        radius: radius in kilometers
+
+    Returns:
+        Tuple : range of the latitude and list of ranges of the longitude, which is split at the
+                180th meridian and covers all longitudes near the poles
+    """
+
+    delta_latitude = radius / KM_PER_DEGREE
+    latitude_range = (max(latitude - delta_latitude, -90.0), min(latitude + delta_latitude, 90.0))
+    if latitude_range[0] <= -90.0 or latitude_range[1] >= 90.0:
+        return latitude_range, [(-180.0, 180.0)]
+    # the circles of latitude get shorter towards the poles, so the box is widened with the
+    # latitude which is closest to a pole
+    delta_longitude = delta_latitude / math.cos(math.radians(max(map(abs, latitude_range))))
+    if delta_longitude >= 180.0:
+        return latitude_range, [(-180.0, 180.0)]
+    west, east = longitude - delta_longitude, longitude + delta_longitude
+    if west < -180.0:
+        return latitude_range, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return latitude_range, [(west, 180.0), (-180.0, east - 360.0)]
+    return latitude_range, [(west, east)]
+
+
+def get_distance(latitude, longitude):
+    """Build the expression for the great-circle distance of the objects to a location with the
+    haversine formula
+
+    Args:
+        latitude: latitude of the location in degrees
+        longitude: longitude of the location in degrees
+
+    Returns:
+        Expression : distance in kilometers, which can be used in annotations and filters
+    """
+
+    def func(function, *expressions):
+        return Func(*expressions, function=function, output_field=models.FloatField())
+
+    def value(number):
+        return Value(number, output_field=models.FloatField())
+
+    def squared_half_sine(field, degrees):
+        return func('POWER', func('SIN', (func('RADIANS', F(field)) - value(math.radians(degrees)))
+                                  / value(2.0)), value(2.0))
+
+    haversine = (
+        squared_half_sine('latitude', latitude) +
+        value(math.cos(math.radians(latitude))) * func('COS', func('RADIANS', F('latitude'))) *
+        squared_half_sine('longitude', longitude)
+    )
+    # rounding errors must not push the argument of the arc sine above 1
+    return value(2 * EARTH_RADIUS) * func('ASIN',
+                                          func('SQRT', func('LEAST', haversine, value(1.0))))
+
+
+def filter_nearby(queryset, latitude, longitude, radius):
+    """Find the objects within a radius around a location, ordered by their distance
+
+    Args:
+        queryset: objects with the fields "latitude" and "longitude"
+        latitude: latitude of the location in degrees
+        longitude: longitude of the location in degrees
+        radius: radius in kilometers
+
+    Returns:
+        QuerySet : the objects within the radius with their distance in kilometers as "distance"
+    """
+
+    latitude_range, longitude_ranges = get_bounding_box(latitude, longitude, radius)
+    longitude_filter = Q()
+    for longitude_range in longitude_ranges:
+        longitude_filter |= Q(longitude__range=longitude_range)
+    return queryset.filter(
+        longitude_filter,
+        latitude__range=latitude_range,
+    ).annotate(
+        distance=get_distance(latitude, longitude),
+    ).filter(
+        distance__lte=radius,
+    ).order_by('distance')
@@ -2,14 +2,17 @@
 Model to define a Language
 """
 
+from django.core.cache import cache
 from django.core.validators import MinLengthValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
-from .site import Site
+from .site import LANGUAGES_CACHE_KEY, TRANSLATION_COVERAGE_CACHE_KEY, Site
 
 class Language(models.Model):
     """
@@ -84,3 +87,22 @@ class LanguageTreeNode(MPTTModel):
         Returns: String
         """
         return self.language.name
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Language)
+def language_changed(sender, instance, **kwargs):
+    # the cached languages of all sites which use this language are outdated
+    cache.delete_many([
+        LANGUAGES_CACHE_KEY.format(site_id)
+        for site_id in instance.language_tree_nodes.values_list('site_id', flat=True)
+    ])
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=LanguageTreeNode)
+@receiver(post_delete, sender=LanguageTreeNode)
+def language_tree_node_changed(sender, instance, **kwargs):
+    # the source languages of the translations depend on the language tree
+    cache.delete_many([LANGUAGES_CACHE_KEY.format(instance.site_id),
+                       TRANSLATION_COVERAGE_CACHE_KEY.format(instance.site_id)])
@@ -3,14 +3,98 @@
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel, TreeForeignKey
 
-from .language import Language
-from .site import Site
+from .language import Language, LanguageTreeNode
+from .search import build_search_vector
+from .site import Site, TRANSLATION_COVERAGE_CACHE_KEY
+
+
+class PageManager(TreeManager):
+    """Manager which keeps the page trees of each site in a separate range of tree ids
+
+    Every site gets a block of TREE_ID_BLOCK_SIZE tree ids, starting at
+    site id * TREE_ID_BLOCK_SIZE. When mptt shifts tree ids to insert or remove a root page, only
+    the trees in the block of the same site are renumbered, so editing the pages of one site
+    never touches the rows of another site.
+    """
+
+    TREE_ID_BLOCK_SIZE = 100000
+
+    def get_next_tree_id(self, site_id):
+        """Determine the next unused tree id of a site
+
+        Args:
+            site_id: id of the site
+
+        Returns:
+            Int : Tree id after the highest tree id of the site
+        """
+
+        first_tree_id = site_id * self.TREE_ID_BLOCK_SIZE
+        max_tree_id = self.filter(
+            tree_id__gt=first_tree_id,
+            tree_id__lt=first_tree_id + self.TREE_ID_BLOCK_SIZE,
+        ).aggregate(models.Max('tree_id'))['tree_id__max']
+        return (max_tree_id or first_tree_id) + 1
+
+    def insert_node(self, node, target, position='last-child', save=False,
+                    allow_existing_pk=False, refresh_target=True):
+        if target is None:
+            if node.pk and not allow_existing_pk and self.filter(pk=node.pk).exists():
+                raise ValueError(_('Cannot insert a node which has already been saved.'))
+            # a new root page is placed after the other trees of its site
+            node.lft = 1
+            node.rght = 2
+            node.level = 0
+            node.tree_id = self.get_next_tree_id(node.site_id)
+            node.parent = None
+            if save:
+                node.save()
+            return node
+        return super(PageManager, self).insert_node(node, target, position, save,
+                                                    allow_existing_pk, refresh_target)
+
+    def _make_child_root_node(self, node, new_tree_id=None):
+        if not new_tree_id:
+            new_tree_id = self.get_next_tree_id(node.site_id)
+        super(PageManager, self)._make_child_root_node(node, new_tree_id)
+
+    def _create_tree_space(self, target_tree_id, num_trees=1):
+        # the first tree id after target_tree_id belongs to the site whose trees are shifted
+        block_start = (target_tree_id + 1) // self.TREE_ID_BLOCK_SIZE * self.TREE_ID_BLOCK_SIZE
+        qs = self.filter(
+            tree_id__gt=target_tree_id,
+            tree_id__lt=block_start + self.TREE_ID_BLOCK_SIZE,
+        )
+        qs.update(tree_id=models.F('tree_id') + num_trees)
+        self.tree_model._mptt_track_tree_insertions(target_tree_id + 1, num_trees)
+
+    def rebuild(self):
+        """Rebuild all trees from the parent links, the trees of each site are numbered within
+        the block of the site
+        """
+
+        next_tree_ids = {}
+        for pk, site_id in self.filter(parent=None).order_by(
+                'site_id', 'tree_id', 'lft'
+        ).values_list('pk', 'site_id'):
+            tree_id = next_tree_ids.get(site_id, site_id * self.TREE_ID_BLOCK_SIZE + 1)
+            self._rebuild_helper(pk, 1, tree_id)
+            next_tree_ids[site_id] = tree_id + 1
+    rebuild.alters_data = True
 
 
 class Page(MPTTModel):
@@ -38,6 +122,15 @@ class Page(MPTTModel):
     created_date = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
 
+    objects = PageManager()
+
+    class Meta:
+        indexes = [
+            # the pages of a site are loaded in tree order with a single range scan,
+            # named explicitly because the tree fields are added after the class is created
+            models.Index(fields=['site', 'tree_id', 'lft'], name='cms_page_site_tree_lft_idx'),
+        ]
+
     @property
     def depth(self):
         """Provide level of inheritance
@@ -46,16 +139,58 @@ class Page(MPTTModel):
             Int : Number of ancestors
         """
 
-        return len(self.get_ancestors())
+        return self.level
 
     @property
     def languages(self):
+        if hasattr(self, 'translations_by_language'):
+            # use the translations which were loaded by get_translated_tree()
+            return [
+                page_translation.language
+                for page_translation in self.translations_by_language.values()
+            ]
         page_translations = self.page_translations.prefetch_related('language').all()
         languages = []
         for page_translation in page_translations:
             languages.append(page_translation.language)
         return languages
 
+    @property
+    def language_codes(self):
+        """Provide the codes of all languages this page has a translation in
+
+        Returns:
+            set : Language codes of the page's translations
+        """
+
+        if hasattr(self, 'translations_by_language'):
+            return set(self.translations_by_language)
+        return set(self.page_translations.values_list('language__code', flat=True))
+
+    @property
+    def outdated_language_codes(self):
+        """Provide the codes of all languages this page has an outdated translation in
+
+        Returns:
+            set : Language codes of the page's outdated translations
+        """
+
+        if hasattr(self, 'translations_by_language'):
+            return {language_code
+                    for language_code, page_translation in self.translations_by_language.items()
+                    if page_translation.outdated}
+        return set(self.page_translations.filter(outdated=True).values_list('language__code',
+                                                                            flat=True))
+
+    def update_permalinks(self):
+        """Recompute the permalinks of all translations of this page and its descendants.
+        This is required after the page was moved to another parent.
+        """
+
+        for page_translation in self.page_translations.select_related('language'):
+            page_translation.page = self
+            page_translation.save(update_fields=['permalink', 'last_updated'])
+
     def get_translation(self, language_code):
         try:
             page_translation = self.page_translations.get(language__code=language_code)
@@ -95,22 +230,60 @@ class Page(MPTTModel):
             [pages]: Array of pages connected with their relations
         """
 
+        site = Site.get_by_slug(site_slug)
+        if not site:
+            return cls.objects.none()
+        page_translations = PageTranslation.objects.select_related('language').order_by('id')
         if archived:
             pages = cls.objects.all().prefetch_related(
-                'page_translations'
+                models.Prefetch('page_translations', queryset=page_translations)
             ).filter(
-                site__slug=site_slug
+                site=site
             )
         else:
             pages = cls.objects.all().prefetch_related(
-                'page_translations'
+                models.Prefetch('page_translations', queryset=page_translations)
             ).filter(
-                site__slug=site_slug,
+                site=site,
                 archived=False
             )
 
         return pages
 
+    @classmethod
+    def get_translated_tree(cls, site_slug, language_code, archived=False):
+        """Function for loading the page tree of a site together with all translations
+
+        The pages, their translations and the translations' languages are fetched in two
+        queries. Each page gets the following attributes, so that rendering the tree
+        doesn't need any further database access:
+
+            translations_by_language: dict of all translations keyed by language code
+            current_translation: translation in the given language, falls back to the
+                                 first translation of the page if it doesn't exist
+
+        Args:
+            site_slug: slug of the site the pages belong to
+            language_code: code of the language the tree is rendered in
+            archived: if true archived pages will be included
+
+        Returns:
+            [pages]: List of pages ordered by their position in the tree
+        """
+
+        pages = list(cls.get_tree(site_slug, archived))
+        for page in pages:
+            page_translations = page.page_translations.all()
+            page.translations_by_language = {
+                page_translation.language.code: page_translation
+                for page_translation in page_translations
+            }
+            page.current_translation = page.translations_by_language.get(
+                language_code,
+                page_translations[0] if page_translations else None
+            )
+        return pages
+
 
 class PageTranslation(models.Model):
     """Class defining a Translation of a Page
@@ -141,14 +314,195 @@ class PageTranslation(models.Model):
     creator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
     created_date = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
+    # last change of the title or the text, unlike last_updated not changed by the permalink
+    content_updated = models.DateTimeField(default=timezone.now, editable=False)
+    # materialized, so translations can be resolved by their url in one query
+    permalink = models.CharField(max_length=2000, blank=True, db_index=True, editable=False)
+    # the content of the translation in the parent language of the language tree was updated
+    # after the content of this one, see update_outdated()
+    outdated = models.BooleanField(default=False, editable=False)
 
-    @property
-    def permalink(self):
-        permalink = self.page.site.slug + '/'
-        permalink += self.language.code + '/'
-        for ancestor in self.page.get_ancestors(include_self=True):
-            permalink += ancestor.page_translations.get(language=self.language).slug + '/'
-        return permalink
+    # kept up to date on save, see build_search_vector()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['language', 'last_updated']),
+            GinIndex(fields=['search_vector']),
+        ]
+
+    def build_permalink(self):
+        """Compute the permalink out of the slugs of the page's ancestors in the same language
+
+        Returns:
+            String : permalink of the form "site-slug/language-code/ancestor-slug/.../slug/"
+        """
+
+        ancestor_slugs = PageTranslation.objects.filter(
+            page__in=self.page.get_ancestors(),
+            language_id=self.language_id,
+        ).order_by('page__level').values_list('slug', flat=True)
+        return '/'.join([self.page.site.slug, self.language.code, *ancestor_slugs, self.slug]) + '/'
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not update_fields or {'title', 'text'} & set(update_fields):
+            self.content_updated = timezone.now()
+            if update_fields:
+                kwargs['update_fields'] = [*update_fields, 'content_updated']
+        old_permalink = self.permalink
+        self.permalink = self.build_permalink()
+        super(PageTranslation, self).save(*args, **kwargs)
+        if self.permalink != old_permalink and not self.page.is_leaf_node():
+            # If the translation is new, the permalinks of the descendants didn't contain its slug
+            old_prefix = old_permalink or self.permalink[:-len(self.slug) - 1]
+            PageTranslation.replace_permalink_prefix(
+                PageTranslation.objects.filter(
+                    page__in=self.page.get_descendants(),
+                    language_id=self.language_id,
+                ),
+                old_prefix,
+                self.permalink
+            )
+
+    @staticmethod
+    def replace_permalink_prefix(page_translations, old_prefix, new_prefix):
+        """Replace the beginning of the permalinks of the given translations in one statement
+
+        Args:
+            page_translations: queryset of the translations which should be updated
+            old_prefix: the prefix which should be replaced
+            new_prefix: the new prefix
+        """
+
+        page_translations.filter(permalink__startswith=old_prefix).update(
+            permalink=Concat(Value(new_prefix), Substr('permalink', len(old_prefix) + 1)),
+            last_updated=timezone.now(),
+        )
+
+    @classmethod
+    def get_outdated(cls, site):
+        """Find the translations of a site whose source translation's content was updated after
+        theirs. The source translation is the translation of the same page in the parent language
+        of the language tree. Each translation is joined with its source translation in one query.
+
+        Args:
+            site: the site
+
+        Returns:
+            QuerySet : the outdated translations
+        """
+
+        source_language_ids = dict(LanguageTreeNode.objects.filter(
+            site=site,
+            parent__isnull=False,
+        ).values_list('language_id', 'parent__language_id'))
+        if not source_language_ids:
+            return cls.objects.none()
+        return cls.objects.filter(
+            page__site=site,
+            language_id__in=source_language_ids,
+        ).annotate(
+            source_language_id=models.Case(
+                *[models.When(language_id=language_id, then=Value(source_language_id))
+                  for language_id, source_language_id in source_language_ids.items()],
+                output_field=models.IntegerField(),
+            ),
+        ).filter(
+            page__page_translations__language_id=models.F('source_language_id'),
+            page__page_translations__content_updated__gt=models.F('content_updated'),
+        )
+
+    @classmethod
+    def update_outdated(cls, site):
+        """Recompute the outdated flags of all translations of a site in one statement
+
+        Args:
+            site: the site
+        """
+
+        cls.objects.filter(page__site=site).update(outdated=models.Case(
+            models.When(id__in=cls.get_outdated(site).values('id'), then=Value(True)),
+            default=Value(False),
+            output_field=models.BooleanField(),
+        ))
+
+    @classmethod
+    def get_by_permalink(cls, permalink):
+        """Find the translation with the given permalink
+
+        Args:
+            permalink: permalink with or without leading and trailing slash
+
+        Returns:
+            PageTranslation : the translation or None if it does not exist
+        """
+
+        return cls.objects.filter(permalink=permalink.strip('/') + '/').first()
 
     def __str__(self):
         return self.title
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=PageTranslation)
+def page_translation_saved(sender, instance, update_fields=None, **kwargs):
+    # the search vector only depends on the title and the text
+    if update_fields and not {'title', 'text'} & set(update_fields):
+        return
+    PageTranslation.objects.filter(id=instance.id).update(
+        search_vector=build_search_vector('text', instance.language.code)
+    )
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def page_changed(sender, instance, **kwargs):
+    cache.delete(TRANSLATION_COVERAGE_CACHE_KEY.format(instance.site_id))
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=PageTranslation)
+def source_translation_saved(sender, instance, update_fields=None, **kwargs):
+    # e.g. the permalink doesn't make the translation or the derived translations outdated
+    if update_fields and not {'title', 'text'} & set(update_fields):
+        return
+    # the saved translation is newer than its source now, but older than the translations which
+    # are derived from it
+    if instance.outdated:
+        PageTranslation.objects.filter(id=instance.id).update(outdated=False)
+        instance.outdated = False
+    get_derived_translations(instance).filter(outdated=False).update(outdated=True)
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=PageTranslation)
+def source_translation_deleted(sender, instance, **kwargs):
+    # translations without source are never outdated
+    get_derived_translations(instance).filter(outdated=True).update(outdated=False)
+
+
+def get_derived_translations(page_translation):
+    """The translations of the same page in the child languages of the language tree"""
+    return PageTranslation.objects.filter(
+        page_id=page_translation.page_id,
+        language__language_tree_nodes__site_id=page_translation.page.site_id,
+        language__language_tree_nodes__parent__language_id=page_translation.language_id,
+    )
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=LanguageTreeNode)
+@receiver(post_delete, sender=LanguageTreeNode)
+def language_tree_changed(sender, instance, **kwargs):
+    # the source languages of the translations may have changed
+    PageTranslation.update_outdated(instance.site)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=PageTranslation)
+@receiver(post_delete, sender=PageTranslation)
+def page_translation_changed(sender, instance, **kwargs):
+    # the page is already loaded by save(), which builds the permalink
+    cache.delete(TRANSLATION_COVERAGE_CACHE_KEY.format(instance.page.site_id))
@@ -0,0 +1,257 @@
+"""Model for keeping the history of page translations
+
+Every saved version of a page translation is kept as a revision. To keep the history of long
+pages small, only every SNAPSHOT_INTERVAL-th revision stores the full text. The revisions in
+between store a delta to the text of the previous revision, so any version can be reconstructed
+out of at most SNAPSHOT_INTERVAL rows.
+"""
+import difflib
+import json
+
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .page import PageTranslation
+
+# maximum number of revisions which are needed to reconstruct a version
+SNAPSHOT_INTERVAL = 20
+
+
+def make_delta(old_text, new_text):
+    """Compute the difference between two texts line by line
+
+    Args:
+        old_text: the text of the previous revision
+        new_text: the text of the new revision
+
+    Returns:
+        String : JSON list of the operations, which are either [start, end] to copy lines of the
+                 old text or a string to insert
+    """
+
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    operations = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([old_start, old_end])
+        elif tag in ('insert', 'replace'):
+            operations.append(''.join(new_lines[new_start:new_end]))
+    return json.dumps(operations, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old_text, delta):
+    """Reconstruct a text out of the text of the previous revision and the delta
+
+    Args:
+        old_text: the text of the previous revision
+        delta: the delta computed by make_delta()
+
+    Returns:
+        String : the new text
+    """
+
+    old_lines = old_text.splitlines(keepends=True)
+    return ''.join(
+        operation if isinstance(operation, str) else ''.join(old_lines[operation[0]:operation[1]])
+        for operation in json.loads(delta)
+    )
+
+
+class PageRevision(models.Model):
+    """Object representing a saved version of a page translation
+
+    Args:
+        models : Database model inherit from the standard django models
+    """
+
+    page_translation = models.ForeignKey(
+        PageTranslation,
+        related_name='revisions',
+        on_delete=models.CASCADE
+    )
+    version = models.PositiveIntegerField()
+    title = models.CharField(max_length=250)
+    status = models.CharField(max_length=9, choices=PageTranslation.STATUS)
+    minor_edit = models.BooleanField(default=False)
+    creator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+    created_date = models.DateTimeField(default=timezone.now)
+    # number of deltas since the last snapshot, 0 if the content is the full text
+    depth = models.PositiveSmallIntegerField(default=0)
+    # the full text or the delta to the previous revision, see make_delta()
+    content = models.TextField()
+    # length of the full text, so the revisions can be listed without their content
+    text_length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('page_translation', 'version'),)
+        ordering = ['-version']
+
+    @property
+    def is_snapshot(self):
+        return self.depth == 0
+
+    @classmethod
+    def get_list(cls, page_translation):
+        """Provide the revisions of a translation without loading their content
+
+        Args:
+            page_translation: the page translation
+
+        Returns:
+            QuerySet : the revisions, the latest first
+        """
+
+        return cls.objects.filter(page_translation=page_translation).defer('content')
+
+    def get_text(self):
+        """Reconstruct the full text of this revision out of the preceding snapshot and the
+        deltas since then
+
+        Returns:
+            String : the text of the page translation in this version
+        """
+
+        contents = PageRevision.objects.filter(
+            page_translation_id=self.page_translation_id,
+            version__range=(self.version - self.depth, self.version),
+        ).order_by('version').values_list('content', flat=True)
+        text, *deltas = contents
+        for delta in deltas:
+            text = apply_delta(text, delta)
+        return text
+
+    @classmethod
+    def create_for(cls, page_translation):
+        """Store the current state of a translation as a new revision, unless it didn't change
+
+        Args:
+            page_translation: the saved page translation
+
+        Returns:
+            PageRevision : the new revision or None if nothing changed
+        """
+
+        with transaction.atomic():
+            # concurrent saves of the same translation get consecutive versions
+            PageTranslation.objects.select_for_update().only('id').get(id=page_translation.id)
+            latest = cls.objects.filter(page_translation=page_translation).first()
+            old_text = latest.get_text() if latest else None
+            if latest is None:
+                version = page_translation.version + 1
+                depth = 0
+            else:
+                if (latest.title, latest.status, old_text) == (
+                        page_translation.title, page_translation.status, page_translation.text):
+                    return None
+                version = latest.version + 1
+                depth = (latest.depth + 1) % SNAPSHOT_INTERVAL
+            content = page_translation.text
+            if depth:
+                delta = make_delta(old_text, page_translation.text)
+                # e.g. if the text was replaced completely
+                if len(delta) < len(content):
+                    content = delta
+                else:
+                    depth = 0
+            revision = cls.objects.create(
+                page_translation=page_translation,
+                version=version,
+                title=page_translation.title,
+                status=page_translation.status,
+                minor_edit=page_translation.minor_edit,
+                creator=page_translation.creator,
+                depth=depth,
+                content=content,
+                text_length=len(page_translation.text),
+            )
+            PageTranslation.objects.filter(id=page_translation.id).update(version=version)
+            page_translation.version = version
+        return revision
+
+    @classmethod
+    def create_initial(cls, page_translations):
+        """Store the first revisions of many new translations at once, e.g. after they were
+        created with bulk_create()
+
+        Args:
+            page_translations: list of the saved page translations without revisions
+        """
+
+        with transaction.atomic():
+            cls.objects.bulk_create([
+                cls(
+                    page_translation=page_translation,
+                    version=page_translation.version + 1,
+                    title=page_translation.title,
+                    status=page_translation.status,
+                    minor_edit=page_translation.minor_edit,
+                    creator=page_translation.creator,
+                    content=page_translation.text,
+                    text_length=len(page_translation.text),
+                ) for page_translation in page_translations
+            ], batch_size=1000)
+            PageTranslation.objects.filter(
+                id__in=[page_translation.id for page_translation in page_translations]
+            ).update(version=models.F('version') + 1)
+        for page_translation in page_translations:
+            page_translation.version += 1
+
+    @classmethod
+    def compact(cls, page_translation, keep, before):
+        """Delete the old revisions of a translation. The oldest remaining revision is turned into
+        a snapshot, so the remaining versions can still be reconstructed.
+
+        Args:
+            page_translation: the page translation
+            keep: number of the latest revisions which are always kept
+            before: revisions created before this date are deleted unless they are the latest ones
+
+        Returns:
+            Integer : the number of deleted revisions
+        """
+
+        with transaction.atomic():
+            PageTranslation.objects.select_for_update().only('id').get(id=page_translation.id)
+            revisions = cls.objects.filter(page_translation=page_translation).defer('content')
+            kept_versions = list(revisions.values_list('version', flat=True)[:max(keep, 1)])
+            if not kept_versions:
+                return 0
+            # the versions and creation dates increase together, so the kept revisions are the
+            # latest ones
+            oldest_version = min([kept_versions[-1], *revisions.filter(
+                created_date__gte=before
+            ).order_by('version').values_list('version', flat=True)[:1]])
+            deleted_revisions = revisions.filter(version__lt=oldest_version)
+            if not deleted_revisions.exists():
+                return 0
+            oldest = revisions.get(version=oldest_version)
+            if not oldest.is_snapshot:
+                # the preceding revisions of the chain are needed to reconstruct the text
+                text = oldest.get_text()
+                # the deltas after the new snapshot are shifted to the start of its chain
+                chain = []
+                for revision in revisions.filter(
+                        version__gt=oldest.version,
+                        version__lt=oldest.version + SNAPSHOT_INTERVAL,
+                ).order_by('version'):
+                    if revision.depth != oldest.depth + revision.version - oldest.version:
+                        break
+                    chain.append(revision.id)
+                cls.objects.filter(id__in=chain).update(depth=models.F('depth') - oldest.depth)
+                cls.objects.filter(id=oldest.id).update(depth=0, content=text)
+            count, _ = deleted_revisions.delete()
+        return count
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=PageTranslation)
+def create_page_revision(sender, instance, update_fields=None, **kwargs):
+    # saves of materialized fields like the permalink don't change the content
+    if update_fields and not {'title', 'status', 'text'} & set(update_fields):
+        return
+    PageRevision.create_for(instance)
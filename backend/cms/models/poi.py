@@ -2,11 +2,17 @@
 
 """
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
 from .site import Site
 from .language import Language
+from .geo import filter_nearby
+from .search import build_search_vector
 
 
 class POI(models.Model):
@@ -24,6 +30,8 @@ class POI(models.Model):
     country = models.CharField(max_length=250)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    # changes of the address, which is part of all translations in the api
+    last_updated = models.DateTimeField(auto_now=True)
 
     @classmethod
     def get_list_view(cls):
@@ -42,6 +50,28 @@ class POI(models.Model):
 
         return pois
 
+    @classmethod
+    def get_nearby(cls, site, latitude, longitude, radius):
+        """Provides the POIs of a site within a radius around a location
+
+        Args:
+            site : Site of the POIs
+            latitude : Latitude of the location in degrees
+            longitude : Longitude of the location in degrees
+            radius : Radius in kilometers
+
+        Returns:
+            QuerySet : The POIs ordered by their distance, which is annotated as "distance"
+        """
+
+        return filter_nearby(cls.objects.filter(site=site), latitude, longitude, radius)
+
+    class Meta:
+        indexes = [
+            # used by the bounding box of get_nearby()
+            models.Index(fields=['site', 'latitude', 'longitude']),
+        ]
+
 
 class POITranslation(models.Model):
     """Translation of an Point of Interest
@@ -67,3 +97,23 @@ class POITranslation(models.Model):
     created_date = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
     creator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+
+    # kept up to date on save, see build_search_vector()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['language', 'last_updated']),
+            GinIndex(fields=['search_vector']),
+        ]
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=POITranslation)
+def poi_translation_saved(sender, instance, update_fields=None, **kwargs):
+    # the search vector only depends on the title and the description
+    if update_fields and not {'title', 'description'} & set(update_fields):
+        return
+    POITranslation.objects.filter(id=instance.id).update(
+        search_vector=build_search_vector('description', instance.language.code)
+    )
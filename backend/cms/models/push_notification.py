@@ -1,7 +1,8 @@
 """Model for Push Notifications
 """
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
 
 from .site import Site
 from .language import Language
@@ -16,10 +17,79 @@ class PushNotification(models.Model):
     site = models.ForeignKey(Site, related_name='push_notifications', on_delete=models.CASCADE)
     channel = models.CharField(max_length=60)
     draft = models.BooleanField(default=True)
+    # if set, the push notification is queued at this time instead of immediately
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+    # set when the deliveries are queued, sent_date is set when all of them are finished
+    queued_date = models.DateTimeField(null=True, blank=True)
     sent_date = models.DateTimeField(null=True, blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # used by queue_scheduled() to find the due push notifications which are not queued
+            models.Index(fields=['queued_date', 'scheduled_for']),
+        ]
+
+    @property
+    def channels(self):
+        """The channels the push notification is sent to, all channels of the site if the push
+        notification has none
+
+        Returns:
+            [String]: List of channel names
+        """
+        if self.channel:
+            return [self.channel]
+        return self.site.push_notification_channels
+
+    def queue(self):
+        """Queue one delivery of every translation to every channel. The deliveries are sent by the
+        worker of the management command "send_push_notifications".
+
+        Returns:
+            Boolean: False if the push notification was already queued before
+        """
+        with transaction.atomic():
+            # lock the push notification to queue its deliveries only once
+            push_notification = PushNotification.objects.select_for_update().get(id=self.id)
+            if push_notification.queued_date:
+                return False
+            language_ids = self.translations.values_list('language_id', flat=True)
+            deliveries = PushNotificationDelivery.objects.bulk_create([
+                PushNotificationDelivery(push_notification=self, channel=channel,
+                                         language_id=language_id)
+                for channel in self.channels
+                for language_id in language_ids
+            ])
+            self.queued_date = timezone.now()
+            # without deliveries, there is nothing left to send
+            self.sent_date = None if deliveries else self.queued_date
+            self.draft = False
+            PushNotification.objects.filter(id=self.id).update(queued_date=self.queued_date,
+                                                               sent_date=self.sent_date,
+                                                               draft=False)
+        return True
+
+    @classmethod
+    def queue_scheduled(cls, batch_size=100):
+        """Queue the scheduled push notifications which are due. Push notifications which are
+        handled by another process at the same time are skipped, so it can run on several nodes.
+
+        Args:
+            batch_size: Maximum number of push notifications which are queued
+
+        Returns:
+            Integer: Number of queued push notifications
+        """
+        with transaction.atomic():
+            due_push_notifications = cls.objects.select_for_update(skip_locked=True).filter(
+                queued_date__isnull=True,
+                scheduled_for__lte=timezone.now(),
+                draft=False,
+            ).order_by('scheduled_for')[:batch_size]
+            return sum(push_notification.queue() for push_notification in due_push_notifications)
+
     def __str__(self):
         if self.translations.exists():
             return self.translations.first().title
@@ -41,3 +111,43 @@ class PushNotificationTranslation(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class PushNotificationDelivery(models.Model):
+    """Class representing the delivery of one translation of a push notification to one channel.
+    It keeps track of the attempts, so failed deliveries can be retried.
+
+    Args:
+        models : Databas model inherit from the standard django models
+    """
+    PENDING = 'pend'
+    SENT = 'sent'
+    FAILED = 'fail'
+
+    STATUS = (
+        (PENDING, _('Pending')),
+        (SENT, _('Sent')),
+        (FAILED, _('Failed')),
+    )
+
+    push_notification = models.ForeignKey(PushNotification, related_name='deliveries',
+                                          on_delete=models.CASCADE)
+    channel = models.CharField(max_length=60)
+    language = models.ForeignKey(Language, on_delete=models.CASCADE)
+    status = models.CharField(max_length=4, choices=STATUS, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+    created_date = models.DateTimeField(default=timezone.now)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('push_notification', 'channel', 'language'),)
+        indexes = [
+            # the worker looks for pending deliveries whose next attempt is due
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+    def __str__(self):
+        return '{} ({}, {})'.format(self.push_notification_id, self.channel, self.language_id)
@@ -0,0 +1,75 @@
+"""Helpers for the full-text search over the translations of pages, events and pois
+"""
+from django.contrib.postgres.search import SearchVector
+from django.db import models
+from django.db.models import Func, Value
+
+# text search configurations of PostgreSQL, keyed by the language part of the bcp47 code
+SEARCH_CONFIGS = {
+    'da': 'danish',
+    'de': 'german',
+    'en': 'english',
+    'es': 'spanish',
+    'fi': 'finnish',
+    'fr': 'french',
+    'hu': 'hungarian',
+    'it': 'italian',
+    'nl': 'dutch',
+    'no': 'norwegian',
+    'pt': 'portuguese',
+    'ro': 'romanian',
+    'ru': 'russian',
+    'sv': 'swedish',
+    'tr': 'turkish',
+}
+
+
+def get_search_config(language_code):
+    """Find the text search configuration for a language
+
+    Args:
+        language_code: bcp47 code of the language
+
+    Returns:
+        String : name of the configuration, "simple" if PostgreSQL has no stemmer for the language
+    """
+
+    return SEARCH_CONFIGS.get(language_code.split('-')[0].lower(), 'simple')
+
+
+def build_search_vector(text_field, language_code):
+    """Build the expression for the search vector of a translation, where the title is weighted
+    higher than the text. The HTML tags of the text are not indexed.
+
+    Args:
+        text_field: name of the field which contains the text of the translation
+        language_code: bcp47 code of the language of the translation
+
+    Returns:
+        SearchVector : expression which can be used in updates and annotations
+    """
+
+    config = get_search_config(language_code)
+    # the tags are replaced by spaces, so the words around them are not joined
+    text = Func(models.F(text_field), Value('<[^>]*>'), Value(' '), Value('g'),
+                function='regexp_replace', output_field=models.TextField())
+    return (
+        SearchVector('title', weight='A', config=config) +
+        SearchVector(text, weight='B', config=config)
+    )
+
+
+def update_search_vectors(translations, text_field):
+    """Recompute the search vectors of many translations with one update per language
+
+    Args:
+        translations: queryset of the translations
+        text_field: name of the field which contains the text of the translations
+    """
+
+    for language_id, language_code in translations.values_list(
+            'language_id', 'language__code'
+    ).order_by().distinct():
+        translations.filter(language_id=language_id).update(
+            search_vector=build_search_vector(text_field, language_code)
+        )
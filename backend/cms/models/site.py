@@ -2,10 +2,26 @@
 Database model representing an autonomous authority
 """
 from django.contrib.postgres.fields import ArrayField
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from .geo import filter_nearby
+
+
+SITES_CACHE_KEY = 'cms.sites'
+LANGUAGES_CACHE_KEY = 'cms.site.{}.languages'
+# translation coverage of the pages, see cms.views.general.get_translation_coverage()
+TRANSLATION_COVERAGE_CACHE_KEY = 'cms.site.{}.translation_coverage'
+# serialized response of the sites api, see api.v3.sites
+SITES_RESPONSE_CACHE_KEY = 'api.v3.sites'
+# the signals only invalidate the cache of the process which saved a change, so the cached sites
+# and languages of the other processes expire after this number of seconds
+SITE_CACHE_TIMEOUT = 60
+
 
 class Site(models.Model):
     """
@@ -42,19 +58,94 @@ class Site(models.Model):
     matomo_url = models.CharField(max_length=150, blank=True, default='')
     matomo_token = models.CharField(max_length=150, blank=True, default='')
     matomo_ssl_verify = models.BooleanField(default=True)
+    # id of the site in the Matomo instance
+    matomo_id = models.PositiveIntegerField(null=True, blank=True)
+
+    @property
+    def statistics_configured(self):
+        return bool(self.statistics_enabled and self.matomo_url and self.matomo_id)
 
     @property
     def languages(self):
-        language_tree_nodes = self.language_tree_nodes.select_related('language').all()
-        return [language_tree_node.language for language_tree_node in language_tree_nodes]
+        return self.get_cached_languages()[0]
 
     @property
     def default_language(self):
-        tree_root = self.language_tree_nodes.filter(level=0).first()
-        return tree_root.language if tree_root else None
+        return self.get_cached_languages()[1]
+
+    def get_cached_languages(self):
+        """Loads the languages of the site in the order of the language tree.
+        They are cached across requests until the language tree or one of the languages changes,
+        but at most SITE_CACHE_TIMEOUT seconds.
+
+        Returns:
+            Tuple : List of all languages and the default language (or None)
+        """
+        cache_key = LANGUAGES_CACHE_KEY.format(self.id)
+        cached = cache.get(cache_key)
+        if cached is None:
+            language_tree_nodes = list(self.language_tree_nodes.select_related('language').all())
+            default_language = next((language_tree_node.language
+                                     for language_tree_node in language_tree_nodes
+                                     if language_tree_node.level == 0), None)
+            cached = (
+                [language_tree_node.language for language_tree_node in language_tree_nodes],
+                default_language,
+            )
+            cache.set(cache_key, cached, SITE_CACHE_TIMEOUT)
+        return cached
+
+    @classmethod
+    def get_sites(cls):
+        """Loads all sites, cached across requests until one of them is saved or deleted, but at
+        most SITE_CACHE_TIMEOUT seconds
+
+        Returns:
+            List : All sites
+        """
+        sites = cache.get(SITES_CACHE_KEY)
+        if sites is None:
+            sites = list(cls.objects.all())
+            cache.set(SITES_CACHE_KEY, sites, SITE_CACHE_TIMEOUT)
+        return sites
+
+    @classmethod
+    def get_by_slug(cls, site_slug):
+        """Looks up a site in the cached list of all sites and in the database if it is missing
+
+        Args:
+            site_slug : Slug of the site
+
+        Returns:
+            Site : The site or None if it doesn't exist
+        """
+        site = next((site for site in cls.get_sites() if site.slug == site_slug), None)
+        if site is None:
+            # the site may have been created by another process after the list was cached
+            site = cls.objects.filter(slug=site_slug).first()
+            if site is not None:
+                cache.delete(SITES_CACHE_KEY)
+        return site
+
+    @classmethod
+    def get_nearby(cls, latitude, longitude, radius):
+        """Finds the sites which are not archived within a radius around a location
+
+        Args:
+            latitude : Latitude of the location in degrees
+            longitude : Longitude of the location in degrees
+            radius : Radius in kilometers
+
+        Returns:
+            QuerySet : The sites ordered by their distance, which is annotated as "distance"
+        """
+        return filter_nearby(cls.objects.exclude(status=cls.ARCHIVED), latitude, longitude, radius)
 
     @classmethod
     def get_current_site(cls, request):
+        # the site is already resolved by backend.middleware.SiteMiddleware
+        if getattr(request, 'site', None):
+            return request.site
         if hasattr(request, 'resolver_match'):
             site_slug = request.resolver_match.kwargs.get('site_slug')
             if site_slug:
@@ -62,9 +153,23 @@ class Site(models.Model):
                 return site
         return None
 
+    class Meta:
+        indexes = [
+            # used by the bounding box of get_nearby()
+            models.Index(fields=['latitude', 'longitude']),
+        ]
+
     def __str__(self):
         """Function that provides a string representation of this object
 
         Returns: String
         """
         return self.name
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def site_changed(sender, instance, **kwargs):
+    cache.delete_many([SITES_CACHE_KEY, LANGUAGES_CACHE_KEY.format(instance.id),
+                       SITES_RESPONSE_CACHE_KEY])
@@ -0,0 +1,25 @@
+"""Model for caching statistics of the Matomo instance
+"""
+from django.db import models
+
+from .language import Language
+from .site import Site
+
+
+class DailyVisitorCount(models.Model):
+    """Object representing the unique visitors of a site in one language on one day.
+    Only days which are over are stored, because their number of visitors doesn't change anymore.
+
+    Args:
+        models : Database model inherit from the standard django models
+    """
+
+    site = models.ForeignKey(Site, related_name='daily_visitor_counts', on_delete=models.CASCADE)
+    language = models.ForeignKey(Language, related_name='daily_visitor_counts',
+                                 on_delete=models.CASCADE)
+    date = models.DateField()
+    visitors = models.PositiveIntegerField()
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('site', 'language', 'date', ), )
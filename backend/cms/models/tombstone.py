@@ -0,0 +1,104 @@
+"""Model for keeping track of deleted content, so apps can remove it during an incremental sync
+"""
+from django.db import models
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .event import EventTranslation
+from .language import Language
+from .page import PageTranslation
+from .poi import POI, POITranslation
+from .site import Site
+
+
+class Tombstone(models.Model):
+    """Object representing a translation of a page, event or poi which was deleted
+
+    Args:
+        models : Database model inherit from the standard django models
+    """
+
+    PAGE = 'page'
+    EVENT = 'event'
+    POI = 'poi'
+
+    CONTENT_TYPE = (
+        (PAGE, 'Page'),
+        (EVENT, 'Event'),
+        (POI, 'POI'),
+    )
+
+    site = models.ForeignKey(Site, related_name='tombstones', on_delete=models.CASCADE)
+    language = models.ForeignKey(Language, related_name='tombstones', on_delete=models.CASCADE)
+    content_type = models.CharField(max_length=5, choices=CONTENT_TYPE)
+    object_id = models.PositiveIntegerField()
+    deleted_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'language', 'deleted_date']),
+        ]
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=PageTranslation)
+def page_translation_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        site_id=instance.page.site_id,
+        language_id=instance.language_id,
+        content_type=Tombstone.PAGE,
+        object_id=instance.page_id,
+    )
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=EventTranslation)
+def event_translation_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        site_id=instance.event.site_id,
+        language_id=instance.language_id,
+        content_type=Tombstone.EVENT,
+        object_id=instance.event_id,
+    )
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=POITranslation)
+def poi_translation_deleted(sender, instance, **kwargs):
+    if instance.poi_id:
+        Tombstone.objects.create(
+            site_id=instance.poi.site_id,
+            language_id=instance.language_id,
+            content_type=Tombstone.POI,
+            object_id=instance.poi_id,
+        )
+
+
+# pylint: disable=unused-argument
+@receiver(pre_delete, sender=POI)
+def poi_deleted(sender, instance, **kwargs):
+    # the translations of a poi are kept when it's deleted, so they can't notify us
+    Tombstone.objects.bulk_create([
+        Tombstone(
+            site_id=instance.site_id,
+            language_id=language_id,
+            content_type=Tombstone.POI,
+            object_id=instance.id,
+        ) for language_id in instance.poi_translations.values_list('language_id', flat=True)
+    ])
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=Site)
+def site_deleted(sender, instance, **kwargs):
+    # tombstones which were created while the site's content was deleted
+    # would otherwise violate their foreign key constraint
+    Tombstone.objects.filter(site_id=instance.id).delete()
+
+
+# pylint: disable=unused-argument
+@receiver(post_delete, sender=Language)
+def language_deleted(sender, instance, **kwargs):
+    # see site_deleted()
+    Tombstone.objects.filter(language_id=instance.id).delete()
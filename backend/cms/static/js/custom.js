@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', function(){
     });
 
     custom_file_field();
+    page_tree_drag_and_drop();
 }, false);
 
 function custom_file_field() {
@@ -41,4 +42,82 @@ function close_confirmation_popup(e) {
     u('#popup-overlay').addClass('hidden');
     u('.confirmation-popup').removeClass('flex');
     u('.confirmation-popup').addClass('hidden');
-}
\ No newline at end of file
+}
+
+/*
+ * A page of the page tree is moved with its subpages by dropping it on another page:
+ * on the upper half of the row it is placed before that page, on the lower half it becomes
+ * its first subpage. The new order of the tree is saved at once.
+ */
+function page_tree_drag_and_drop() {
+    var tree = document.getElementById('page-tree');
+    if (!tree) {
+        return;
+    }
+    var dragged_id = null;
+    u(tree).find('tr[data-page-id]').each(function (row) {
+        row.addEventListener('dragstart', function (e) {
+            dragged_id = row.dataset.pageId;
+            e.dataTransfer.effectAllowed = 'move';
+            e.dataTransfer.setData('text/plain', dragged_id);
+        });
+        row.addEventListener('dragover', function (e) {
+            if (dragged_id !== null) {
+                e.preventDefault();
+            }
+        });
+        row.addEventListener('drop', function (e) {
+            e.preventDefault();
+            var rect = row.getBoundingClientRect();
+            var as_child = e.clientY > rect.top + rect.height / 2;
+            var ordering = get_page_tree_order(tree, dragged_id, row.dataset.pageId, as_child);
+            dragged_id = null;
+            if (ordering) {
+                save_page_tree_order(tree, ordering);
+            }
+        });
+    });
+}
+
+function get_page_tree_order(tree, dragged_id, target_id, as_child) {
+    var nodes = [];
+    u(tree).find('tr[data-page-id]').each(function (row) {
+        nodes.push({
+            id: row.dataset.pageId,
+            parent: row.dataset.parentId || null,
+            level: parseInt(row.dataset.level, 10)
+        });
+    });
+    var start = nodes.findIndex(function (node) { return node.id === dragged_id; });
+    var end = start + 1;
+    while (end < nodes.length && nodes[end].level > nodes[start].level) {
+        end++;
+    }
+    var subtree = nodes.splice(start, end - start);
+    var target = nodes.findIndex(function (node) { return node.id === target_id; });
+    if (target < 0) {
+        // the page was dropped on itself or on one of its subpages
+        return null;
+    }
+    // only the dragged page gets another parent, its subpages stay below it
+    subtree[0].parent = as_child ? nodes[target].id : nodes[target].parent;
+    Array.prototype.splice.apply(nodes, [as_child ? target + 1 : target, 0].concat(subtree));
+    return nodes.map(function (node) {
+        return {id: node.id, parent: node.parent};
+    });
+}
+
+function save_page_tree_order(tree, ordering) {
+    var request = new XMLHttpRequest();
+    request.open('POST', tree.dataset.reorderUrl);
+    request.setRequestHeader('Content-Type', 'application/json');
+    request.setRequestHeader('X-CSRFToken', u('.table-listing [name=csrfmiddlewaretoken]').first().value);
+    request.onload = function () {
+        if (request.status === 200) {
+            window.location.reload();
+        } else {
+            alert(request.responseText);
+        }
+    };
+    request.send(JSON.stringify(ordering));
+}
@@ -4,6 +4,9 @@ register = template.Library()
 
 @register.filter
 def page_translation_title(page, language):
+    if hasattr(page, 'current_translation'):
+        # the translation was chosen by Page.get_translated_tree() in the language of the tree
+        return page.current_translation
     all_page_translations = page.page_translations
     page_translation = all_page_translations.filter(language__code=language.code)
     if page_translation.exists():
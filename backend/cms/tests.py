@@ -1,3 +1,544 @@
-# from django.test import TestCase
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf.urls import url
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from backend import instrumentation
+
+from .models import (
+    DailyFeedbackCount,
+    Event,
+    EventOccurrence,
+    Feedback,
+    Language,
+    Page,
+    PageFeedback,
+    PageRevision,
+    PageTranslation,
+    PushNotification,
+    PushNotificationDelivery,
+    PushNotificationTranslation,
+    RecurrenceRule,
+    Site,
+)
+from .views.general.slug_utils import get_unique_slug
+from .views.pages.page_transfer import export_pages, get_unique_slugs, import_pages
+from .views.push_notifications.push_notification_sender import (
+    MAX_ATTEMPTS,
+    FakeGateway,
+    FirebaseGateway,
+    send_pending_deliveries,
+)
+from .views.statistics.matomo_api_manager import MatomoApiManager
+
+
+class PushNotificationDeliveryTestCase(TestCase):
+
+    def setUp(self):
+        site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                   push_notification_channels=['news', 'events'],
+                                   postal_code='86150', admin_mail='admin@example.com')
+        self.push_notification = PushNotification.objects.create(site=site, channel='')
+        for code in ('de-de', 'en-us'):
+            PushNotificationTranslation.objects.create(
+                push_notification=self.push_notification,
+                language=Language.objects.create(code=code, name=code),
+                title='Title {}'.format(code),
+                text='Text {}'.format(code),
+            )
+        self.push_notification.queue()
+
+    def retry_all(self, gateway):
+        PushNotificationDelivery.objects.filter(
+            status=PushNotificationDelivery.PENDING,
+        ).update(next_attempt=self.push_notification.queued_date)
+        return send_pending_deliveries(gateway)
+
+    def test_queue_once(self):
+        self.assertFalse(self.push_notification.queue())
+        self.assertEqual(self.push_notification.deliveries.count(), 4)
+
+    def test_send(self):
+        gateway = FakeGateway()
+        self.assertEqual(send_pending_deliveries(gateway), 4)
+        self.assertEqual(sorted(message['topic'] for message in gateway.outbox), [
+            'augsburg-de-de-events', 'augsburg-de-de-news',
+            'augsburg-en-us-events', 'augsburg-en-us-news',
+        ])
+        self.assertEqual(send_pending_deliveries(gateway), 0)
+        self.push_notification.refresh_from_db()
+        self.assertIsNotNone(self.push_notification.sent_date)
+
+    def test_retry_failed_topic(self):
+        gateway = FakeGateway(failing_topics={'augsburg-en-us-news'})
+        send_pending_deliveries(gateway)
+        failed = PushNotificationDelivery.objects.get(status=PushNotificationDelivery.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.next_attempt, self.push_notification.queued_date)
+        # the retry isn't due yet
+        self.assertEqual(send_pending_deliveries(gateway), 0)
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            self.retry_all(gateway)
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, PushNotificationDelivery.FAILED)
+        self.assertEqual(failed.attempts, MAX_ATTEMPTS)
+        self.assertEqual(len(gateway.outbox), 3)
+        self.push_notification.refresh_from_db()
+        self.assertIsNotNone(self.push_notification.sent_date)
+
+    def test_retry_gateway_error(self):
+        gateway = FakeGateway()
+        with mock.patch.object(gateway, 'send', side_effect=ConnectionError('unavailable')), \
+                self.assertLogs('cms.views.push_notifications.push_notification_sender'):
+            self.assertEqual(send_pending_deliveries(gateway), 4)
+        self.assertEqual(list(PushNotificationDelivery.objects.values_list(
+            'status', 'attempts', 'last_error'
+        ).distinct()), [(PushNotificationDelivery.PENDING, 1, 'unavailable')])
+
+        self.assertEqual(self.retry_all(gateway), 4)
+        self.assertEqual(len(gateway.outbox), 4)
+        self.assertFalse(PushNotificationDelivery.objects.exclude(
+            status=PushNotificationDelivery.SENT,
+        ).exists())
+
+    def test_outbox_per_instance(self):
+        send_pending_deliveries(FakeGateway())
+        self.assertEqual(FakeGateway().outbox, [])
+
+    def test_claim_before_send(self):
+        gateway = FakeGateway()
+
+        def send(messages):
+            # the claimed deliveries aren't due for other workers while they are sent
+            self.assertFalse(PushNotificationDelivery.objects.filter(
+                next_attempt__lte=timezone.now(),
+            ).exists())
+            self.assertEqual(send_pending_deliveries(FakeGateway()), 0)
+            return [None] * len(messages)
+
+        with mock.patch.object(gateway, 'send', side_effect=send):
+            self.assertEqual(send_pending_deliveries(gateway), 4)
+        self.assertEqual(PushNotificationDelivery.objects.filter(
+            status=PushNotificationDelivery.SENT,
+        ).count(), 4)
+
+    @override_settings(
+        PUSH_NOTIFICATION_GATEWAY='cms.views.push_notifications.push_notification_sender.'
+                                  'FirebaseGateway',
+        FCM_CREDENTIALS='',
+    )
+    def test_unconfigured_gateway(self):
+        with self.assertRaisesMessage(CommandError, 'FCM_CREDENTIALS'):
+            call_command('send_push_notifications', '--once')
+        self.assertFalse(PushNotificationDelivery.objects.exclude(
+            status=PushNotificationDelivery.PENDING,
+        ).exists())
+
+    def test_firebase_message(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as credentials_file:
+            json.dump({
+                'project_id': 'integreat',
+                'client_email': 'cms@integreat.iam.gserviceaccount.com',
+                'private_key': '',
+                'token_uri': 'https://oauth2.googleapis.com/token',
+            }, credentials_file)
+            credentials_file.flush()
+            with self.settings(FCM_CREDENTIALS=credentials_file.name):
+                gateway = FirebaseGateway()
+        token = mock.Mock(ok=True, **{'json.return_value': {
+            'access_token': 'token', 'expires_in': 3600,
+        }})
+        rejected = mock.Mock(ok=False, **{'json.return_value': {
+            'error': {'code': 400, 'message': 'Invalid topic'},
+        }})
+        with mock.patch.object(gateway, 'get_assertion', return_value='assertion'), \
+                mock.patch.object(gateway.session, 'post',
+                                  side_effect=[token, mock.Mock(ok=True), rejected]) as post:
+            self.assertEqual(gateway.send([{
+                'topic': 'augsburg-de-de-news', 'title': 'Title', 'text': 'Text',
+                'language': 'de-de', 'push_notification': 1,
+            }] * 2), [None, 'Invalid topic'])
+        self.assertEqual(post.call_args_list[1], mock.call(
+            'https://fcm.googleapis.com/v1/projects/integreat/messages:send', timeout=10,
+            json={'message': {
+                'topic': 'augsburg-de-de-news',
+                'notification': {'title': 'Title', 'body': 'Text'},
+                'data': {'push_notification': '1', 'language': 'de-de'},
+            }},
+        ))
+        self.assertEqual(gateway.session.headers['Authorization'], 'Bearer token')
+
+
+@override_settings(EVENT_OCCURRENCE_RETENTION=10, EVENT_OCCURRENCE_HORIZON=20)
+class EventOccurrenceTestCase(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                        push_notification_channels=[], postal_code='86150',
+                                        admin_mail='admin@example.com')
+        self.now = timezone.make_aware(datetime(2019, 3, 1, 12))
+
+    def create_event(self, recurrence_rule=None):
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            return Event.objects.create(site=self.site, start_date=date(2015, 1, 1),
+                                        start_time=datetime.min.time().replace(hour=10),
+                                        end_date=date(2015, 1, 1),
+                                        end_time=datetime.min.time().replace(hour=11),
+                                        recurrence_rule=recurrence_rule)
+
+    def get_stored_days(self, event):
+        return [timezone.localtime(start).date() for start in
+                event.occurrences.order_by('start').values_list('start', flat=True)]
+
+    def test_window_of_daily_event(self):
+        event = self.create_event(RecurrenceRule.objects.create(frequency=RecurrenceRule.DAILY))
+        days = self.get_stored_days(event)
+        # the occurrence on 2019-02-19 ended before the window starts at noon
+        self.assertEqual((days[0], days[-1], len(days)), (date(2019, 2, 20), date(2019, 3, 21), 30))
+
+        self.now += timedelta(days=5)
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            self.assertEqual(EventOccurrence.delete_expired(), 5)
+            event.extend_occurrences()
+        days = self.get_stored_days(event)
+        self.assertEqual((days[0], days[-1], len(days)), (date(2019, 2, 25), date(2019, 3, 26), 30))
+
+    def test_single_event_before_window(self):
+        event = self.create_event()
+        self.assertFalse(event.occurrences.exists())
+
+    def test_computed_like_rrule(self):
+        rules = [
+            (RecurrenceRule.DAILY, 1, None),
+            (RecurrenceRule.DAILY, 3, None),
+            (RecurrenceRule.WEEKLY, 1, [0, 3, 6]),
+            (RecurrenceRule.WEEKLY, 2, [1, 4]),
+            (RecurrenceRule.WEEKLY, 3, []),
+            (RecurrenceRule.WEEKLY, 1, None),
+        ]
+        for frequency, interval, weekdays in rules:
+            event = self.create_event(RecurrenceRule.objects.create(
+                frequency=frequency, interval=interval, weekdays_for_weekly=weekdays,
+                end_date=date(2019, 1, 20),
+            ))
+            compute = (event.get_daily_occurrences if frequency == RecurrenceRule.DAILY
+                       else event.get_weekly_occurrences)
+            for start, end in ((datetime(2014, 12, 1), datetime(2015, 1, 31)),
+                               (datetime(2016, 2, 27, 10, 30), datetime(2016, 3, 21, 10, 30)),
+                               (datetime(2019, 1, 1), datetime(2019, 3, 1))):
+                expected = event.get_occurrences(start, end)
+                self.assertTrue(expected)
+                self.assertEqual(compute(start, end), expected)
+                self.assertEqual(
+                    Event.get_occurrences_of_events(Event.objects.filter(id=event.id),
+                                                    start, end),
+                    [(event, occurrence) for occurrence in expected]
+                )
+
+
+class SyncTestCase(TestCase):
+
+    def setUp(self):
+        site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                   push_notification_channels=[], postal_code='86150',
+                                   admin_mail='admin@example.com')
+        language = Language.objects.create(code='de-de', name='Deutsch')
+        self.page = Page.objects.create(site=site)
+        PageTranslation.objects.create(page=self.page, language=language, slug='kontakt',
+                                       title='Kontakt', public=True)
+        self.client = Client()
+
+    def sync(self, since=None):
+        response = self.client.get('/api/augsburg/de-de/sync',
+                                   {'since': since} if since else {}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_archive_and_restore(self):
+        result = self.sync()
+        self.assertEqual([page['id'] for page in result['pages']], [self.page.id])
+
+        self.page.archived = True
+        self.page.save()
+        result = self.sync(result['timestamp'])
+        self.assertEqual(result['pages'], [])
+        self.assertEqual(result['deleted']['pages'], [self.page.id])
+
+        # only the page changes, its translation is unchanged since the first sync
+        self.page.archived = False
+        self.page.save()
+        result = self.sync(result['timestamp'])
+        self.assertEqual([page['id'] for page in result['pages']], [self.page.id])
+        self.assertEqual(result['deleted']['pages'], [])
+
+        result = self.sync(result['timestamp'])
+        self.assertEqual(result['pages'], [])
+
+
+class PageTransferTestCase(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                        push_notification_channels=[], postal_code='86150',
+                                        admin_mail='admin@example.com')
+        self.other_site = Site.objects.create(name='Nürnberg', slug='nuernberg',
+                                              status=Site.ACTIVE, push_notification_channels=[],
+                                              postal_code='90402', admin_mail='admin@example.com')
+        german = Language.objects.create(code='de-de', name='Deutsch')
+        english = Language.objects.create(code='en-us', name='English')
+        parent = Page.objects.create(site=self.site, icon='icons/welcome.png')
+        child = Page.objects.create(site=self.site, parent=parent)
+        Page.objects.create(site=self.site, archived=True)
+        PageTranslation.objects.create(page=parent, language=german, slug='willkommen',
+                                       title='Willkommen', text='<p>Hallo</p>', public=True)
+        PageTranslation.objects.create(page=parent, language=english, slug='welcome',
+                                       title='Welcome', text='<p>Hello</p>')
+        PageTranslation.objects.create(page=child, language=german, slug='kontakt',
+                                       title='Kontakt', text='Telefon')
+
+    def get_tree(self, site):
+        return [
+            (page.level, page.icon or None, page.archived, sorted(
+                (translation.language.code, translation.title, translation.text,
+                 translation.public)
+                for translation in page.page_translations.all()
+            )) for page in Page.objects.filter(site=site).order_by('tree_id', 'lft')
+        ]
+
+    def test_round_trip(self):
+        lines = list(export_pages(self.site))
+        self.assertEqual(import_pages(self.other_site, lines), 3)
+        self.assertEqual(self.get_tree(self.other_site), self.get_tree(self.site))
+        imported = PageTranslation.objects.filter(page__site=self.other_site)
+        # the slugs are taken by the exported site
+        self.assertEqual(sorted(imported.values_list('permalink', flat=True)), [
+            'nuernberg/de-de/willkommen-2/', 'nuernberg/de-de/willkommen-2/kontakt-2/',
+            'nuernberg/en-us/welcome-2/',
+        ])
+        self.assertEqual(PageRevision.objects.filter(page_translation__in=imported).count(), 3)
+        for translation in imported:
+            # the exported version is followed by the revision of the import
+            self.assertEqual(translation.version, 2)
+            self.assertEqual(translation.revisions.get(version=2).get_text(), translation.text)
+
+    def test_invalid_translation(self):
+        for translations in ({'de-de': 'Kontakt'}, {'de-de': {'title': ['Kontakt']}}, ['de-de']):
+            with self.assertRaises(ValueError):
+                import_pages(self.other_site, [json.dumps({'id': 1, 'translations': translations})])
+        self.assertFalse(Page.objects.filter(site=self.other_site).exists())
+
+
+class PageReorderTestCase(TestCase):
+
+    def setUp(self):
+        site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                   push_notification_channels=[], postal_code='86150',
+                                   admin_mail='admin@example.com')
+        self.first = Page.objects.create(site=site)
+        self.child = Page.objects.create(site=site, parent=self.first)
+        self.second = Page.objects.create(site=site)
+        self.client = Client()
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+        self.url = reverse('reorder_pages', kwargs={'site_slug': 'augsburg'})
+
+    def reorder(self, ordering):
+        return self.client.post(self.url, json.dumps([
+            {'id': page.id, 'parent': parent and parent.id} for page, parent in ordering
+        ]), content_type='application/json')
+
+    def test_reorder(self):
+        response = self.reorder([(self.second, None), (self.child, self.second),
+                                 (self.first, self.child)])
+        self.assertEqual(response.json(), {'moved': 3})
+        self.assertEqual([
+            (page.id, page.parent_id, page.level)
+            for page in Page.objects.order_by('tree_id', 'lft')
+        ], [(self.second.id, None, 0), (self.child.id, self.second.id, 1),
+            (self.first.id, self.child.id, 2)])
+
+    def test_invalid_order(self):
+        for ordering in ([(self.child, self.first), (self.first, None)],
+                         [(self.first, None), (self.first, None)]):
+            self.assertEqual(self.reorder(ordering).status_code, 400)
+        self.assertEqual(self.reorder([(self.first, self.child), (self.child, self.first)]).content,
+                         'Parent {} has to occur before page {}.'.format(
+                             self.child.id, self.first.id
+                         ).encode())
+
+
+class UniqueSlugsTestCase(TestCase):
+
+    def setUp(self):
+        site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                   push_notification_channels=[], postal_code='86150',
+                                   admin_mail='admin@example.com')
+        language = Language.objects.create(code='de-de', name='Deutsch')
+        for slug in ('kontakt', 'kontakt-5', 'impressum-2'):
+            PageTranslation.objects.create(page=Page.objects.create(site=site), language=language,
+                                           slug=slug, title=slug)
+
+    def test_unique_slug(self):
+        translations = PageTranslation.objects.all()
+        self.assertEqual(get_unique_slug(translations, 'kontakt'), 'kontakt-6')
+        self.assertEqual(get_unique_slug(translations, 'impressum'), 'impressum')
+        self.assertEqual(get_unique_slug(translations, 'hilfe'), 'hilfe')
+
+    def test_existing_slugs(self):
+        self.assertEqual(get_unique_slugs(['kontakt', 'impressum', 'kontakt']),
+                         ['kontakt-6', 'impressum', 'kontakt-7'])
+
+    def test_reserved_slugs_of_batch(self):
+        self.assertEqual(get_unique_slugs(['hilfe', 'hilfe', 'hilfe-2', 'hilfe']),
+                         ['hilfe', 'hilfe-3', 'hilfe-2', 'hilfe-4'])
+        self.assertEqual(get_unique_slugs(['impressum', 'impressum']),
+                         ['impressum', 'impressum-3'])
+
+
+class FeedbackTestCase(TestCase):
+
+    def test_type_and_site(self):
+        site = Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                                   push_notification_channels=[], postal_code='86150',
+                                   admin_mail='admin@example.com')
+        page = Page.objects.create(site=site)
+        feedback = PageFeedback.objects.create(page=page, emotion=Feedback.NEGATIVE)
+        self.assertEqual((feedback.feedback_type, feedback.site), (Feedback.PAGE, site))
+        self.assertEqual(list(DailyFeedbackCount.get_most_criticized(site)), [
+            {'object_id': page.id, 'positive_count': 0, 'negative_count': 1},
+        ])
+        self.assertEqual(list(Feedback.get_unread(site)), [feedback])
+
+
+class StatisticsTestCase(TestCase):
+
+    def setUp(self):
+        Site.objects.create(name='Augsburg', slug='augsburg', status=Site.ACTIVE,
+                            push_notification_channels=[], postal_code='86150',
+                            admin_mail='admin@example.com')
+        self.client = Client()
+        self.client.force_login(User.objects.create_user('admin', password='pw'))
+
+    def test_invalid_time_range(self):
+        for url_name in ('statistics', 'export_statistics'):
+            url = reverse(url_name, kwargs={'site_slug': 'augsburg'})
+            for query in ({'start_date': 'yesterday'}, {'end_date': '2019-02-30'},
+                          {'start_date': '2019-03-02', 'end_date': '2019-03-01'}):
+                response = self.client.get(url, query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.content, b'Invalid timerange.')
+
+
+def instrumented_view(request, site_slug):
+    # one query per site, so the statement is duplicated
+    sites = [Site.objects.get(id=site_id)
+             for site_id in Site.objects.order_by('id').values_list('id', flat=True)]
+    template = engines['django'].from_string('{% for site in sites %}{{ site.name }} {% endfor %}')
+    return HttpResponse(template.render({'sites': sites}, request))
+
+
+urlpatterns = [
+    url(r'^instrumented/(?P<site_slug>[-\w]+)$', instrumented_view, name='instrumented'),
+]
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, ROOT_URLCONF='cms.tests')
+class InstrumentationTestCase(TestCase):
+
+    def setUp(self):
+        for slug in ('augsburg', 'nuernberg'):
+            Site.objects.create(name=slug.title(), slug=slug, status=Site.ACTIVE,
+                                push_notification_channels=[], postal_code='86150',
+                                admin_mail='admin@example.com')
+        self.metrics = instrumentation.Metrics()
+
+    def test_view(self):
+        with mock.patch.object(instrumentation, 'metrics', self.metrics), \
+                CaptureQueriesContext(connection) as queries:
+            response = Client().get('/instrumented/augsburg')
+        self.assertEqual(response.content, b'Augsburg Nuernberg ')
+        request = self.metrics.get_requests()[0]
+        self.assertEqual((request['view'], request['status']), ('instrumented', 200))
+        # the site of the url, the ids and one query per site
+        self.assertEqual(request['query_count'], len(queries))
+        self.assertEqual(request['query_count'], 4)
+        self.assertEqual(request['duplicated_statements'][0][1], 2)
+        self.assertGreater(request['template_time'], 0)
+        self.assertLess(request['query_time'] + request['template_time'], request['duration'])
+
+    def test_cursors(self):
+        instrumentation.install()
+        measurement = instrumentation.start_measurement()
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany('UPDATE cms_site SET name = %s WHERE slug = %s',
+                                   [('Augsburg', 'augsburg'), ('Nürnberg', 'nuernberg')])
+                cursor.execute('SELECT name FROM cms_site ORDER BY name')
+                self.assertEqual(list(cursor), [('Augsburg',), ('Nürnberg',)])
+            self.assertEqual(len(list(Site.objects.all().iterator())), 2)
+        finally:
+            instrumentation.stop_measurement()
+        Site.objects.count()
+        self.assertEqual(measurement.query_count, 3)
+        self.assertEqual(len(measurement.statements), 3)
+
+
+class SlowMatomoHandler(BaseHTTPRequestHandler):
+    """
+    Stub of the Matomo API, which answers every request after a fixed delay
+    """
+    delay = 0.5
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        time.sleep(self.delay)
+        body = json.dumps({'2020-01': {'nb_uniq_visitors': 3}, '2020-02': []}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MatomoApiManagerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowMatomoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.api_man = MatomoApiManager('127.0.0.1', 'token', ssl_verify=False)
+        # the stub doesn't support https
+        self.api_man.matomo_url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.addCleanup(self.api_man.close)
+
+    def test_languages_requested_concurrently(self):
+        languages = ['de-de', 'en-us', 'ar-ma', 'fa-ir']
+        start = time.monotonic()
+        all_hits = self.api_man.get_visitors_per_language('2020-01-01,2020-02-29', 2, 'month',
+                                                          languages)
+        duration = time.monotonic() - start
+        self.assertEqual(all_hits, [[['01-2020', 3], ['02-2020', 0]]] * len(languages))
+        self.assertGreaterEqual(duration, SlowMatomoHandler.delay)
+        self.assertLess(duration, 2 * SlowMatomoHandler.delay)
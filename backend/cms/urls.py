@@ -44,6 +44,11 @@ urlpatterns = [
     ])),
 
     url(r'^settings/$', general.AdminSettingsView.as_view(), name='admin_settings'),
+    url(r'^instrumentation/', include([
+        url(r'^$', general.InstrumentationView.as_view(), name='instrumentation'),
+        url(r'^metrics$', general.InstrumentationMetricsView.as_view(),
+            name='instrumentation_metrics'),
+    ])),
     url(r'^login/$', registration.login, name='login'),
     url(r'^logout/$', registration.logout, name='logout'),
     url(r'^password_reset/', include([
@@ -74,6 +79,9 @@ urlpatterns = [
         url(r'^$', general.DashboardView.as_view(), name='dashboard'),
         url(r'^pages/', include([
             url(r'^$', pages.PageTreeView.as_view(), name='pages'),
+            url(r'^export$', pages.PageExportView.as_view(), name='export_pages'),
+            url(r'^import$', pages.PageImportView.as_view(), name='import_pages'),
+            url(r'^reorder$', pages.PageReorderView.as_view(), name='reorder_pages'),
             url(r'^(?P<language_code>[-\w]+)/', include([
                 url(r'^$', pages.PageTreeView.as_view(), name='pages'),
                 url(r'^new$', pages.PageView.as_view(), name='new_page'),
@@ -88,6 +96,11 @@ urlpatterns = [
                         pages.SBSPageView.as_view(),
                         name='sbs_edit_page'
                     ),
+                    url(
+                        r'^revisions$',
+                        pages.PageRevisionsView.as_view(),
+                        name='page_revisions'
+                    ),
                     url(
                         r'^archive$',
                         pages.archive_page,
@@ -142,6 +155,11 @@ urlpatterns = [
             ])),
         ])),
         url(r'^statistics/$', statistics.AnalyticsView.as_view(), name='statistics'),
+        url(
+            r'^statistics/export$',
+            statistics.AnalyticsExportView.as_view(),
+            name='export_statistics'
+        ),
         url(r'^settings/$', general.SettingsView.as_view(), name='settings'),
     ])),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
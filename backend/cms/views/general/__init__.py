@@ -1,5 +1,7 @@
 from .dashboard import *
 from .admin_dashboard import *
+from .instrumentation import *
 from .general import *
 from .tree_utils import *
+from .slug_utils import *
 from .settings import *
@@ -6,6 +6,9 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django.shortcuts import render
 
+from ...models import Site
+from .translation_coverage import get_translation_coverage
+
 
 @method_decorator(login_required, name='dispatch')
 class AdminDashboardView(TemplateView):
@@ -22,6 +25,15 @@ class AdminDashboardView(TemplateView):
     base_context = {'current_menu_item': 'admin_dashboard'}
 
     def get(self, request, *args, **kwargs):
-        val = 'To be defined'
-        return render(request, self.template_name,
-                      {'key': val, **self.base_context})
+        sites = []
+        for site in Site.get_sites():
+            if site.status == Site.ARCHIVED:
+                continue
+            coverage = get_translation_coverage(site)
+            sites.append({
+                'site': site,
+                'page_count': coverage['page_count'],
+                'missing': sum(language['missing'] for language in coverage['languages']),
+                'outdated': sum(language['outdated'] for language in coverage['languages']),
+            })
+        return render(request, self.template_name, {**self.base_context, 'site_coverages': sites})
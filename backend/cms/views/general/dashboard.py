@@ -6,6 +6,9 @@ from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django.shortcuts import render
 
+from ...models import DailyFeedbackCount, Feedback, PageTranslation, Site
+from .translation_coverage import get_translation_coverage
+
 
 @method_decorator(login_required, name='dispatch')
 class DashboardView(TemplateView):
@@ -22,6 +25,18 @@ class DashboardView(TemplateView):
     base_context = {'current_menu_item': 'dashboard'}
 
     def get(self, request, *args, **kwargs):
-        val = 'To be defined'
-        return render(request, self.template_name,
-                      {'key': val, **self.base_context})
+        site = Site.get_current_site(request)
+        criticized_pages = list(DailyFeedbackCount.get_most_criticized(site))
+        titles = dict(PageTranslation.objects.filter(
+            page_id__in=[criticized_page['object_id'] for criticized_page in criticized_pages],
+            language=site.default_language,
+        ).values_list('page_id', 'title'))
+        for criticized_page in criticized_pages:
+            criticized_page['title'] = titles.get(criticized_page['object_id'])
+        return render(request, self.template_name, {
+            **self.base_context,
+            'coverage': get_translation_coverage(site),
+            'statuses': [label for _, label in PageTranslation.STATUS],
+            'unread_feedback_count': Feedback.get_unread(site).count(),
+            'criticized_pages': criticized_pages,
+        })
@@ -0,0 +1,58 @@
+"""
+Views to inspect the measurements of backend.middleware.InstrumentationMiddleware
+"""
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.generic import TemplateView, View
+
+from backend.instrumentation import metrics
+
+# number of the slowest requests which are shown
+SLOWEST_REQUESTS = 20
+
+
+@method_decorator(login_required, name='dispatch')
+@method_decorator(user_passes_test(lambda user: user.is_superuser), name='dispatch')
+class InstrumentationView(TemplateView):
+    """View class showing the latency and database queries per view of the latest requests
+
+    Args:
+        TemplateView : View inherits from the django TemplateView class
+
+    Returns:
+        View : Rendered HTML-Page with the measurements of this process
+    """
+
+    template_name = 'general/instrumentation.html'
+    base_context = {'current_menu_item': 'instrumentation'}
+
+    def get(self, request, *args, **kwargs):
+        requests = metrics.get_requests()
+        return render(request, self.template_name, {
+            **self.base_context,
+            'enabled': settings.INSTRUMENTATION_ENABLED,
+            'request_count': len(requests),
+            'views': metrics.get_views(),
+            'slowest_requests': sorted(requests, key=lambda request: request['duration'],
+                                       reverse=True)[:SLOWEST_REQUESTS],
+        })
+
+
+class InstrumentationMetricsView(View):
+    """View class exporting the measurements in the text format of Prometheus.
+    It is accessible with the bearer token INSTRUMENTATION_METRICS_TOKEN or as superuser.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = settings.INSTRUMENTATION_METRICS_TOKEN
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not (token and hmac.compare_digest(authorization, 'Bearer {}'.format(token))
+                or request.user.is_superuser):
+            return HttpResponse('Not authorized.', content_type='text/plain', status=403)
+        return HttpResponse(metrics.render_prometheus(),
+                            content_type='text/plain; version=0.0.4; charset=utf-8')
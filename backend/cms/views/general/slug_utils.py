@@ -0,0 +1,75 @@
+import re
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Substr
+
+
+def get_unique_slug(queryset, slug):
+    """Find a slug which is not used by any object of the queryset in a single query.
+    If the slug itself is already taken, the suffix "-n" with the next number after the highest
+    existing suffix is appended.
+
+    Args:
+        queryset : Objects whose slugs have to be different
+        slug : The desired slug
+
+    Returns:
+        String : The desired slug or the desired slug with the next free suffix
+    """
+    slugs = queryset.filter(
+        slug__regex=r'^{}(-[0-9]{{1,18}})?$'.format(re.escape(slug))
+    ).aggregate(
+        taken=models.Max(models.Case(
+            models.When(slug=slug, then=models.Value(1)),
+            default=models.Value(0),
+            output_field=models.IntegerField(),
+        )),
+        highest_suffix=models.Max(models.Case(
+            # the slug without suffix counts as "slug-1"
+            models.When(slug=slug, then=models.Value(1)),
+            default=Cast(Substr('slug', len(slug) + 2), models.BigIntegerField()),
+            output_field=models.BigIntegerField(),
+        )),
+    )
+    # suffixed slugs alone don't prevent the desired slug
+    if not slugs['taken']:
+        return slug
+    return '{}-{}'.format(slug, slugs['highest_suffix'] + 1)
+
+
+def is_variant_of_slug(existing_slug, slug):
+    """Check whether an existing slug is the desired slug, optionally with a numeric suffix.
+    In this case, the existing slug can be kept instead of allocating a new one.
+
+    Args:
+        existing_slug : The slug an object currently has
+        slug : The desired slug
+
+    Returns:
+        Boolean : True if the existing slug is derived from the desired slug
+    """
+    return bool(re.fullmatch(r'{}(-[0-9]+)?'.format(re.escape(slug)), existing_slug))
+
+
+def save_with_unique_slug(queryset, slug, save, attempts=3):
+    """Save an object with a unique slug. If another object got the same slug in the meantime,
+    the unique constraint of the slug fails and a new slug is allocated.
+
+    Args:
+        queryset : Objects whose slugs have to be different
+        slug : The desired slug
+        save : Function which saves the object with the slug passed as argument
+        attempts : Number of slugs which are tried
+
+    Returns:
+        The return value of save
+    """
+    for attempt in range(attempts):
+        unique_slug = get_unique_slug(queryset, slug)
+        try:
+            with transaction.atomic():
+                return save(unique_slug)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+    return None
@@ -0,0 +1,89 @@
+"""
+Status of the page translations of a site per language, as shown on the dashboards
+"""
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count
+
+from ...models import LanguageTreeNode, Page, PageTranslation
+from ...models.site import TRANSLATION_COVERAGE_CACHE_KEY
+
+# the coverage is invalidated by the signals of pages and translations, but bulk changes skip them
+TRANSLATION_COVERAGE_CACHE_TIMEOUT = 3600
+# number of outdated translations which are listed
+OUTDATED_TRANSLATIONS_LIMIT = 20
+
+
+def get_translation_coverage(site):
+    """Provides the status of the translations of a site and caches it until a page or a
+    translation of the site changes
+
+    Args:
+        site : The site
+
+    Returns:
+        Dict : see compute_translation_coverage()
+    """
+    cache_key = TRANSLATION_COVERAGE_CACHE_KEY.format(site.id)
+    coverage = cache.get(cache_key)
+    if coverage is None:
+        coverage = compute_translation_coverage(site)
+        cache.set(cache_key, coverage, TRANSLATION_COVERAGE_CACHE_TIMEOUT)
+    return coverage
+
+
+def compute_translation_coverage(site):
+    """Count the missing translations, the translations in each status and the outdated
+    translations per language with one GROUP BY query
+
+    Args:
+        site : The site
+
+    Returns:
+        Dict : "page_count", "languages" with the counts of each language in the order of the
+               language tree, and "outdated_translations" with the longest outdated translations
+    """
+    page_count = Page.objects.filter(site=site, archived=False).count()
+    source_language_ids = dict(LanguageTreeNode.objects.filter(site=site).values_list(
+        'language_id', 'parent__language_id'
+    ))
+    translations = PageTranslation.objects.filter(
+        page__site=site,
+        page__archived=False,
+        language_id__in=source_language_ids,
+    )
+    counts = {
+        row['language_id']: row
+        for row in translations.order_by().values('language_id').annotate(
+            total=Count('id'),
+            # see PageTranslation.update_outdated()
+            outdated_count=Count(models.Case(models.When(outdated=True, then=1))),
+            **{
+                status: Count(models.Case(models.When(status=status, then=1)))
+                for status, _ in PageTranslation.STATUS
+            }
+        )
+    }
+
+    languages = []
+    for language in site.languages:
+        row = counts.get(language.id, {})
+        source_language_id = source_language_ids.get(language.id)
+        languages.append({
+            'code': language.code,
+            'name': language.name,
+            'source_language': next((source_language.name for source_language in site.languages
+                                     if source_language.id == source_language_id), None),
+            'missing': page_count - row.get('total', 0),
+            'statuses': [row.get(status, 0) for status, _ in PageTranslation.STATUS],
+            'outdated': row.get('outdated_count', 0),
+        })
+    return {
+        'page_count': page_count,
+        'languages': languages,
+        'outdated_translations': list(translations.filter(outdated=True).order_by(
+            'content_updated'
+        ).values(
+            'page_id', 'title', 'language__code', 'content_updated'
+        )[:OUTDATED_TRANSLATIONS_LIMIT]),
+    }
@@ -6,3 +6,33 @@ POSITION_CHOICES = (
     ('left', _('Left neighbor of')),
     ('right', _('Right neighbor of'))
 )
+
+
+def get_tree_fields(children, tree_ids):
+    """Compute the MPTT fields of whole trees in one pass instead of moving nodes one by one
+
+    Args:
+        children : Dict of the ordered lists of the children of each node, the roots are the
+                   children of None
+        tree_ids : Iterator of the tree ids which are assigned to the roots in their order
+
+    Returns:
+        Dict : (tree_id, lft, rght, level) of each node
+    """
+    tree_fields = {}
+    for root in children.get(None, []):
+        tree_id = next(tree_ids)
+        counter = 1
+        # stack of (node, level, whether its children were already visited)
+        stack = [(root, 0, False)]
+        while stack:
+            node, level, visited = stack.pop()
+            if visited:
+                tree_fields[node] = (tree_id, tree_fields[node][1], counter, level)
+            else:
+                tree_fields[node] = (tree_id, counter, None, level)
+                stack.append((node, level, True))
+                stack.extend((child, level + 1, False)
+                             for child in reversed(children.get(node, [])))
+            counter += 1
+    return tree_fields
@@ -3,7 +3,7 @@ Form for creating a language object
 """
 
 from django import forms
-from ...models import Language
+from ...models import Language, PageTranslation, Site
 
 
 class LanguageForm(forms.ModelForm):
@@ -34,6 +34,15 @@ class LanguageForm(forms.ModelForm):
             language.name = self.cleaned_data['name']
             language.text_direction = self.cleaned_data['text_direction']
             language.save()
+            if language.code != language_code:
+                for site_slug in Site.objects.filter(
+                        pages__page_translations__language=language
+                ).distinct().values_list('slug', flat=True):
+                    PageTranslation.replace_permalink_prefix(
+                        PageTranslation.objects.filter(language=language),
+                        site_slug + '/' + language_code + '/',
+                        site_slug + '/' + language.code + '/'
+                    )
         else:
             # create language
             language = Language.objects.create(
@@ -1,7 +1,9 @@
 """
 Python standard Init-File
 """
-from .pages import PageTreeView
+from .pages import PageTreeView, PageReorderView
 from .page import PageView, archive_page, restore_page
 from .archive import ArchivedPagesView
 from .sbs_page import SBSPageView
+from .page_transfer import PageExportView, PageImportView
+from .page_revisions import PageRevisionsView
@@ -18,7 +18,7 @@ class ArchivedPagesView(TemplateView):
 	def get(self, request, *args, **kwargs):
 		# current site
 		site_slug = kwargs.get('site_slug')
-		site = Site.objects.get(slug=site_slug)
+		site = Site.get_current_site(request)
 
 		# current language
 		language_code = kwargs.get('language_code', None)
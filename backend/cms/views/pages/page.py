@@ -20,7 +20,7 @@ class PageView(TemplateView):
     base_context = {'current_menu_item': 'pages'}
 
     def get(self, request, *args, **kwargs):
-        site = Site.objects.get(slug=kwargs.get('site_slug'))
+        site = Site.get_current_site(request)
         page = Page.objects.filter(pk=kwargs.get('page_id', None)).first()
         language = Language.objects.get(code=kwargs.get('language_code'))
         languages = site.languages
@@ -8,7 +8,7 @@ from django.utils.text import slugify
 from django.utils.translation import ugettext as _
 
 from ...models import Page, PageTranslation, Site, Language
-from ..general import POSITION_CHOICES
+from ..general import POSITION_CHOICES, is_variant_of_slug, save_with_unique_slug
 
 
 class PageForm(forms.ModelForm):
@@ -53,32 +53,6 @@ class PageForm(forms.ModelForm):
             page__id=page_id,
             language__code=language_code
         ).first()
-        # make sure the slug derived from the title is unique
-        if (
-                (
-                    (
-                        # page is created
-                        not page_id
-                        or
-                        # translation is created
-                        not page_translation
-                    )
-                    or
-                    # slug has changed
-                    page_translation.slug != slug
-                )
-                and
-                # the new slug already exists
-                PageTranslation.objects.filter(slug=slug).exists()
-        ):
-            old_slug = slug
-            i = 1
-            while True:
-                i += 1
-                slug = old_slug + '-' + str(i)
-                if not PageTranslation.objects.filter(slug=slug).exists():
-                    break
-
         # TODO: version, active_version
 
         if publish:
@@ -95,7 +69,10 @@ class PageForm(forms.ModelForm):
             else:
                 page.public = self.cleaned_data['public']
             page.save()
+            old_parent_id = page.parent_id
             page.move_to(self.cleaned_data['parent'], self.cleaned_data['position'])
+            if page.parent_id != old_parent_id:
+                page.update_permalinks()
         else:
             # create page
             page = Page.objects.create(
@@ -106,15 +83,21 @@ class PageForm(forms.ModelForm):
 
         if page_translation:
             # save page translation
-            page_translation.slug = slug
             page_translation.title = self.cleaned_data['title']
             page_translation.text = self.cleaned_data['text']
             page_translation.status = self.cleaned_data['status']
-            page_translation.save()
+            if is_variant_of_slug(page_translation.slug, slug):
+                page_translation.save()
+            else:
+                # make sure the slug derived from the title is unique
+                save_with_unique_slug(
+                    PageTranslation.objects.exclude(id=page_translation.id),
+                    slug,
+                    lambda unique_slug: self.save_translation(page_translation, unique_slug)
+                )
         else:
             # create page translation
-            page_translation = PageTranslation.objects.create(
-                slug=slug,
+            page_translation = PageTranslation(
                 title=self.cleaned_data['title'],
                 text=self.cleaned_data['text'],
                 status=self.cleaned_data['status'],
@@ -123,5 +106,16 @@ class PageForm(forms.ModelForm):
                 page=page,
                 creator=self.user
             )
+            # make sure the slug derived from the title is unique
+            save_with_unique_slug(
+                PageTranslation.objects.all(),
+                slug,
+                lambda unique_slug: self.save_translation(page_translation, unique_slug)
+            )
 
         return page
+
+    @staticmethod
+    def save_translation(page_translation, slug):
+        page_translation.slug = slug
+        page_translation.save()
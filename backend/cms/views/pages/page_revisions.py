@@ -0,0 +1,39 @@
+"""
+Functionality for browsing the saved versions of a page translation
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.generic import TemplateView
+
+from ...models import Page, PageRevision
+
+
+@method_decorator(login_required, name='dispatch')
+class PageRevisionsView(TemplateView):
+    template_name = 'pages/revisions.html'
+    base_context = {'current_menu_item': 'pages'}
+
+    def get(self, request, *args, **kwargs):
+        page = Page.objects.filter(pk=kwargs.get('page_id')).first()
+        page_translation = page.get_translation(kwargs.get('language_code')) if page else None
+        if page_translation is None:
+            raise Http404
+        # the content is only needed to reconstruct the selected revision
+        revisions = PageRevision.get_list(page_translation).select_related('creator')
+        selected_revision = None
+        if request.GET.get('version', '').isdigit():
+            selected_revision = revisions.filter(version=request.GET['version']).first()
+        elif revisions:
+            selected_revision = revisions[0]
+
+        return render(request, self.template_name, {
+            **self.base_context,
+            'page': page,
+            'page_translation': page_translation,
+            'language': page_translation.language,
+            'revisions': revisions,
+            'selected_revision': selected_revision,
+            'selected_text': selected_revision.get_text() if selected_revision else None,
+        })
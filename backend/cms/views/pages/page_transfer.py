@@ -0,0 +1,285 @@
+"""
+Import and export of whole page trees as JSON lines.
+Each line contains one page with its translations in all languages. The pages are ordered like
+the page tree, so parents always come before their children and siblings are in their order.
+"""
+import itertools
+import json
+import re
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Func, Value
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.utils.decorators import method_decorator
+from django.utils.text import slugify
+from django.utils.translation import ugettext as _
+from django.views.generic import View
+
+from ...models import Language, Page, PageRevision, PageTranslation, Site
+from ...models.search import update_search_vectors
+from ...models.site import TRANSLATION_COVERAGE_CACHE_KEY
+from ..general import get_tree_fields
+
+# fields of the page translations which are exported and imported
+TRANSLATION_FIELDS = ['title', 'slug', 'text', 'status', 'public', 'version', 'minor_edit',
+                      'currently_in_translation']
+# fields of the imported translations which have to be strings
+STRING_FIELDS = ['title', 'slug', 'text', 'status']
+
+
+def export_pages(site, chunk_size=500):
+    """
+    Generator for the JSON lines of all pages of a site
+    :param site: Site
+    :param chunk_size: number of pages whose translations are loaded at once
+    :return: Generator of Strings, each one ending with a newline
+    """
+    pages = Page.objects.filter(site=site).order_by('tree_id', 'lft').values_list(
+        'id', 'parent_id', 'icon', 'archived'
+    )
+    chunk = []
+    for page in pages.iterator():
+        chunk.append(page)
+        if len(chunk) == chunk_size:
+            yield from export_chunk(chunk)
+            chunk = []
+    yield from export_chunk(chunk)
+
+
+def export_chunk(pages):
+    translations = {}
+    for values in PageTranslation.objects.filter(
+            page_id__in=[page[0] for page in pages]
+    ).order_by('id').values('page_id', 'language__code', *TRANSLATION_FIELDS):
+        translations.setdefault(values.pop('page_id'), {})[values.pop('language__code')] = values
+    for page_id, parent_id, icon, archived in pages:
+        yield json.dumps({
+            'id': page_id,
+            'parent': parent_id,
+            'icon': icon or None,
+            'archived': archived,
+            'translations': translations.get(page_id, {}),
+        }, cls=DjangoJSONEncoder) + '\n'
+
+
+def is_valid_translation(translation):
+    """
+    Check the types of the fields of an imported translation
+    :param translation: decoded JSON of the translation
+    :return: True if the translation can be imported
+    """
+    return isinstance(translation, dict) and all(
+        isinstance(translation.get(field, ''), str) for field in STRING_FIELDS
+    ) and isinstance(translation.get('version', 0), int) and not isinstance(
+        translation.get('version'), bool
+    )
+
+
+def import_pages(site, lines, creator=None):
+    """
+    Create the pages of the given JSON lines as new page trees of a site.
+    All pages and translations are inserted with a few bulk queries and the fields of the page
+    tree are computed once in memory instead of moving every page into the tree separately.
+    :param site: Site
+    :param lines: Iterable of Strings or bytes in the format of export_pages()
+    :param creator: User who is stored as creator of the translations
+    :return: number of imported pages
+    """
+    records = []
+    record_indices = {}
+    # the ancestors of each page are needed for the permalinks
+    ancestors = []
+    children = {None: []}
+    languages = {language.code: language for language in Language.objects.all()}
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            source_id = record['id']
+            parent_id = record.get('parent')
+            translations = record.get('translations', {})
+            unknown_languages = set(translations) - set(languages)
+            # the translations are read inside the transaction, which must not fail
+            if not all(map(is_valid_translation, translations.values())):
+                raise ValueError
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise ValueError(_('Line {} is not a valid page.').format(line_number))
+        if source_id in record_indices:
+            raise ValueError(_('Line {}: page {} occurs twice.').format(line_number, source_id))
+        if parent_id is not None and parent_id not in record_indices:
+            raise ValueError(_('Line {}: parent {} has to occur before its children.').format(
+                line_number, parent_id))
+        if unknown_languages:
+            raise ValueError(_('Line {}: unknown languages {}.').format(
+                line_number, ', '.join(sorted(unknown_languages))))
+        parent_index = record_indices.get(parent_id)
+        ancestors.append([] if parent_index is None else ancestors[parent_index] + [parent_index])
+        record_indices[source_id] = len(records)
+        children[len(records)] = []
+        children[parent_index].append(len(records))
+        records.append(record)
+    if not records:
+        return 0
+
+    with transaction.atomic():
+        # the site row serializes batch edits of the same site. A translation which gets one of
+        # the slugs at the same time makes the import fail with an IntegrityError.
+        Site.objects.select_for_update().get(id=site.id)
+        tree_fields = get_tree_fields(children,
+                                      itertools.count(Page.objects.get_next_tree_id(site.id)))
+        pages = []
+        levels = []
+        for index, record in enumerate(records):
+            tree_id, lft, rght, level = tree_fields[index]
+            pages.append(Page(
+                site=site,
+                icon=record.get('icon') or None,
+                archived=bool(record.get('archived', False)),
+                tree_id=tree_id,
+                lft=lft,
+                rght=rght,
+                level=level,
+            ))
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(index)
+
+        # the parents have to be inserted before their children to know their ids
+        with Page.objects.disable_mptt_updates():
+            for level_indices in levels:
+                for index in level_indices:
+                    if ancestors[index]:
+                        pages[index].parent_id = pages[ancestors[index][-1]].id
+                Page.objects.bulk_create([pages[index] for index in level_indices],
+                                         batch_size=1000)
+
+        slugs = {}
+        for index, record in enumerate(records):
+            for language_code, translation in record.get('translations', {}).items():
+                slugs[(index, language_code)] = slugify(
+                    translation.get('slug') or translation.get('title', '')
+                )
+        unique_slugs = get_unique_slugs(list(slugs.values()))
+        for key, slug in zip(slugs, unique_slugs):
+            slugs[key] = slug
+
+        page_translations = []
+        for index, record in enumerate(records):
+            for language_code, translation in record.get('translations', {}).items():
+                # only ancestors with a translation in the same language are part of the permalink
+                ancestor_slugs = [slugs[(ancestor, language_code)] for ancestor in ancestors[index]
+                                  if (ancestor, language_code) in slugs]
+                page_translations.append(PageTranslation(
+                    page=pages[index],
+                    language=languages[language_code],
+                    creator=creator,
+                    permalink='/'.join([site.slug, language_code, *ancestor_slugs,
+                                        slugs[(index, language_code)]]) + '/',
+                    **{
+                        **{field: translation[field] for field in TRANSLATION_FIELDS
+                           if field in translation},
+                        'slug': slugs[(index, language_code)],
+                    }
+                ))
+        PageTranslation.objects.bulk_create(page_translations, batch_size=1000)
+        # bulk_create() doesn't send the signal which creates the first revisions
+        PageRevision.create_initial(page_translations)
+        update_search_vectors(
+            PageTranslation.objects.filter(page__site=site, page__in=[page.id for page in pages]),
+            'text'
+        )
+    with connection.cursor() as cursor:
+        # without fresh statistics, the planner treats the grown tables like the old ones
+        for model in (Page, PageTranslation):
+            cursor.execute('ANALYZE {}'.format(model._meta.db_table))
+    # bulk_create() doesn't send the signals which flag the outdated translations and invalidate
+    # the cached translation coverage either
+    PageTranslation.update_outdated(site)
+    cache.delete(TRANSLATION_COVERAGE_CACHE_KEY.format(site.id))
+    return len(records)
+
+
+def get_unique_slugs(slugs):
+    """
+    Find unique slugs for many new page translations at once.
+    Like get_unique_slug(), the suffix after the highest existing one is appended to a slug
+    which is already taken, including the slugs which were allocated earlier in the same batch.
+    Suffixed slugs never take a slug which another translation of the batch wants.
+    :param slugs: List of desired slugs
+    :return: List of unique slugs in the same order
+    """
+    bases = set(slugs)
+    highest_suffixes = {}
+    # one query for all existing slugs which are one of the desired slugs with optional suffix
+    existing_slugs = PageTranslation.objects.annotate(
+        base=Func(models.F('slug'), Value('-[0-9]{1,18}$'), Value(''),
+                  function='regexp_replace', output_field=models.CharField())
+    ).filter(
+        models.Q(slug__in=bases) | models.Q(base__in=bases)
+    ).values_list('slug', flat=True)
+    taken_slugs = set()
+    for slug in existing_slugs.iterator():
+        taken_slugs.add(slug)
+        match = re.fullmatch(r'(.*)-([0-9]{1,18})', slug)
+        if match and match.group(1) in bases:
+            highest_suffixes[match.group(1)] = max(highest_suffixes.get(match.group(1), 1),
+                                                   int(match.group(2)))
+    unique_slugs = []
+    for slug in slugs:
+        unique_slug = slug
+        suffix = highest_suffixes.get(slug, 1)
+        # the desired slugs of the batch are reserved, e.g. if "kontakt" occurs twice and
+        # "kontakt-2" once, the second "kontakt" becomes "kontakt-3"
+        while unique_slug in taken_slugs or (unique_slug != slug and unique_slug in bases):
+            suffix += 1
+            unique_slug = '{}-{}'.format(slug, suffix)
+        highest_suffixes[slug] = suffix
+        taken_slugs.add(unique_slug)
+        unique_slugs.append(unique_slug)
+    return unique_slugs
+
+
+@method_decorator(login_required, name='dispatch')
+class PageExportView(View):
+    """
+    Class to download all pages of a site as JSON lines
+    """
+
+    def get(self, request, *args, **kwargs):
+        site = Site.get_current_site(request)
+        response = StreamingHttpResponse(export_pages(site), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="pages_{}.jsonl"'.format(site.slug)
+        return response
+
+
+@method_decorator(login_required, name='dispatch')
+class PageImportView(View):
+    """
+    Class to upload pages as JSON lines, which are added to the page tree of a site
+    """
+
+    def post(self, request, *args, **kwargs):
+        site = Site.get_current_site(request)
+        upload = request.FILES.get('pages')
+        if not upload:
+            messages.error(request, _('Please choose a file.'))
+        else:
+            try:
+                count = import_pages(site, upload, creator=request.user)
+            except ValueError as error:
+                messages.error(request, str(error))
+            except IntegrityError:
+                # e.g. if a page with one of the slugs was created at the same time
+                messages.error(request, _('The pages could not be imported because of '
+                                          'conflicting slugs, please try again.'))
+            else:
+                messages.success(request, _('{} pages were imported successfully.').format(count))
+        return redirect('pages', site_slug=site.slug)
@@ -1,11 +1,18 @@
+import itertools
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import models, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 from django.shortcuts import render, redirect
 
 from ...models import Page, Site, Language
+from ..general import get_tree_fields
 
 
 @method_decorator(login_required, name='dispatch')
@@ -16,7 +23,7 @@ class PageTreeView(TemplateView):
     def get(self, request, *args, **kwargs):
         # current site
         site_slug = kwargs.get('site_slug')
-        site = Site.objects.get(slug=site_slug)
+        site = Site.get_current_site(request)
 
         # current language
         language_code = kwargs.get('language_code', None)
@@ -37,8 +44,8 @@ class PageTreeView(TemplateView):
             })
 
         # all pages of the current site in the current language
-        pages = Page.get_tree(site_slug)
-        
+        pages = Page.get_translated_tree(site_slug, language.code)
+
         # all other languages of current site
         languages = site.languages
 
@@ -53,3 +60,119 @@ class PageTreeView(TemplateView):
                 'languages': languages,
             }
         )
+
+
+@method_decorator(login_required, name='dispatch')
+class PageReorderView(View):
+    """
+    Class to move many pages of the page tree at once.
+    The request body is a JSON list of {"id": page id, "parent": parent id or null} in the new
+    order of the tree, so parents have to occur before their children. Pages which are not
+    contained (e.g. archived pages) keep their parent and are placed after the given siblings.
+    The page tree posts the new order when a page is dragged onto another one.
+    """
+    # number of pages which are updated in one query
+    batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        site = Site.get_current_site(request)
+        try:
+            ordering = [(int(node['id']), node['parent'] and int(node['parent']))
+                        for node in json.loads(request.body.decode('utf-8'))]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return HttpResponse('The body has to be a list of {"id": ..., "parent": ...}.',
+                                content_type='text/plain', status=400)
+
+        with transaction.atomic():
+            # the site row serializes batch edits of the same site, other sites are not blocked
+            Site.objects.select_for_update().get(id=site.id)
+            old_fields = {
+                page_id: fields for page_id, *fields in Page.objects.select_for_update().filter(
+                    site=site
+                ).order_by(
+                    'tree_id', 'lft'
+                ).values_list('id', 'parent_id', 'tree_id', 'lft', 'rght', 'level')
+            }
+            try:
+                parents, children = self.get_parents(ordering, old_fields)
+            except ValueError as error:
+                return HttpResponse(str(error), content_type='text/plain', status=400)
+
+            # the trees of the site are renumbered within the tree ids of the site
+            site_tree_ids = sorted({fields[1] for fields in old_fields.values()})
+            tree_fields = get_tree_fields(
+                children,
+                itertools.chain(site_tree_ids,
+                                itertools.count(Page.objects.get_next_tree_id(site.id)))
+            )
+            if len(tree_fields) != len(old_fields):
+                return HttpResponse('A page can not be moved into its own descendants.',
+                                    content_type='text/plain', status=400)
+            changed_pages = [
+                (page_id, (parents[page_id], *fields))
+                for page_id, fields in tree_fields.items()
+                if (parents[page_id], *fields) != tuple(old_fields[page_id])
+            ]
+            self.update_tree_fields(changed_pages)
+
+            # permalinks only change for pages with another parent, ancestors are handled first
+            for page in Page.objects.filter(id__in=[
+                    page_id for page_id, fields in changed_pages
+                    if fields[0] != old_fields[page_id][0]
+            ]).order_by('tree_id', 'lft'):
+                page.update_permalinks()
+
+        return JsonResponse({'moved': len(changed_pages)})
+
+    @staticmethod
+    def get_parents(ordering, old_fields):
+        """
+        Validate the new order and complete it with the pages which are not contained
+        :param ordering: list of tuples of the page id and the new parent id
+        :param old_fields: dict of the page ids of the site and their current tree fields
+        :return: tuple of the dict of the parent id per page id and the dict of the ordered
+                 children per parent id
+        :raises ValueError: if the order is invalid, with the message for the user
+        """
+        parents = {}
+        for page_id, parent_id in ordering:
+            if page_id not in old_fields or page_id in parents:
+                raise ValueError('Page {} is not a page of this site or occurs twice.'.format(
+                    page_id
+                ))
+            if parent_id is not None and parent_id not in parents:
+                raise ValueError('Parent {} has to occur before page {}.'.format(parent_id,
+                                                                                 page_id))
+            parents[page_id] = parent_id
+        # the pages which are not contained keep their parents and relative order
+        omitted_pages = [page_id for page_id in old_fields if page_id not in parents]
+        for page_id in omitted_pages:
+            parents[page_id] = old_fields[page_id][0]
+        children = {}
+        for page_id in itertools.chain((page_id for page_id, _parent_id in ordering),
+                                       omitted_pages):
+            children.setdefault(parents[page_id], []).append(page_id)
+        return parents, children
+
+    def update_tree_fields(self, changed_pages):
+        """
+        Store the new tree fields of the changed pages in batches
+        :param changed_pages: list of tuples of the page id and its new parent_id, tree_id, lft,
+                              rght and level
+        """
+        now = timezone.now()
+        with Page.objects.disable_mptt_updates():
+            for i in range(0, len(changed_pages), self.batch_size):
+                batch = changed_pages[i:i + self.batch_size]
+                Page.objects.filter(id__in=[page_id for page_id, _fields in batch]).update(
+                    last_updated=now,
+                    **{
+                        field: models.Case(
+                            *[models.When(id=page_id, then=models.Value(fields[index]))
+                              for page_id, fields in batch],
+                            output_field=models.IntegerField()
+                        ) for index, field in enumerate(
+                            ['parent_id', 'tree_id', 'lft', 'rght', 'level']
+                        )
+                    }
+                )
@@ -19,7 +19,7 @@ class SBSPageView(TemplateView):
     base_context = {'current_menu_item': 'pages'}
 
     def get(self, request, *args, **kwargs):
-        site = Site.objects.get(slug=kwargs.get('site_slug'))
+        site = Site.get_current_site(request)
         page = Page.objects.filter(pk=kwargs.get('page_id', None)).first()
         source_language_code, target_language_code = kwargs.get('language_code').split('__')
         source_language = Language.objects.get(code=source_language_code)
@@ -14,9 +14,16 @@ class PushNotificationForm(forms.ModelForm):
         forms : Defines the form as an Model form related to a database object
     """
 
+    # the browser's datetime-local input sends this format
+    scheduled_for = forms.DateTimeField(
+        required=False,
+        input_formats=['%Y-%m-%dT%H:%M'],
+        widget=forms.DateTimeInput(format='%Y-%m-%dT%H:%M', attrs={'type': 'datetime-local'}),
+    )
+
     class Meta:
         model = PushNotification
-        fields = ['channel']
+        fields = ['channel', 'scheduled_for']
 
     def __init__(self, *args, **kwargs):
         super(PushNotificationForm, self).__init__(*args, **kwargs)
@@ -0,0 +1,304 @@
+"""
+Delivery of queued push notifications.
+Every translation of a push notification is delivered to every channel by a gateway backend,
+which is configured by the setting PUSH_NOTIFICATION_GATEWAY. The pending deliveries are claimed
+with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can send them concurrently.
+A claim postpones the next attempt of the deliveries for CLAIM_DURATION and is committed before
+they are sent, so no row is locked during the requests to the gateway and the deliveries of a
+worker which crashed are retried when the claim has expired.
+"""
+import abc
+import base64
+import json
+import logging
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ...models import PushNotification, PushNotificationDelivery, PushNotificationTranslation
+
+logger = logging.getLogger(__name__)
+
+# number of attempts after which a delivery is marked as failed
+MAX_ATTEMPTS = 6
+# seconds until the first retry, the delay is doubled after each attempt
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+# time in which a worker has to send the deliveries it claimed
+CLAIM_DURATION = timedelta(minutes=30)
+
+
+class PushNotificationGateway(abc.ABC):
+    """
+    Base class of the gateway backends which deliver the messages to the devices
+    """
+
+    @abc.abstractmethod
+    def send(self, messages):
+        """
+        Deliver a batch of messages
+        :param messages: list of dicts with the keys "topic", "title", "text", "language" and
+                         "push_notification"
+        :return: list with an error message or None for each message
+        """
+
+
+class FakeGateway(PushNotificationGateway):
+    """
+    Gateway for tests, which only stores the messages in its outbox.
+    Messages to the topics in failing_topics are rejected.
+    """
+
+    def __init__(self, failing_topics=()):
+        self.outbox = []
+        self.failing_topics = set(failing_topics)
+
+    def send(self, messages):
+        errors = []
+        for message in messages:
+            if message['topic'] in self.failing_topics:
+                errors.append('Topic {} is failing'.format(message['topic']))
+            else:
+                self.outbox.append(message)
+                errors.append(None)
+        return errors
+
+
+class FirebaseGateway(PushNotificationGateway):
+    """
+    Gateway for the HTTP v1 API of Firebase Cloud Messaging. The setting FCM_CREDENTIALS is the
+    path of the JSON key file of a service account of the Firebase project, which is exchanged for
+    an OAuth2 access token.
+    """
+    url = 'https://fcm.googleapis.com/v1/projects/{}/messages:send'
+    scope = 'https://www.googleapis.com/auth/firebase.messaging'
+    timeout = 10  # Seconds to wait for a reply of Firebase
+
+    def __init__(self):
+        if not settings.FCM_CREDENTIALS:
+            raise ImproperlyConfigured(
+                'The setting FCM_CREDENTIALS is required by the FirebaseGateway.'
+            )
+        try:
+            with open(settings.FCM_CREDENTIALS) as credentials_file:
+                self.credentials = json.load(credentials_file)
+            self.url = self.url.format(self.credentials['project_id'])
+        except (OSError, ValueError, KeyError) as exception:
+            raise ImproperlyConfigured('The service account key file in FCM_CREDENTIALS can\'t be '
+                                       'read: {}'.format(exception))
+        self.session = requests.Session()
+        self.token_expiry = 0
+
+    def get_assertion(self):
+        """
+        Sign a JSON Web Token with the private key of the service account
+        :return: the token as string
+        """
+        # only the Firebase gateway needs cryptography
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        def encode(data):
+            return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+        now = int(time.time())
+        segments = [encode(json.dumps(part).encode()) for part in (
+            {'alg': 'RS256', 'typ': 'JWT'},
+            {
+                'iss': self.credentials['client_email'],
+                'scope': self.scope,
+                'aud': self.credentials['token_uri'],
+                'iat': now,
+                'exp': now + 3600,
+            },
+        )]
+        private_key = serialization.load_pem_private_key(
+            self.credentials['private_key'].encode(), password=None, backend=default_backend()
+        )
+        signature = private_key.sign(b'.'.join(segments), padding.PKCS1v15(), hashes.SHA256())
+        return b'.'.join([*segments, encode(signature)]).decode()
+
+    def authorize(self):
+        """
+        Request a new access token of the service account when the current one expires soon
+        """
+        if time.time() < self.token_expiry - 60:
+            return
+        response = self.session.post(self.credentials['token_uri'], timeout=self.timeout, data={
+            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+            'assertion': self.get_assertion(),
+        })
+        response.raise_for_status()
+        token = response.json()
+        self.session.headers['Authorization'] = 'Bearer {}'.format(token['access_token'])
+        self.token_expiry = time.time() + token['expires_in']
+
+    def send(self, messages):
+        self.authorize()
+        errors = []
+        for message in messages:
+            try:
+                response = self.session.post(self.url, timeout=self.timeout, json={'message': {
+                    'topic': message['topic'],
+                    'notification': {
+                        'title': message['title'],
+                        'body': message['text'],
+                    },
+                    # the values of the data have to be strings
+                    'data': {
+                        'push_notification': str(message['push_notification']),
+                        'language': message['language'],
+                    },
+                }})
+                if response.ok:
+                    error = None
+                else:
+                    error = response.json().get('error', {}).get('message') or response.reason
+            except (requests.RequestException, ValueError) as exception:
+                error = str(exception)
+            errors.append(error)
+        return errors
+
+
+def get_gateway():
+    return import_string(settings.PUSH_NOTIFICATION_GATEWAY)()
+
+
+def get_retry_delay(attempts):
+    """
+    Exponential backoff of the retries
+    :param attempts: number of attempts which have failed so far
+    :return: timedelta until the next attempt
+    """
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_deliveries(batch_size):
+    """
+    Claim a batch of the due deliveries by postponing their next attempt until the claim expires
+    :param batch_size: maximum number of deliveries which are claimed
+    :return: list of the claimed PushNotificationDelivery objects
+    """
+    with transaction.atomic():
+        # only the deliveries are locked, joined rows of the same notification must stay available
+        deliveries = list(PushNotificationDelivery.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            status=PushNotificationDelivery.PENDING,
+            next_attempt__lte=timezone.now(),
+        ).order_by('next_attempt')[:batch_size])
+        claimed_until = timezone.now() + CLAIM_DURATION
+        PushNotificationDelivery.objects.filter(
+            id__in=[delivery.id for delivery in deliveries]
+        ).update(next_attempt=claimed_until)
+    for delivery in deliveries:
+        delivery.next_attempt = claimed_until
+    return deliveries
+
+
+def get_messages(deliveries):
+    """
+    Build the messages of the deliveries
+    :param deliveries: list of PushNotificationDelivery objects
+    :return: list of the message dicts, None for deliveries whose translation was deleted
+    """
+    translations = {
+        (translation.push_notification_id, translation.language_id): translation
+        for translation in PushNotificationTranslation.objects.filter(
+            push_notification_id__in={delivery.push_notification_id for delivery in deliveries},
+            language_id__in={delivery.language_id for delivery in deliveries},
+        ).select_related('push_notification__site', 'language')
+    }
+    messages = []
+    for delivery in deliveries:
+        translation = translations.get((delivery.push_notification_id, delivery.language_id))
+        if translation is None:
+            # the translation was deleted after the notification was queued
+            messages.append(None)
+            continue
+        messages.append({
+            'topic': '{}-{}-{}'.format(translation.push_notification.site.slug,
+                                       translation.language.code, delivery.channel),
+            'title': translation.title,
+            'text': translation.text,
+            'language': translation.language.code,
+            'push_notification': delivery.push_notification_id,
+        })
+    return messages
+
+
+def send_pending_deliveries(gateway, batch_size=100):
+    """
+    Claim a batch of the due deliveries and send them with one call of the gateway.
+    The claim is committed before the messages are sent and the results are stored in a second
+    transaction, so concurrent workers skip the claimed deliveries without waiting for locks.
+    :param gateway: PushNotificationGateway
+    :param batch_size: maximum number of deliveries which are sent
+    :return: number of deliveries which were attempted
+    """
+    deliveries = claim_deliveries(batch_size)
+    if not deliveries:
+        return 0
+
+    messages = get_messages(deliveries)
+    sendable = [delivery for delivery, message in zip(deliveries, messages) if message]
+    messages = [message for message in messages if message]
+    try:
+        errors = gateway.send(messages) if messages else []
+    except Exception as exception:  # pylint: disable=broad-except
+        # the whole batch is retried, the worker has to keep running
+        logger.exception('The gateway failed to send %d push notifications', len(messages))
+        errors = [str(exception) or type(exception).__name__] * len(messages)
+
+    now = timezone.now()
+    with transaction.atomic():
+        # deliveries whose claim has expired in the meantime may already belong to another worker
+        claimed = PushNotificationDelivery.objects.filter(
+            status=PushNotificationDelivery.PENDING,
+            next_attempt=deliveries[0].next_attempt,
+        )
+        claimed.filter(id__in=[delivery.id for delivery in deliveries]).exclude(
+            id__in=[delivery.id for delivery in sendable]
+        ).update(
+            status=PushNotificationDelivery.FAILED,
+            last_error='The translation does not exist anymore.',
+            last_updated=now,
+        )
+        claimed.filter(
+            id__in=[delivery.id for delivery, error in zip(sendable, errors) if not error]
+        ).update(
+            status=PushNotificationDelivery.SENT,
+            attempts=F('attempts') + 1,
+            sent_date=now,
+            last_error='',
+            last_updated=now,
+        )
+        for delivery, error in zip(sendable, errors):
+            if error:
+                attempts = delivery.attempts + 1
+                claimed.filter(id=delivery.id).update(
+                    attempts=attempts,
+                    status=(PushNotificationDelivery.FAILED if attempts >= MAX_ATTEMPTS
+                            else PushNotificationDelivery.PENDING),
+                    next_attempt=now + get_retry_delay(attempts),
+                    last_error=error,
+                    last_updated=now,
+                )
+
+    # the notifications without pending deliveries are finished. This runs after the commit,
+    # so the worker which commits last sees the deliveries of all other workers.
+    PushNotification.objects.filter(
+        id__in={delivery.push_notification_id for delivery in deliveries},
+        sent_date__isnull=True,
+    ).exclude(
+        deliveries__status=PushNotificationDelivery.PENDING,
+    ).update(sent_date=timezone.now())
+    return len(deliveries)
@@ -1,6 +1,6 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
+from django.utils import formats, timezone
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
 from django.views.generic import TemplateView
@@ -20,7 +20,7 @@ class PushNotificationListView(TemplateView):
 
     def get(self, request, *args, **kwargs):
         # current site
-        site = Site.objects.get(slug=kwargs.get('site_slug'))
+        site = Site.get_current_site(request)
 
         # current language
         language_code = kwargs.get('language_code', None)
@@ -60,7 +60,7 @@ class PushNotificationView(TemplateView):
 
     def get(self, request, *args, **kwargs):
         push_notification = PushNotification.objects.filter(id=kwargs.get('push_notification_id')).first()
-        site = Site.objects.get(slug=kwargs.get('site_slug'))
+        site = Site.get_current_site(request)
         language = Language.objects.get(code=kwargs.get('language_code'))
         if push_notification:
             push_notification_form = PushNotificationForm(instance=push_notification)
@@ -87,7 +87,7 @@ class PushNotificationView(TemplateView):
         })
 
     def post(self, request, *args, **kwargs):
-        site = Site.objects.get(slug=kwargs.get('site_slug'))
+        site = Site.get_current_site(request)
         language = Language.objects.get(code=kwargs.get('language_code'))
 
         # At first check if push notification exists already
@@ -136,12 +136,22 @@ class PushNotificationView(TemplateView):
 
             # Check if Save button has been clicked
             if push_notification_form.data.get('submit_send'):
-
-                # TODO: send push notification (EXPEDIA HACKATHON)
-
-                push_notification.sent_date = timezone.now()
-                push_notification.save()
-                messages.success(request, _('Push notification was successfully sent.'))
+                # the deliveries are sent in the background by the command "send_push_notifications"
+                if push_notification.queued_date:
+                    messages.info(request, _('Push notification has already been sent.'))
+                elif (push_notification.scheduled_for and
+                      push_notification.scheduled_for > timezone.now()):
+                    # the command "send_push_notifications" queues it when it's due
+                    PushNotification.objects.filter(id=push_notification.id).update(draft=False)
+                    push_notification.draft = False
+                    messages.success(request, _('Push notification is scheduled for {}.').format(
+                        formats.date_format(timezone.localtime(push_notification.scheduled_for),
+                                            'DATETIME_FORMAT')
+                    ))
+                elif push_notification.queue():
+                    messages.success(request, _('Push notification is being sent.'))
+                else:
+                    messages.info(request, _('Push notification has already been sent.'))
 
         else:
             messages.error(request, _('Errors have occurred.'))
@@ -4,7 +4,9 @@ Form for creating a region object
 
 from django import forms
 from django.utils.text import slugify
+from ...models.page import PageTranslation
 from ...models.site import Site
+from ..general import is_variant_of_slug, save_with_unique_slug
 
 
 class RegionForm(forms.ModelForm):
@@ -20,7 +22,7 @@ class RegionForm(forms.ModelForm):
         model = Site
         fields = ['name', 'events_enabled', 'push_notifications_enabled',
                   'latitude', 'longitude', 'postal_code', 'admin_mail', 'statistics_enabled',
-                  'matomo_url', 'matomo_token', 'matomo_ssl_verify', 'status']
+                  'matomo_url', 'matomo_token', 'matomo_ssl_verify', 'matomo_id', 'status']
 
     def __init__(self, *args, **kwargs):
         super(RegionForm, self).__init__(*args, **kwargs)
@@ -32,53 +34,48 @@ class RegionForm(forms.ModelForm):
         """
 
         slug = slugify(self.cleaned_data['name'])
-        # if the slug has changed, make sure the slug derived from the name is unique
-        if slug != region_slug and Site.objects.filter(slug=slug).exists():
-            old_slug = slug
-            i = 1
-            while True:
-                i += 1
-                slug = old_slug + '-' + str(i)
-                if not Site.objects.filter(slug=slug).exists():
-                    break
 
         if region_slug:
             # save region
             region = Site.objects.get(slug=region_slug)
-            region.slug = slug
-            region.name = self.cleaned_data['name']
-            region.events_enabled = self.cleaned_data['events_enabled']
-            region.push_notifications_enabled = self.cleaned_data['push_notifications_enabled']
-            region.latitude = self.cleaned_data['latitude']
-            region.longitude = self.cleaned_data['longitude']
-            region.postal_code = self.cleaned_data['postal_code']
-            region.admin_mail = self.cleaned_data['admin_mail']
-            region.statistics_enabled = self.cleaned_data['statistics_enabled']
-            region.matomo_url = self.cleaned_data['matomo_url']
-            region.matomo_token = self.cleaned_data['matomo_token']
-            region.matomo_ssl_verify = self.cleaned_data['matomo_ssl_verify']
-            region.status = self.cleaned_data['status']
-            region.push_notification_channels = self.cleaned_data[
-                'push_notification_channels'
-            ].split(' ')
-            region.save()
         else:
             # create region
-            region = Site.objects.create(
-                slug=slug,
-                name=self.cleaned_data['name'],
-                events_enabled=self.cleaned_data['events_enabled'],
-                push_notifications_enabled=self.cleaned_data['push_notifications_enabled'],
-                latitude=self.cleaned_data['latitude'],
-                longitude=self.cleaned_data['longitude'],
-                postal_code=self.cleaned_data['postal_code'],
-                admin_mail=self.cleaned_data['admin_mail'],
-                statistics_enabled=self.cleaned_data['statistics_enabled'],
-                matomo_url=self.cleaned_data['matomo_url'],
-                matomo_token=self.cleaned_data['matomo_token'],
-                matomo_ssl_verify=self.cleaned_data['matomo_ssl_verify'],
-                push_notification_channels=self.cleaned_data[
-                    'push_notification_channels'
-                ].split(' '),
-                status=self.cleaned_data['status'],
+            region = Site()
+        region.name = self.cleaned_data['name']
+        region.events_enabled = self.cleaned_data['events_enabled']
+        region.push_notifications_enabled = self.cleaned_data['push_notifications_enabled']
+        region.latitude = self.cleaned_data['latitude']
+        region.longitude = self.cleaned_data['longitude']
+        region.postal_code = self.cleaned_data['postal_code']
+        region.admin_mail = self.cleaned_data['admin_mail']
+        region.statistics_enabled = self.cleaned_data['statistics_enabled']
+        region.matomo_url = self.cleaned_data['matomo_url']
+        region.matomo_token = self.cleaned_data['matomo_token']
+        region.matomo_ssl_verify = self.cleaned_data['matomo_ssl_verify']
+        region.matomo_id = self.cleaned_data['matomo_id']
+        region.status = self.cleaned_data['status']
+        region.push_notification_channels = self.cleaned_data[
+            'push_notification_channels'
+        ].split(' ')
+
+        if region_slug and is_variant_of_slug(region_slug, slug):
+            # the name didn't change, so the slug is kept
+            region.save()
+        else:
+            # make sure the slug derived from the name is unique
+            save_with_unique_slug(
+                Site.objects.exclude(slug=region_slug) if region_slug else Site.objects.all(),
+                slug,
+                lambda unique_slug: self.save_slug(region, unique_slug)
             )
+            if region_slug:
+                PageTranslation.replace_permalink_prefix(
+                    PageTranslation.objects.filter(page__site=region),
+                    region_slug + '/',
+                    region.slug + '/'
+                )
+
+    @staticmethod
+    def save_slug(region, slug):
+        region.slug = slug
+        region.save()
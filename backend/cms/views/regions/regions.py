@@ -47,6 +47,7 @@ class RegionView(TemplateView):
                 'matomo_url': region.matomo_url,
                 'matomo_token': region.matomo_token,
                 'matomo_ssl_verify': region.matomo_ssl_verify,
+                'matomo_id': region.matomo_id,
                 'push_notification_channels': ' '.join(region.push_notification_channels),
                 'status': region.status,
             })
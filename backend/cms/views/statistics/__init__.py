@@ -1,4 +1,4 @@
 """
 Python standard Init-File
 """
-from .statistics import AnalyticsView
+from .statistics import AnalyticsView, AnalyticsExportView
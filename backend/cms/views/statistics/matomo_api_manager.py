@@ -3,6 +3,9 @@ Helper class to interact with the Matomo API
 """
 import re
 import json
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
 
@@ -23,19 +26,41 @@ class MatomoApiManager:
     ssl_verify = True
     matomo_url = ""  # URL to Matomo-Instance
     matomo_api_key = ""  # Matomo API-key
+    timeout = 10  # Seconds to wait for a reply of the Matomo-Instance
+    max_workers = 8  # Maximum number of requests which are sent at the same time
 
-    def __init__(self, matomo_url, matomo_api_key, ssl_verify):
+    def __init__(self, matomo_url, matomo_api_key, ssl_verify, timeout=None):
         """
-        Constructor initialises matomo_url, matomo_api_key, ssl_verify
+        Constructor initialises matomo_url, matomo_api_key, ssl_verify, timeout
         :param matomo_url:
         :param matomo_api_key:
         :param ssl_verify:
+        :param timeout: seconds per request, defaults to MatomoApiManager.timeout
         """
         self.matomo_url = matomo_url
         self.matomo_api_key = matomo_api_key
         self.matomo_api_key = "&token_auth=" + self.matomo_api_key  # concats token api-parameter
         self.ssl_verify = ssl_verify
+        if timeout is not None:
+            self.timeout = timeout
         self.cleanmatomo_url()  # cleans matomo url for proper requests
+        # reuse connections for all requests, also when they are sent concurrently
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes the connections of the session, the manager can't be used afterwards
+        """
+        self.session.close()
 
     def cleanmatomo_url(self):
         """
@@ -139,24 +164,28 @@ class MatomoApiManager:
         request = self.api_request("get", curl)
         return request
 
-    def get_visitors_per_timerange(self, date_string, site_id, period, lang):
+    def get_visitors_url(self, date_string, site_id, period, lang):
         """
-        Returns the total unique visitors in a timerange as definded in period
-        :param site_id: String
+        Returns the api url for the unique visitors of one language in a timerange
         :param date_string: String "yyyy-mm-dd,yyyy-mm-dd"
+        :param site_id: String
         :param period: String "day", "week", "month", "year"
         :param lang: String contains the language, that is called
+        :return: String
+        """
+        return ("{}/index.php?date={}&expanded=1&filter_limit=-1&format=JSON&format_metrics=1"
+                "&idSite={}&method=API.get&module=API&period={}"
+                "&segment=pageUrl%253D@%25252F{}%25252Fwp-json%25252F{}").format(
+                    self.matomo_url, date_string, site_id, period, lang, self.matomo_api_key)
+
+    @staticmethod
+    def parse_visitors(response, period):
+        """
+        Converts the api reply for the unique visitors into a list
+        :param response: decoded JSON reply of the api
+        :param period: String "day", "week", "month", "year"
         :return: List[Date, Hits]
         """
-        domain = self.matomo_url
-        api_key = self.matomo_api_key
-        response = {}
-        url = """{}/index.php?date={}&expanded=1
-        &filter_limit=-1&format=JSON&format_metrics=1
-        &idSite={}&method=API.get&module=API&period={}
-        &segment=pageUrl%253D@%25252F{}
-        %25252Fwp-json%25252F{}""".format(domain, date_string, site_id, period, lang, api_key)
-        response = requests.get(url).json()
         result = []
         for json_object in response:
             if period == "day":
@@ -176,3 +205,76 @@ class MatomoApiManager:
                                           '\\2-\\1', json_object),
                                    response[json_object]['nb_uniq_visitors']])
         return result
+
+    def get_visitors_per_timerange(self, date_string, site_id, period, lang):
+        """
+        Returns the total unique visitors in a timerange as definded in period
+        :param site_id: String
+        :param date_string: String "yyyy-mm-dd,yyyy-mm-dd"
+        :param period: String "day", "week", "month", "year"
+        :param lang: String contains the language, that is called
+        :return: List[Date, Hits]
+        """
+        url = self.get_visitors_url(date_string, site_id, period, lang)
+        response = self.session.get(url, verify=self.ssl_verify, timeout=self.timeout).json()
+        return self.parse_visitors(response, period)
+
+    def get_visitors_per_language(self, date_string, site_id, period, languages):
+        """
+        Returns the total unique visitors in a timerange for each of the given languages.
+        The requests for all languages are sent concurrently, so the duration is about the
+        same as the one of a single request.
+        :param date_string: String "yyyy-mm-dd,yyyy-mm-dd"
+        :param site_id: String
+        :param period: String "day", "week", "month", "year"
+        :param languages: List of language codes
+        :return: List of List[Date, Hits] in the same order as languages
+        """
+        return self.map_concurrently(
+            lambda lang: self.get_visitors_per_timerange(date_string, site_id, period, lang),
+            languages
+        )
+
+    def get_daily_visitors(self, start_date, end_date, site_id, lang):
+        """
+        Returns the unique visitors of each day in a timerange
+        :param start_date: date
+        :param end_date: date
+        :param site_id: String
+        :param lang: String contains the language, that is called
+        :return: Dict of {date: visitors}
+        """
+        date_string = "{},{}".format(start_date.isoformat(), end_date.isoformat())
+        url = self.get_visitors_url(date_string, site_id, "day", lang)
+        response = self.session.get(url, verify=self.ssl_verify, timeout=self.timeout).json()
+        return {
+            datetime.strptime(day, "%Y-%m-%d").date(): values['nb_uniq_visitors'] if values else 0
+            for day, values in response.items()
+        }
+
+    def get_daily_visitors_per_language(self, start_date, end_date, site_id, languages):
+        """
+        Returns the unique visitors of each day in a timerange for each of the given languages.
+        The requests for all languages are sent concurrently.
+        :param start_date: date
+        :param end_date: date
+        :param site_id: String
+        :param languages: List of language codes
+        :return: List of Dicts of {date: visitors} in the same order as languages
+        """
+        return self.map_concurrently(
+            lambda lang: self.get_daily_visitors(start_date, end_date, site_id, lang),
+            languages
+        )
+
+    def map_concurrently(self, function, items):
+        """
+        Calls the function for all items at the same time
+        :param function: function which sends a request to the api
+        :param items: List of arguments for the function
+        :return: List of results in the same order as items
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(items), self.max_workers)) as executor:
+            return list(executor.map(function, items))
@@ -1,10 +1,37 @@
 """Views related to the statistics module"""
+import csv
+import zlib
 from datetime import date, timedelta
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 from django.shortcuts import render
-from .matomo_api_manager import MatomoApiManager
+from ...models import Site
+from .visitor_cache import get_daily_visitors, get_matomo_api_manager
+
+# colors of the languages' graphs, used in the order of the site's languages
+COLORS = ["#7e1e9c", "#15b01a", "#0343df", "#ff81c0", "#653700", "#e50000", "#95d0fc",
+          "#029386", "#f97306", "#96f97b", "#c20078", "#ffff14"]
+
+
+def get_date_range(request):
+    """
+    Parse the time range of a statistics request, the default are the last 30 days
+    :param request: HttpRequest with the optional GET parameters start_date and end_date
+    :return: tuple of the start and end date, or None if the time range is invalid
+    """
+    try:
+        start_date = parse_date(request.GET.get('start_date') or str(date.today() -
+                                                                     timedelta(days=30)))
+        end_date = parse_date(request.GET.get('end_date') or str(date.today()))
+    except ValueError:
+        # well formatted, but not existing dates
+        return None
+    if not start_date or not end_date or start_date > end_date:
+        return None
+    return start_date, end_date
 
 
 @method_decorator(login_required, name='dispatch')
@@ -15,44 +42,39 @@ class AnalyticsView(TemplateView):
     template_name = 'statistics/statistics_dashboard.html'
     base_context = {'current_menu_item': 'statistics'}
 
-    @staticmethod
-    def prepare_csv(languages, hits, dates):
-        """
-        Method to create CSV String from the API hits
-        """
-        csv_row = "date"
-        csv_raw = ""
-        for l_value in languages:
-            csv_row += "," + l_value[1]
-        csv_raw += csv_row + ";"
-        for date_index, _ in enumerate(dates):
-            csv_row = ""
-            csv_row += str(dates[date_index]) + ","
-            for idy in range(0, len(languages)):
-                csv_row += str(hits[idy][2][date_index])
-                if idy < (len(languages) - 1):
-                    csv_row += ","
-            csv_row += ";"
-            csv_raw += str(csv_row)
-        return csv_raw
-
     def get(self, request, *args, **kwargs):
-        start_date = request.GET.get('start_date', str(date.today() -
-                                                       timedelta(days=30)))
-        end_date = request.GET.get('end_date', str(date.today()))
-        languages = [["de", "Deutsch", "#7e1e9c"], ["en", "Englisch", "#15b01a"],
-                     ["ar", "Arabisch", "#0343df"]]
-
-        api_man = MatomoApiManager(matomo_url="https://statistics.integreat-app.de",
-                                   matomo_api_key="",
-                                   ssl_verify=True)
+        date_range = get_date_range(request)
+        if not date_range:
+            return HttpResponse('Invalid timerange.', content_type='text/plain', status=400)
+        start_date, end_date = date_range
+        site = Site.get_current_site(request)
+        site_languages = site.languages
+        languages = [[language.code, language.name, COLORS[index % len(COLORS)]]
+                     for index, language in enumerate(site_languages)]
+
         response_dates = []
         response_hits = []
-        for lang in languages:
-            api_hits = api_man.get_visitors_per_timerange(date_string=start_date + ',' + end_date,
-                                                          site_id="2",
-                                                          period=request.GET.get('peri', 'day'),
-                                                          lang=lang[0])
+        api_hits = []
+        period = request.GET.get('peri', 'day')
+        if not site.statistics_configured:
+            all_api_hits = []
+        elif period == 'day':
+            with get_matomo_api_manager(site) as api_man:
+                # past days are served from the database
+                all_api_hits = [
+                    [[day.strftime('%d-%m-%Y'), hits] for day, hits in daily_hits]
+                    for daily_hits in get_daily_visitors(api_man, site, site_languages,
+                                                         start_date, end_date)
+                ]
+        else:
+            with get_matomo_api_manager(site) as api_man:
+                all_api_hits = api_man.get_visitors_per_language(
+                    date_string='{},{}'.format(start_date, end_date),
+                    site_id=site.matomo_id,
+                    period=period,
+                    languages=[lang[0] for lang in languages]
+                )
+        for lang, api_hits in zip(languages, all_api_hits):
             temp_hits = []
             for single_day in api_hits:
                 temp_hits.append(single_day[1])
@@ -62,6 +84,104 @@ class AnalyticsView(TemplateView):
 
         return render(request, self.template_name,
                       {**self.base_context,
-                       'csv': self.prepare_csv(languages, response_hits, response_dates),
                        'dates': response_dates,
                        'hits': response_hits})
+
+
+class Echo:
+    """
+    Pseudo buffer which returns the written value instead of storing it,
+    so the csv writer can be used to create single rows
+    """
+
+    @staticmethod
+    def write(value):
+        return value
+
+
+@method_decorator(login_required, name='dispatch')
+class AnalyticsExportView(View):
+    """
+    Class to export the unique visitors of all languages of a site as CSV file.
+    The rows are streamed, so even daily numbers of several years are never held in memory.
+    """
+    # number of days which are loaded at once
+    chunk_size = 90
+    delimiters = {
+        'comma': ',',
+        'semicolon': ';',
+        'tab': '\t',
+    }
+
+    def get(self, request, *args, **kwargs):
+        date_range = get_date_range(request)
+        delimiter = self.delimiters.get(request.GET.get('delimiter', 'comma'))
+        period = request.GET.get('peri', 'day')
+        if not date_range:
+            return HttpResponse('Invalid timerange.', content_type='text/plain', status=400)
+        start_date, end_date = date_range
+        if not delimiter:
+            return HttpResponse('Parameter "delimiter" has to be one of {}.'.format(
+                ', '.join(self.delimiters)), content_type='text/plain', status=400)
+        site = Site.get_current_site(request)
+        if not site.statistics_configured:
+            return HttpResponse('Statistics are not configured for this region.',
+                                content_type='text/plain', status=400)
+        languages = list(site.languages)
+
+        writer = csv.writer(Echo(), delimiter=delimiter)
+        rows = (writer.writerow(row) for row in self.get_rows(site, languages, period,
+                                                              start_date, end_date))
+        filename = 'statistics_{}_{}_{}.csv'.format(site.slug, start_date, end_date)
+        if request.GET.get('gzip'):
+            response = StreamingHttpResponse(self.compress(rows), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(rows, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
+
+    def get_rows(self, site, languages, period, start_date, end_date):
+        """
+        Generator for the rows of the table, starting with the header
+        :param site: Site
+        :param languages: List of Language objects
+        :param period: String "day" or "month"
+        :param start_date: date
+        :param end_date: date
+        :return: Generator of List[Date, Hits of each language]
+        """
+        yield ['date'] + [language.name for language in languages]
+        # the generator is closed when the response is finished or aborted
+        with get_matomo_api_manager(site) as api_man:
+            if period == 'day':
+                chunk_start = start_date
+                while chunk_start <= end_date:
+                    chunk_end = min(chunk_start + timedelta(days=self.chunk_size - 1), end_date)
+                    all_hits = get_daily_visitors(api_man, site, languages, chunk_start, chunk_end)
+                    for day_index, (day, _) in enumerate(all_hits[0] if all_hits else []):
+                        yield [day.isoformat()] + [hits[day_index][1] for hits in all_hits]
+                    chunk_start = chunk_end + timedelta(days=1)
+            else:
+                all_hits = api_man.get_visitors_per_language(
+                    date_string='{},{}'.format(start_date, end_date),
+                    site_id=site.matomo_id,
+                    period=period,
+                    languages=[language.code for language in languages]
+                )
+                for rows in zip(*all_hits):
+                    yield [rows[0][0]] + [hits for _, hits in rows]
+
+    @staticmethod
+    def compress(chunks):
+        """
+        Generator which compresses the given strings with gzip
+        :param chunks: Iterable of Strings
+        :return: Generator of bytes
+        """
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
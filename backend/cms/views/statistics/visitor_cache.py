@@ -0,0 +1,83 @@
+"""
+Cache for the daily unique visitors of a site.
+Only days which are missing in the database or not over yet are requested from Matomo.
+"""
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+
+from ...models import DailyVisitorCount
+from .matomo_api_manager import MatomoApiManager
+
+
+def get_matomo_api_manager(site):
+    """
+    Creates the api manager for the Matomo instance which is configured for the site
+    :param site: Site, see Site.statistics_configured
+    :return: MatomoApiManager
+    """
+    return MatomoApiManager(matomo_url=site.matomo_url,
+                            matomo_api_key=site.matomo_token,
+                            ssl_verify=site.matomo_ssl_verify)
+
+
+def get_daily_visitors(api_man, site, languages, start_date, end_date):
+    """
+    Returns the unique visitors of each day in a timerange for each of the given languages
+    :param api_man: MatomoApiManager
+    :param site: Site
+    :param languages: List of Language objects
+    :param start_date: date
+    :param end_date: date
+    :return: List of List[date, Hits] in the same order as languages
+    """
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    today = date.today()
+    visitors = {language.id: {} for language in languages}
+    for language_id, day, count in DailyVisitorCount.objects.filter(
+            site=site,
+            language__in=languages,
+            date__range=(start_date, end_date),
+    ).values_list('language_id', 'date', 'visitors'):
+        visitors[language_id][day] = count
+
+    # days which are not over yet are always requested, because their numbers still change
+    missing = {
+        language.id: [day for day in dates if day >= today or day not in visitors[language.id]]
+        for language in languages
+    }
+    # each contiguous run of missing days is requested separately
+    requests = []
+    for language in languages:
+        for day in missing[language.id]:
+            if requests and requests[-1][0] == language \
+                    and requests[-1][2] == day - timedelta(days=1):
+                requests[-1][2] = day
+            else:
+                requests.append([language, day, day])
+    if requests:
+        responses = api_man.map_concurrently(
+            lambda request: api_man.get_daily_visitors(request[1], request[2], site.matomo_id,
+                                                       request[0].code),
+            requests
+        )
+        new_counts = []
+        for (language, first_day, last_day), response in zip(requests, responses):
+            for i in range((last_day - first_day).days + 1):
+                day = first_day + timedelta(days=i)
+                visitors[language.id][day] = response.get(day, 0)
+                if day < today:
+                    new_counts.append(DailyVisitorCount(
+                        site=site,
+                        language=language,
+                        date=day,
+                        visitors=visitors[language.id][day],
+                    ))
+        try:
+            with transaction.atomic():
+                DailyVisitorCount.objects.bulk_create(new_counts)
+        except IntegrityError:
+            # a concurrent request stored the same days in the meantime
+            pass
+
+    return [[[day, visitors[language.id][day]] for day in dates] for language in languages]
@@ -3,3 +3,4 @@
 docker exec -it $(docker-compose ps -q django) bash -ic "integreat-cms makemigrations cms"
 docker exec -it $(docker-compose ps -q django) bash -ic "integreat-cms migrate"
 
+docker exec -it $(docker-compose ps -q django) bash -ic "integreat-cms update_outdated_translations"